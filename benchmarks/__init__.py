@@ -0,0 +1,5 @@
+"""
+Benchmarks for mediawiki_dump
+
+Run them with "make bench" or "python -m benchmarks.run --help"
+"""
@@ -0,0 +1,368 @@
+"""
+Runs the benchmarks suite against a synthetic dump and reports throughput and peak memory usage
+
+python -m benchmarks.run --pages 2000 --text-size 8192
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from tempfile import TemporaryDirectory, gettempdir
+from threading import Thread
+from typing import Callable, Dict, List, Optional
+
+from mediawiki_dump.dumps import (
+    LocalFileDump,
+    LocalWikipediaDump,
+    WikiaDump,
+    WikipediaDump,
+)
+from mediawiki_dump.export import JsonLinesSink, export_entries
+from mediawiki_dump.reader import DumpReader
+from mediawiki_dump.search import KeywordMatcher
+from mediawiki_dump.tokenizer import clean, clean_and_tokenize_many, tokenize
+
+from .synthetic import WikitextGenerator, write_dump
+
+
+class Benchmark:
+    """
+    A single benchmark case
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], int],
+        input_bytes: Optional[int] = None,
+    ):
+        """
+        :param func: callable that runs the benchmarked code and returns the number of items processed
+        :param input_bytes: size of the processed input, used to report MB/s
+        """
+        self.name = name
+        self.func = func
+        self.input_bytes = input_bytes
+
+    def run(self, repeat: int = 1, measure_memory: bool = True) -> dict:
+        """Runs the case and returns its stats"""
+        timings = []
+        items = 0
+
+        for _ in range(repeat):
+            start = time.perf_counter()
+            items = self.func()
+            timings.append(time.perf_counter() - start)
+
+        # tracemalloc slows things down, hence a separate run
+        peak = None
+        if measure_memory:
+            tracemalloc.start()
+            self.func()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        best = min(timings)
+
+        return {
+            "name": self.name,
+            "seconds": best,
+            "items": items,
+            "items_per_sec": items / best if best else None,
+            "mb_per_sec": (
+                self.input_bytes / best / 1024 / 1024
+                if self.input_bytes and best
+                else None
+            ),
+            "peak_memory_mb": peak / 1024 / 1024 if peak is not None else None,
+        }
+
+
+class LocalHttpServer:
+    """
+    A local HTTP stand-in for dumps.wikimedia.org, serves files from a given directory
+    """
+
+    class Handler(SimpleHTTPRequestHandler):
+        """Silent request handler"""
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            pass
+
+    def __init__(self, directory: str):
+        self.server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), partial(self.Handler, directory=directory)
+        )
+        self.thread = Thread(target=self.server.serve_forever, daemon=True)
+
+    def get_url(self, file_name: str) -> str:
+        """URL of a given file"""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/{file_name}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class HttpWikipediaDump(WikipediaDump):
+    """
+    Wikipedia dump fetched from a given URL
+    """
+
+    def __init__(self, url: str):
+        super().__init__("bench")
+        self.url = url
+
+    def get_url(self):
+        return self.url
+
+
+class LocalWikiaDump(WikiaDump):
+    """
+    Reads a local 7z dump file
+    """
+
+    def __init__(self, dump_file: str):
+        super().__init__("bench")
+        self.dump_file = dump_file
+
+    def get_url(self):
+        pass
+
+    def fetch(self):
+        # pylint:disable=consider-using-with
+        return open(self.dump_file, "rb")
+
+
+def get_benchmarks(
+    dump_file: str, compression: str, server: LocalHttpServer, large_text_size: int
+) -> List[Benchmark]:
+    """Returns the list of benchmark cases for a given dump file"""
+    compressed_size = os.path.getsize(dump_file)
+
+    def get_dump():
+        if compression == "7z":
+            return LocalWikiaDump(dump_file)
+        return LocalWikipediaDump(dump_file)
+
+    def fetch():
+        dump = HttpWikipediaDump(server.get_url(os.path.basename(dump_file)))
+        cache_file = os.path.join(gettempdir(), dump.get_cache_filename(dump.get_url()))
+
+        try:
+            with dump.fetch() as file:
+                return len(file.read())
+        finally:
+            os.unlink(cache_file)
+
+    def decompress():
+        return sum(len(chunk) for chunk in get_dump().get_content())
+
+    uncompressed_size = decompress()
+
+    # uncompressed copy of the dump for LocalFileDump
+    plain_file = dump_file + ".plain.xml"
+    with open(plain_file, mode="wb") as file:
+        file.writelines(get_dump().get_content())
+
+    def read_plain(use_mmap: bool = False):
+        dump = LocalFileDump(plain_file, use_mmap=use_mmap)
+        return sum(1 for _ in DumpReader().read(dump))
+
+    def read():
+        return sum(1 for _ in DumpReader().read(get_dump()))
+
+    def read_pipelined():
+        return sum(1 for _ in DumpReader(pipeline_depth=8).read(get_dump()))
+
+    texts = [entry.content for entry in DumpReader().read(get_dump())]
+    texts_size = sum(len(text.encode("utf-8")) for text in texts)
+
+    cleaned = [clean(text) for text in texts]
+    cleaned_size = sum(len(text.encode("utf-8")) for text in cleaned)
+
+    def clean_texts():
+        for text in texts:
+            clean(text)
+        return len(texts)
+
+    def tokenize_texts():
+        return sum(len(tokenize(text)) for text in cleaned)
+
+    def clean_and_tokenize_texts():
+        return sum(len(tokens) for tokens in clean_and_tokenize_many(texts))
+
+    # a few infobox-laden, template-heavy pages
+    generator = WikitextGenerator(random.Random(0))
+    large_texts = [generator.text(large_text_size) for _ in range(5)]
+
+    def clean_large_texts():
+        for text in large_texts:
+            clean(text)
+        return len(large_texts)
+
+    # a thousand words that appear in the texts and a thousand that do not
+    keywords = sorted({generator.word() for _ in range(5000)})[:1000] + [
+        f"missing{index}" for index in range(1000)
+    ]
+    matcher = KeywordMatcher(keywords)
+
+    def search_keywords():
+        return sum(1 for text in texts if matcher.count(text))
+
+    def search_keywords_naive():
+        lowered = [text.lower() for text in texts]
+        return sum(
+            1
+            for text in lowered
+            if [keyword for keyword in keywords if keyword in text]
+        )
+
+    entries = list(DumpReader().read(get_dump()))
+
+    def export_naive():
+        path = os.path.join(gettempdir(), "benchmark-export.jsonl.gz")
+
+        with gzip.open(path, mode="wt", encoding="utf-8") as file:
+            for entry in entries:
+                file.write(json.dumps({"title": entry.title, "content": entry.content}))
+                file.write("\n")
+
+        os.unlink(path)
+        return len(entries)
+
+    def export_jsonl():
+        path = os.path.join(gettempdir(), "benchmark-export.jsonl.gz")
+        rows = export_entries(entries, JsonLinesSink(path, fields=("title", "content")))
+
+        os.unlink(path)
+        return rows
+
+    def import_reader():
+        # a fresh interpreter, as started by worker processes
+        subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import mediawiki_dump.reader, mediawiki_dump.tokenizer",
+            ],
+            check=True,
+        )
+        return 1
+
+    return [
+        Benchmark("import reader + tokenizer", import_reader),
+        Benchmark("fetch", fetch, input_bytes=compressed_size),
+        Benchmark(f"decompress ({compression})", decompress, compressed_size),
+        Benchmark("DumpReader.read()", read, input_bytes=uncompressed_size),
+        Benchmark("DumpReader.read() (pipeline)", read_pipelined, uncompressed_size),
+        Benchmark("DumpReader.read() (plain)", read_plain, uncompressed_size),
+        Benchmark(
+            "DumpReader.read() (mmap)",
+            partial(read_plain, use_mmap=True),
+            input_bytes=uncompressed_size,
+        ),
+        Benchmark("clean()", clean_texts, input_bytes=texts_size),
+        Benchmark(
+            "clean() (large pages)",
+            clean_large_texts,
+            input_bytes=sum(len(text.encode("utf-8")) for text in large_texts),
+        ),
+        Benchmark("tokenize()", tokenize_texts, input_bytes=cleaned_size),
+        Benchmark(
+            "clean_and_tokenize_many()",
+            clean_and_tokenize_texts,
+            input_bytes=texts_size,
+        ),
+        Benchmark("KeywordMatcher (2000 keywords)", search_keywords, texts_size),
+        Benchmark("`in` checks (2000 keywords)", search_keywords_naive, texts_size),
+        Benchmark(
+            "export .jsonl.gz (json.dumps() per entry)", export_naive, texts_size
+        ),
+        Benchmark("export .jsonl.gz (JsonLinesSink)", export_jsonl, texts_size),
+    ]
+
+
+def format_results(results: List[Dict]) -> str:
+    """Formats benchmark results as a text table"""
+
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else "-"
+
+    lines = [
+        f"{'benchmark':<28} {'time [s]':>10} {'items':>10} {'items/s':>12} "
+        f"{'MB/s':>10} {'peak MB':>10}"
+    ]
+
+    for result in results:
+        lines.append(
+            f"{result['name']:<28} {result['seconds']:>10.3f} {result['items']:>10} "
+            f"{fmt(result['items_per_sec'], '>12.1f')} {fmt(result['mb_per_sec'], '>10.2f')} "
+            f"{fmt(result['peak_memory_mb'], '>10.2f')}"
+        )
+
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--revisions", type=int, default=1)
+    parser.add_argument("--text-size", type=int, default=4096)
+    parser.add_argument("--text-size-sigma", type=float, default=1.0)
+    parser.add_argument("--large-text-size", type=int, default=512 * 1024)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--compression", choices=("bz2", "7z"), default="bz2")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", help="run only benchmarks containing this string")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc")
+    parser.add_argument("--json", action="store_true", help="emit JSON")
+    args = parser.parse_args(argv)
+
+    with TemporaryDirectory(prefix="mediawiki_dump_bench") as tmp_dir:
+        dump_file = write_dump(
+            os.path.join(tmp_dir, f"dump.xml.{args.compression}"),
+            compression=args.compression,
+            pages=args.pages,
+            revisions=args.revisions,
+            text_size=args.text_size,
+            text_size_sigma=args.text_size_sigma,
+            seed=args.seed,
+        )
+
+        with LocalHttpServer(tmp_dir) as server:
+            results = [
+                benchmark.run(repeat=args.repeat, measure_memory=not args.no_memory)
+                for benchmark in get_benchmarks(
+                    dump_file, args.compression, server, args.large_text_size
+                )
+                if args.only is None or args.only in benchmark.name
+            ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(
+            f"Synthetic dump: {args.pages} pages x {args.revisions} revision(s), "
+            f"~{args.text_size} chars per revision, {args.compression}",
+            file=sys.stderr,
+        )
+        print(format_results(results))
+
+
+if __name__ == "__main__":
+    main()
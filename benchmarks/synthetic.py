@@ -0,0 +1,324 @@
+"""
+Generates synthetic MediaWiki XML dumps of a configurable size
+
+The generated wikitext mimics what can be found in Wikipedia articles (infoboxes, nested
+templates, links, headings, lists, tables, references, external links and categories),
+so that both the XML parser and the tokenizer have some real work to do.
+"""
+
+import bz2
+import os
+import random
+import re
+from datetime import datetime, timezone
+from hashlib import sha1
+from typing import Dict, Generator, List, Optional, Sequence, Union
+from xml.sax.saxutils import escape, quoteattr, unescape
+
+NAMESPACES = {
+    0: "",
+    1: "Talk",
+    2: "User",
+    4: "Project",
+    6: "File",
+    10: "Template",
+    14: "Category",
+}
+
+SYLLABLES = (
+    "ka ba ro fy ni sa lo ve tu mi da re kla vik oy ar um ing sta nor eys hav "
+    "berg fjør dal nes vág sund bø ðu ø á í ú"
+).split()
+
+
+def sha1_base36(text: str) -> str:
+    """Returns the SHA-1 of the text in the base36 form used by <sha1> dump nodes"""
+    value = int(sha1(text.encode("utf-8")).hexdigest(), 16)
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    encoded = ""
+
+    while value:
+        value, remainder = divmod(value, 36)
+        encoded = digits[remainder] + encoded
+
+    return encoded.rjust(31, "0")
+
+
+class WikitextGenerator:
+    """
+    Builds random, but deterministic (for a given seed) wikitext
+    """
+
+    def __init__(self, rnd: random.Random):
+        self.rnd = rnd
+
+    def word(self) -> str:
+        """A random word"""
+        return "".join(
+            self.rnd.choice(SYLLABLES) for _ in range(self.rnd.randint(1, 4))
+        )
+
+    def title(self) -> str:
+        """A random page title"""
+        return " ".join(self.word() for _ in range(self.rnd.randint(1, 3))).capitalize()
+
+    def sentence(self) -> str:
+        """A sentence with some inline markup"""
+        parts = []
+
+        for _ in range(self.rnd.randint(5, 20)):
+            chance = self.rnd.random()
+
+            if chance < 0.08:
+                parts.append(f"[[{self.title()}]]")
+            elif chance < 0.14:
+                parts.append(f"[[{self.title()}|{self.word()}]]")
+            elif chance < 0.17:
+                parts.append(f"'''{self.word()}'''")
+            elif chance < 0.20:
+                parts.append(f"''{self.word()}''")
+            elif chance < 0.22:
+                parts.append(f"{{{{lang|fo|{self.word()}}}}}")
+            elif chance < 0.24:
+                parts.append(str(self.rnd.randint(1, 2024)))
+            else:
+                parts.append(self.word())
+
+        sentence = " ".join(parts).capitalize() + "."
+
+        if self.rnd.random() < 0.2:
+            sentence += f"<ref>{{{{cite web|url=https://example.org/{self.word()}|title={self.title()}}}}}</ref>"
+
+        return sentence
+
+    def infobox(self) -> str:
+        """An infobox with nested templates"""
+        rows = [
+            f"| {self.word()} = {{{{convert|{self.rnd.randint(1, 999)}|km|mi|abbr=on}}}}",
+            f"| {self.word()} = [[{self.title()}]]",
+            f"| {self.word()} = {{{{birth date|1939|08|02|df=yes}}}}",
+            f"| website = {{{{URL|https://www.{self.word()}.fo}}}}",
+        ]
+        return "{{Infobox " + self.word() + "\n" + "\n".join(rows) + "\n}}"
+
+    def table(self) -> str:
+        """A simple wikitable"""
+        rows = "\n|-\n".join(
+            f"| {self.word()}\n| {self.rnd.randint(1, 100)}" for _ in range(3)
+        )
+        return '{| class="wikitable"\n! ' + self.word() + "\n|-\n" + rows + "\n|}"
+
+    def text(self, size: int) -> str:
+        """Generates wikitext of (roughly) the given size in characters"""
+        blocks = [self.infobox(), "__TOC__"]
+        length = sum(map(len, blocks))
+
+        while length < size:
+            chance = self.rnd.random()
+
+            if chance < 0.15:
+                block = f"== {self.title()} =="
+            elif chance < 0.25:
+                block = "\n".join(f"* {self.sentence()}" for _ in range(3))
+            elif chance < 0.28:
+                block = self.table()
+            elif chance < 0.31:
+                block = f"[https://www.{self.word()}.fo {self.title()}]"
+            else:
+                block = " ".join(self.sentence() for _ in range(self.rnd.randint(2, 6)))
+
+            blocks.append(block)
+            length += len(block) + 2
+
+        blocks.append(f"[[Category:{self.title()}]]")
+        return "\n\n".join(blocks)
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def generate_dump(
+    pages: int = 100,
+    revisions: Union[int, Sequence[int]] = 1,
+    text_size: int = 4096,
+    text_size_sigma: float = 1.0,
+    namespaces: Optional[Dict[int, float]] = None,
+    seed: int = 42,
+    lang: str = "en",
+    dbname: str = "enwiki",
+) -> Generator[str, None, None]:
+    """
+    Yields XML dump chunks (one per page)
+
+    :param pages: how many pages to generate
+    :param revisions: number of revisions per page, or a (min, max) range
+    :param text_size: median size of the revision text (in characters)
+    :param text_size_sigma: sigma of log-normal distribution of text size, 0 for a fixed size
+    :param namespaces: namespace ID -> weight, defaults to main namespace only
+    :param seed: seed of random numbers generator, the same seed gives the same dump
+    :param lang: xml:lang attribute of the dump
+    :param dbname: database name reported in <siteinfo>
+    """
+    rnd = random.Random(seed)
+    generator = WikitextGenerator(rnd)
+    namespaces = namespaces or {0: 1.0}
+
+    yield (
+        f'<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.11/" version="0.11" '
+        f'xml:lang="{lang}">\n'
+        "  <siteinfo>\n"
+        f"    <sitename>{dbname}</sitename>\n"
+        f"    <dbname>{dbname}</dbname>\n"
+        f"    <base>https://{lang}.wikipedia.org/wiki/Main_Page</base>\n"
+        "    <generator>MediaWiki 1.42.0-synthetic</generator>\n"
+        "  </siteinfo>\n"
+    )
+
+    revision_id = 0
+    timestamp = 979564500  # 2001-01-15
+
+    for page_id in range(1, pages + 1):
+        namespace = rnd.choices(list(namespaces), weights=list(namespaces.values()))[0]
+        prefix = NAMESPACES.get(namespace, f"Namespace{namespace}")
+        title = f"{prefix}:{generator.title()}" if prefix else generator.title()
+
+        if isinstance(revisions, int):
+            revisions_count = revisions
+        else:
+            revisions_count = rnd.randint(revisions[0], revisions[1])
+
+        chunk = [
+            "  <page>\n"
+            f"    <title>{escape(title)}</title>\n"
+            f"    <ns>{namespace}</ns>\n"
+            f"    <id>{page_id}</id>\n"
+        ]
+
+        size = int(text_size * rnd.lognormvariate(0, text_size_sigma))
+        text = generator.text(size)
+
+        for _ in range(revisions_count):
+            revision_id += 1
+            timestamp += rnd.randint(60, 86400)
+
+            # consecutive revisions differ a bit
+            if rnd.random() < 0.5:
+                text += "\n\n" + generator.sentence()
+
+            if rnd.random() < 0.8:
+                contributor = (
+                    f"<username>{escape(generator.word().capitalize())}</username>"
+                )
+            else:
+                contributor = (
+                    f"<ip>10.0.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}</ip>"
+                )
+
+            chunk.append(
+                "    <revision>\n"
+                f"      <id>{revision_id}</id>\n"
+                f"      <timestamp>{_format_timestamp(timestamp)}</timestamp>\n"
+                f"      <contributor>{contributor}</contributor>\n"
+                "      <model>wikitext</model>\n"
+                "      <format>text/x-wiki</format>\n"
+                f'      <text bytes={quoteattr(str(len(text.encode("utf-8"))))} '
+                f'xml:space="preserve">{escape(text)}</text>\n'
+                f"      <sha1>{sha1_base36(text)}</sha1>\n"
+                "    </revision>\n"
+            )
+
+        chunk.append("  </page>\n")
+        yield "".join(chunk)
+
+    yield "</mediawiki>\n"
+
+
+def _format_timestamp(timestamp: int) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime(
+        "%Y-%m-%dT%H:%M:%SZ"
+    )
+
+
+def write_multistream_dump(
+    path: str, index_path: str, pages_per_stream: int = 100, **kwargs
+) -> str:
+    """
+    Writes a synthetic dump as a multistream bz2 file (like the *-multistream.xml.bz2
+    Wikipedia dumps) together with the index of streams and returns its path.
+
+    The header, each group of pages_per_stream pages and the closing tag
+    are compressed as separate bz2 streams.
+    """
+    chunks = generate_dump(**kwargs)
+    header = next(chunks)
+
+    with open(path, mode="wb") as file, bz2.open(
+        index_path, mode="wt", encoding="utf-8"
+    ) as index:
+        file.write(bz2.compress(header.encode("utf-8")))
+        stream = []
+
+        for chunk in chunks:
+            if not chunk.startswith("  <page>"):
+                footer = chunk
+                break
+
+            stream.append(chunk)
+
+            if len(stream) == pages_per_stream:
+                _write_stream(file, index, stream)
+                stream = []
+
+        if stream:
+            _write_stream(file, index, stream)
+
+        file.write(bz2.compress(footer.encode("utf-8")))
+
+    return path
+
+
+def _write_stream(file, index, pages: List[str]):
+    offset = file.tell()
+
+    for page in pages:
+        page_id = re.search(r"<id>(\d+)</id>", page).group(1)
+        title = unescape(re.search(r"<title>([^<]+)</title>", page).group(1))
+        index.write(f"{offset}:{page_id}:{title}\n")
+
+    file.write(bz2.compress("".join(pages).encode("utf-8")))
+
+
+def write_dump(path: str, compression: Optional[str] = None, **kwargs) -> str:
+    """
+    Writes a synthetic dump to a given file and returns its path
+
+    :param compression: None for a plain XML, "bz2" or "7z"
+    :param kwargs: passed to generate_dump()
+    """
+    if compression is None:
+        with open(path, mode="wt", encoding="utf-8") as file:
+            file.writelines(generate_dump(**kwargs))
+    elif compression == "bz2":
+        with bz2.open(path, mode="wt", encoding="utf-8") as file:
+            file.writelines(generate_dump(**kwargs))
+    elif compression == "7z":
+        # pylint: disable=import-outside-toplevel
+        import libarchive
+
+        # libarchive needs to know the entry size upfront
+        plain_path = path + ".xml.tmp"
+        write_dump(plain_path, **kwargs)
+
+        try:
+            with libarchive.file_writer(path, "7zip") as archive, open(
+                plain_path, "rb"
+            ) as file:
+                archive.add_file_from_memory(
+                    entry_path=os.path.basename(path).replace(".7z", ""),
+                    entry_size=os.path.getsize(plain_path),
+                    entry_data=iter(lambda: file.read(1024 * 1024), b""),
+                )
+        finally:
+            os.unlink(plain_path)
+    else:
+        raise ValueError(f"Unsupported compression: {compression}")
+
+    return path
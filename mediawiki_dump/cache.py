@@ -0,0 +1,160 @@
+"""
+A persistent, content-addressed cache of cleaned up and tokenized texts
+
+Entries are keyed by the SHA-1 of the revision text (see DumpEntry.sha1), so pages
+that did not change between two dumps are not cleaned up and tokenized again.
+"""
+
+import sqlite3
+from typing import Dict, Iterable, List, Tuple
+
+# bump it when clean() or tokenize() results change, the cache will be emptied then
+CACHE_VERSION = "2"
+
+
+class TextCache:
+    """
+    SQLite-backed key-value store with size-bounded eviction of the least recently used entries
+    """
+
+    def __init__(self, path: str, max_size: int = 1024**3):
+        """
+        :param path: SQLite database file
+        :param max_size: the total size of cached values (in bytes) above which
+            the least recently used entries are evicted
+        """
+        self.path = path
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+            """
+        )
+
+        version = self.connection.execute(
+            "SELECT value FROM meta WHERE name = 'version'"
+        ).fetchone()
+
+        if version is None or version[0] != CACHE_VERSION:
+            self.clear()
+
+        self.size, self.clock = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0), COALESCE(MAX(accessed), 0) FROM cache"
+        ).fetchone()
+
+    def clear(self):
+        """Removes all entries"""
+        with self.connection:
+            self.connection.execute("DELETE FROM cache")
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('version', ?)", (CACHE_VERSION,)
+            )
+
+        self.size = 0
+        self.clock = 0
+
+    def get_many(self, namespace: str, keys: List[str]) -> Dict[str, str]:
+        """Returns cached values for given keys (missing ones are skipped)"""
+        self.clock += 1
+        found = {}
+
+        # SQLite limits the number of variables in a single query
+        for start in range(0, len(keys), 500):
+            batch = [f"{namespace}:{key}" for key in keys[start : start + 500]]
+            placeholders = ",".join("?" * len(batch))
+
+            for cache_key, value in self.connection.execute(
+                f"SELECT key, value FROM cache WHERE key IN ({placeholders})", batch
+            ):
+                found[cache_key[len(namespace) + 1 :]] = value
+
+        if found:
+            with self.connection:
+                self.connection.executemany(
+                    "UPDATE cache SET accessed = ? WHERE key = ?",
+                    ((self.clock, f"{namespace}:{key}") for key in found),
+                )
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+
+        return found
+
+    def set_many(self, namespace: str, items: Iterable[Tuple[str, str]]):
+        """Stores (key, value) items, evicts the least recently used entries when needed"""
+        self.clock += 1
+        rows = [
+            (f"{namespace}:{key}", value, len(value.encode("utf-8")), self.clock)
+            for key, value in items
+        ]
+
+        with self.connection:
+            for cache_key, _, _, _ in rows:
+                # keep the total size in sync when replacing existing entries
+                self.size -= self.connection.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM cache WHERE key = ?",
+                    (cache_key,),
+                ).fetchone()[0]
+
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)", rows
+            )
+
+        self.size += sum(row[2] for row in rows)
+
+        if self.size > self.max_size:
+            self.evict(int(self.max_size * 0.9))
+
+    def evict(self, target_size: int):
+        """Removes the least recently used entries until the cache fits in target_size"""
+        removed = []
+        size = self.size
+
+        for cache_key, entry_size in self.connection.execute(
+            "SELECT key, size FROM cache ORDER BY accessed"
+        ):
+            if size <= target_size:
+                break
+
+            removed.append((cache_key,))
+            size -= entry_size
+
+        with self.connection:
+            self.connection.executemany("DELETE FROM cache WHERE key = ?", removed)
+
+        self.size = size
+
+    def get(self, namespace: str, key: str):
+        """Returns a cached value or None"""
+        return self.get_many(namespace, [key]).get(key)
+
+    def set(self, namespace: str, key: str, value: str):
+        """Stores a value"""
+        self.set_many(namespace, [(key, value)])
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def close(self):
+        """Closes the database"""
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
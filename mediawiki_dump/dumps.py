@@ -4,16 +4,27 @@ CLasses that support fetching dumps
 
 import bz2
 import logging
+import mmap
+import os
+import re
+import sys
 
-from typing import Generator, Iterator
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Generator, Iterable, Iterator, List, Optional, Tuple
 
 from hashlib import md5
 from os.path import isfile
 from tempfile import gettempdir
 
-from mwclient import Site
-import requests
-from requests.exceptions import HTTPError
+from .utils import iter_chunks
+
+# network dependencies are optional and imported when needed
+if TYPE_CHECKING:  # pragma: no cover
+    import requests
+    from mwclient import Site
+
+USER_AGENT = "python-mediawiki-dump (+https://github.com/macbre/mediawiki-dump)"
 
 
 class DumpError(Exception):
@@ -22,6 +33,20 @@ class DumpError(Exception):
     """
 
 
+def _import_requests():
+    """Imports requests package, it's only needed when dumps are fetched"""
+    try:
+        # pylint:disable=import-outside-toplevel
+        import requests
+    except ImportError as ex:
+        raise DumpError(
+            "requests package needs to be installed to fetch dumps, "
+            "use pip install mediawiki_dump[http]"
+        ) from ex
+
+    return requests
+
+
 class BaseDump:
     """
     A generic dump class
@@ -39,14 +64,27 @@ class BaseDump:
         self.wiki = wiki
         self.logger = logging.getLogger(self.__class__.__name__)
 
-        self.http = requests.session()
-        self.http.headers["User-Agent"] = (
-            "python-mediawiki-dump (+https://github.com/macbre/mediawiki-dump)"
-        )
+        # HTTP session is created on first use, see http property
+        self._http = None
 
         # do we want a full history or just the latest revisions?
         self.full_history = full_history
 
+    @property
+    def http(self) -> "requests.Session":
+        """
+        :rtype: requests.Session
+        """
+        if self._http is None:
+            self._http = _import_requests().session()
+            self._http.headers["User-Agent"] = USER_AGENT
+
+        return self._http
+
+    @http.setter
+    def http(self, session: "requests.Session"):
+        self._http = session
+
     def get_cache_filename(self, url):
         """
         Return a hashed filename of cache entry for a given URL
@@ -90,7 +128,7 @@ class BaseDump:
             # raise an exception and do not set a cache entry
             try:
                 response.raise_for_status()
-            except HTTPError as ex:
+            except _import_requests().HTTPError as ex:
                 self.logger.error("Failed to fetch a dump", exc_info=True)
                 raise DumpError(
                     f"Failed to fetch a dump, request ended with HTTP {ex.response.status_code}"
@@ -115,10 +153,43 @@ class BaseDump:
         # pylint:disable=consider-using-with
         return open(cache_filename, "rb")
 
+    async def afetch(self):
+        """
+        Async variant of fetch(), the dump is fetched in a separate thread
+        so that the event loop is not blocked.
+        """
+        # pylint:disable=import-outside-toplevel
+        import asyncio
+
+        return await asyncio.to_thread(self.fetch)
+
     def get_content(self) -> Generator[str, None, None]:
         """Yields processed pieces of content"""
         raise NotImplementedError("fetch method needs to be implemented")
 
+    # pylint: disable=unused-argument
+    def get_shard_content(
+        self, index: int, count: int
+    ) -> Optional[Generator[bytes, None, None]]:
+        """
+        Returns the content of the index-th of count shards of the dump. Each shard
+        is a well-formed XML document and all of them together contain each page once.
+
+        None is returned when the dump can not be split, DumpReader then reads
+        the entire dump and filters pages by their IDs.
+        """
+        return None
+
+    def get_shard_page_ids(self, index: int, count: int) -> Optional[range]:
+        """
+        Returns the range of page IDs covered by the index-th of count shards
+        returned by get_shard_content(). Dumps list pages in the order of their IDs,
+        so each shard covers IDs from its first page up to the first page of the next one.
+
+        None is returned when the range is not known.
+        """
+        return None
+
 
 class WikipediaDump(BaseDump):
     """
@@ -168,9 +239,12 @@ class WikiaDump(BaseDump):
         try:
             # pylint:disable=import-outside-toplevel
             import libarchive
-        except AttributeError as ex:
+        except (AttributeError, ImportError) as ex:
             # AttributeError: undefined symbol: archive_errno
-            raise DumpError("Failed to import libarchive with 7zip support") from ex
+            raise DumpError(
+                "Failed to import libarchive with 7zip support, "
+                "use pip install mediawiki_dump[7z]"
+            ) from ex
 
         with self.fetch() as handler:
             with libarchive.file_reader(handler.name) as archive:
@@ -200,17 +274,141 @@ class LocalFileDump(IteratorDump):
     This class can be used to load locally stored XML dump file
     """
 
-    def __init__(self, dump_file: str):
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+        self,
+        dump_file: str,
+        use_mmap: bool = False,
+        start: int = 0,
+        end: Optional[int] = None,
+        window_size: int = 4 * 1024 * 1024,
+    ):
+        """
+        :param use_mmap: memory-map the file and pass its content to the parser
+            in window_size memoryview windows, without copying it
+        :param start: read pages starting at this byte offset (the first page
+            at or after it is taken), the XML header is always passed
+        :param end: read pages starting before this byte offset (the first page
+            at or after it is not read)
+        """
         super().__init__("")
         self.dump_file = dump_file
+        self.use_mmap = use_mmap
+        self.start = start
+        self.end = end
+        self.window_size = window_size
 
     def get_url(self):
         pass
 
     def get_content(self):
-        with open(self.dump_file, mode="rb") as fp:
-            self.iterator = fp
-            yield from super().get_content()
+        if self.start > 0 or self.end is not None:
+            yield from self._read_pages(self.start, self.end)
+        elif self.use_mmap:
+            yield from self._map_ranges([(0, None)])
+        else:
+            with open(self.dump_file, mode="rb") as fp:
+                self.iterator = fp
+                yield from super().get_content()
+
+    def _get_pages_range(self, file) -> Tuple[int, int]:
+        """Returns offsets of the first <page> and of the closing </mediawiki> tag"""
+        end = _rfind(file, b"</mediawiki>")
+        if end == -1:
+            raise DumpError(f"{self.dump_file} is not a complete XML dump")
+
+        first_page = _find(file, b"<page>", 0, end)
+        return (first_page if first_page != -1 else end), end
+
+    def _read_pages(
+        self, start: int, end: Optional[int]
+    ) -> Generator[bytes, None, None]:
+        with open(self.dump_file, mode="rb") as file:
+            first_page, pages_end = self._get_pages_range(file)
+
+            # align both offsets to the beginning of a page
+            boundaries = []
+            for offset in (start, end if end is not None else pages_end):
+                offset = max(first_page, min(offset, pages_end))
+                found = _find(file, b"<page>", offset, pages_end)
+                boundaries.append(found if found != -1 else pages_end)
+
+        return self._read_shard(first_page, boundaries[0], boundaries[1])
+
+    def get_shard_content(self, index: int, count: int):
+        """
+        Splits the file into count page-aligned byte ranges, each one is passed
+        with the XML header (<mediawiki> and <siteinfo>) and the closing tag
+        """
+        with open(self.dump_file, mode="rb") as file:
+            first_page, boundaries = self._get_shard_boundaries(file, count)
+
+        return self._read_shard(first_page, boundaries[index], boundaries[index + 1])
+
+    def get_shard_page_ids(self, index: int, count: int) -> range:
+        with open(self.dump_file, mode="rb") as file:
+            _, boundaries = self._get_shard_boundaries(file, count)
+            end = boundaries[-1]
+
+            first = _read_page_id(file, boundaries[index], end) if index > 0 else 0
+            following = _read_page_id(file, boundaries[index + 1], end)
+
+        if first is None:
+            # the shard is empty
+            return range(0)
+
+        return range(first, following if following is not None else sys.maxsize)
+
+    def _get_shard_boundaries(self, file, count: int) -> Tuple[int, List[int]]:
+        """
+        Returns the offset of the first <page> and count + 1 offsets of shard boundaries
+        """
+        first_page, end = self._get_pages_range(file)
+
+        # the k-th shard starts with the first page at or after k/n of the pages part
+        boundaries = [first_page]
+        for shard in range(1, count):
+            offset = first_page + (end - first_page) * shard // count
+            start = _find(file, b"<page>", offset, end)
+            boundaries.append(start if start != -1 else end)
+        boundaries.append(end)
+
+        return first_page, boundaries
+
+    def _read_shard(
+        self, header_end: int, start: int, end: int
+    ) -> Generator[bytes, None, None]:
+        if self.use_mmap:
+            yield from self._map_ranges([(0, header_end), (start, end)])
+        else:
+            with open(self.dump_file, mode="rb") as file:
+                yield from _read_range(file, 0, header_end)
+                yield from _read_range(file, start, end)
+
+        yield b"</mediawiki>\n"
+
+    def _map_ranges(
+        self, ranges: List[Tuple[int, Optional[int]]]
+    ) -> Generator[memoryview, None, None]:
+        """Yields memoryview windows of given byte ranges of the memory-mapped file"""
+        with open(self.dump_file, mode="rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size == 0:
+                return
+
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if hasattr(mmap, "MADV_SEQUENTIAL"):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+
+        # the mapping is closed when the last window is released
+        view = memoryview(mapped)
+
+        for start, end in ranges:
+            end = size if end is None else end
+
+            for offset in range(start, end, self.window_size):
+                yield view[offset : min(offset + self.window_size, end)]
 
 
 class StringDump(BaseDump):
@@ -247,40 +445,322 @@ class LocalWikipediaDump(WikipediaDump):
         return open(self.dump_file, "rb")
 
 
+class LocalMultistreamDump(LocalWikipediaDump):
+    """
+    This class can be used to load locally stored multistream bz2 dump file
+    (e.g. enwiki-latest-pages-articles-multistream.xml.bz2), its index file
+    (enwiki-latest-pages-articles-multistream-index.txt.bz2) is used to split it into shards.
+    """
+
+    def __init__(self, dump_file: str, index_file: str):
+        super().__init__(dump_file)
+        self.index_file = index_file
+
+    def get_index_entries(self) -> Generator[Tuple[int, int, str], None, None]:
+        """Yields (stream offset, page ID, title) tuples listed in the index file"""
+        opener = bz2.open if self.index_file.endswith(".bz2") else open
+
+        # each line is "offset:page_id:title"
+        with opener(self.index_file, mode="rt", encoding="utf-8") as index:
+            for line in index:
+                offset, page_id, title = line.rstrip("\n").split(":", 2)
+                yield int(offset), int(page_id), title
+
+    def get_stream_offsets(self) -> List[int]:
+        """Returns offsets of bz2 streams with pages, as listed in the index file"""
+        return self._get_streams()[0]
+
+    def _get_streams(self) -> Tuple[List[int], List[int]]:
+        """Returns offsets of bz2 streams and IDs of the first page in each of them"""
+        offsets, page_ids = [], []
+
+        for offset, page_id, _ in self.get_index_entries():
+            if not offsets or offsets[-1] != offset:
+                offsets.append(offset)
+                page_ids.append(page_id)
+
+        return offsets, page_ids
+
+    def get_content(self) -> Generator[bytes, None, None]:
+        with self.fetch() as file:
+            yield from _decompress_streams(file, 0, None)
+
+    def get_shard_content(self, index: int, count: int):
+        """
+        Splits streams listed in the index file into count ranges, each one is passed
+        with the first stream (<mediawiki> and <siteinfo>) and the closing tag
+        """
+        offsets = self.get_stream_offsets()
+
+        if not offsets:
+            raise DumpError(f"{self.index_file} does not list any streams")
+
+        start = offsets[len(offsets) * index // count]
+        end = (
+            offsets[len(offsets) * (index + 1) // count] if index + 1 < count else None
+        )
+
+        return self._read_streams(offsets[0], start, end, is_last=index + 1 == count)
+
+    def get_shard_page_ids(self, index: int, count: int) -> Optional[range]:
+        page_ids = self._get_streams()[1]
+        start = len(page_ids) * index // count
+        end = len(page_ids) * (index + 1) // count
+
+        if not page_ids:
+            return None
+
+        return range(
+            page_ids[start] if index > 0 else 0,
+            page_ids[end] if end < len(page_ids) else sys.maxsize,
+        )
+
+    def _read_streams(
+        self, header_end: int, start: int, end: Optional[int], is_last: bool
+    ) -> Generator[bytes, None, None]:
+        with self.fetch() as file:
+            yield from _decompress_streams(file, 0, header_end)
+
+            if start != end:
+                # the last stream contains the closing </mediawiki> tag
+                yield from _decompress_streams(file, start, end)
+
+        if not is_last:
+            yield b"</mediawiki>\n"
+
+
+def _find(file, token: bytes, start: int, end: int, block_size: int = 65536) -> int:
+    """Returns the offset of the first token in the file[start:end] or -1"""
+    file.seek(start)
+    position = start
+    previous = b""
+
+    while position < end:
+        block = file.read(min(block_size, end - position))
+        if not block:
+            break
+
+        data = previous + block
+        found = data.find(token)
+
+        if found != -1:
+            return position - len(previous) + found
+
+        # the token can be split between blocks
+        previous = data[-(len(token) - 1) :]
+        position += len(block)
+
+    return -1
+
+
+def _read_page_id(file, start: int, end: int) -> Optional[int]:
+    """Returns the ID of the page starting at the given offset or None when there is none"""
+    if start >= end:
+        return None
+
+    file.seek(start)
+    found = re.search(rb"<id>(\d+)</id>", file.read(min(4096, end - start)))
+    return int(found.group(1)) if found else None
+
+
+def _rfind(file, token: bytes, block_size: int = 65536) -> int:
+    """Returns the offset of the last token in the file or -1"""
+    size = file.seek(0, 2)
+    file.seek(max(0, size - block_size))
+
+    found = file.read().rfind(token)
+    return max(0, size - block_size) + found if found != -1 else -1
+
+
+def _read_range(
+    file, start: int, end: int, block_size: int = 65536
+) -> Generator[bytes, None, None]:
+    """Yields file[start:end] in blocks"""
+    file.seek(start)
+
+    while start < end:
+        block = file.read(min(block_size, end - start))
+        if not block:
+            break
+
+        start += len(block)
+        yield block
+
+
+def _decompress_streams(
+    file, start: int, end: Optional[int]
+) -> Generator[bytes, None, None]:
+    """Decompresses bz2 streams from the file[start:end] (till the end of file when None)"""
+    file.seek(start)
+    decompressor = bz2.BZ2Decompressor()
+
+    while end is None or start < end:
+        data = file.read(65536 if end is None else min(65536, end - start))
+        if not data:
+            break
+
+        start += len(data)
+
+        while data:
+            chunk = decompressor.decompress(data)
+            if chunk:
+                yield chunk
+
+            if decompressor.eof:  # pylint: disable=using-constant-test
+                # the next stream starts here
+                data = decompressor.unused_data
+                decompressor = bz2.BZ2Decompressor()
+            else:
+                data = b""
+
+
 class MediaWikiClientDump(BaseDump):
     """
     This class can be used to fetch "live" dumps from articles on any MediaWiki-powered site
     by using mwclient library
+
+    Articles are exported in batches of batch_size titles, up to "workers" requests
+    are sent concurrently. Responses are streamed to the parser in order, as they arrive.
     """
 
-    def __init__(self, site: Site, articles: Iterator[str]):
-        """You must provide a mwclient.Site instance and a iterator that yields article names"""
+    # the part of the response that can contain the closing </mediawiki> tag
+    TAIL_SIZE = 64
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+        self,
+        site: "Site",
+        articles: Iterator[str],
+        batch_size: int = 50,
+        workers: int = 4,
+        full_history: bool = False,
+    ):
+        """
+        You must provide a mwclient.Site instance and a iterator that yields article names.
+        The iterator is consumed lazily, as batches are requested.
+        """
         # https://mwclient.readthedocs.io/en/latest/index.html
-        super().__init__("")
+        super().__init__("", full_history=full_history)
 
         self.site = site
-        self.articles = list(articles)
+        self.articles = articles
+        self.batch_size = batch_size
+        self.workers = workers
+
+        adapters = _import_requests().adapters
+
+        # let all concurrent requests keep their connection in the pool
+        self.site.connection.mount(
+            f"{self.site.scheme}://{self.site.host}",
+            adapters.HTTPAdapter(pool_maxsize=max(workers, adapters.DEFAULT_POOLSIZE)),
+        )
 
     def get_url(self) -> str:
         return self.site.host  # e.g. vim.wikia.com
 
-    def get_content(self) -> str:
-        return self.fetch()
+    def get_export_url(self) -> str:
+        """
+        :rtype: str
+        """
+        site = self.site
+        return f"{site.scheme}://{site.host}{site.path}index{site.ext}"
 
-    def fetch(self) -> str:
-        self.logger.info(
-            "Fetching %d pages from %s wiki", len(self.articles), self.get_url()
-        )
+    def fetch_batch(self, titles: List[str]) -> "requests.Response":
+        """Requests Special:Export for given titles, the response body is not read yet"""
+        self.logger.info("Fetching %d pages from %s wiki", len(titles), self.get_url())
 
         # https://www.mediawiki.org/wiki/Manual:Parameters_to_Special:Export
-        resp = self.site.raw_call(
-            script="index",
-            data={
-                "title": "Special:Export",
-                "curonly": "1",
-                "pages": "\n".join(self.articles),
-            },
-            http_method="GET",
+        params = {"title": "Special:Export", "pages": "\n".join(titles)}
+
+        if not self.full_history:
+            params["curonly"] = "1"
+
+        kwargs = dict(self.site.requests)
+        response = self.site.connection.get(
+            self.get_export_url(), params=params, stream=True, **kwargs
         )
 
-        return resp
+        try:
+            response.raise_for_status()
+        except _import_requests().HTTPError as ex:
+            response.close()
+            raise DumpError(
+                f"Failed to fetch a dump, request ended with HTTP {ex.response.status_code}"
+            ) from ex
+
+        return response
+
+    def fetch(self) -> Generator["requests.Response", None, None]:
+        """Yields Special:Export responses for batches of articles, in order"""
+        in_flight = deque()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            try:
+                for titles in iter_chunks(self.articles, self.batch_size):
+                    in_flight.append(pool.submit(self.fetch_batch, titles))
+
+                    if len(in_flight) >= self.workers:
+                        yield in_flight.popleft().result()
+
+                while in_flight:
+                    yield in_flight.popleft().result()
+            finally:
+                # the consumer stopped early, close the pending responses
+                for future in in_flight:
+                    if not future.cancel() and future.exception() is None:
+                        future.result().close()
+
+    def _splice(
+        self, chunks: Iterable[bytes], skip_header: bool
+    ) -> Generator[bytes, None, None]:
+        """
+        Passes the response without </mediawiki> closing tag,
+        when skip_header is set the <mediawiki> and <siteinfo> are skipped as well
+        """
+        buffer = b""
+
+        for chunk in chunks:
+            buffer += chunk
+
+            if skip_header:
+                pos = buffer.find(b"</siteinfo>")
+                if pos == -1:
+                    continue
+
+                buffer = buffer[pos + len(b"</siteinfo>") :]
+                skip_header = False
+
+            if len(buffer) > self.TAIL_SIZE:
+                yield buffer[: -self.TAIL_SIZE]
+                buffer = buffer[-self.TAIL_SIZE :]
+
+        pos = buffer.rfind(b"</mediawiki>")
+        yield buffer[:pos] if pos > -1 else buffer
+
+    def get_pages_content(
+        self, with_header: bool = True
+    ) -> Generator[bytes, None, None]:
+        """
+        Yields content of all Special:Export responses, without the closing </mediawiki> tag.
+        When with_header is False, the <mediawiki> and <siteinfo> are not yielded either.
+        """
+        skip_header = not with_header
+
+        for response in self.fetch():
+            with response:
+                yield from self._splice(
+                    response.iter_content(chunk_size=65536), skip_header=skip_header
+                )
+
+            skip_header = True
+
+        if skip_header is False:
+            # no articles were requested
+            yield b"<mediawiki>"
+
+    def get_content(self) -> Generator[bytes, None, None]:
+        """
+        Yields a single XML document made of all Special:Export responses
+        """
+        yield from self.get_pages_content()
+        yield b"</mediawiki>\n"
@@ -0,0 +1,281 @@
+"""
+Encodes tokenized pages as compact arrays of integer token IDs
+
+The encoded corpus is stored in a directory as:
+
+  * vocab.txt - tokens, one per line, the line number (starting from zero) is the token ID
+  * tokens.bin - token IDs of all pages concatenated (uint32, little-endian)
+  * offsets.bin - N+1 offsets (uint64, little-endian) of pages in tokens.bin (in tokens)
+  * pages.bin - N page IDs (uint64, little-endian)
+
+Binary files can be memory-mapped and sliced per page without copying them.
+"""
+
+import mmap
+import os
+import sys
+from array import array
+from collections import deque
+from typing import Callable, Dict, Generator, Iterable, List, Optional, Tuple, Union
+
+from .cache import TextCache
+from .dumps import DumpError
+from .entry import DumpEntry
+from .tokenizer import clean_and_tokenize_many, tokenize_filter
+
+VOCABULARY_FILE = "vocab.txt"
+TOKENS_FILE = "tokens.bin"
+OFFSETS_FILE = "offsets.bin"
+PAGES_FILE = "pages.bin"
+
+# on-disk format is little-endian
+_SWAP_BYTES = sys.byteorder != "little"
+
+
+def _map_array(path: str, typecode: str, mmaps: list) -> Union[memoryview, array]:
+    """
+    Memory-maps a binary file as an array of a given type (a zero-copy view), the mmap
+    object is appended to mmaps. Big-endian platforms get a byte-swapped copy.
+    """
+    with open(path, mode="rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return array(typecode)
+
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    mmaps.append(mapped)
+
+    if typecode == "B":
+        return memoryview(mapped)
+
+    if _SWAP_BYTES:
+        values = array(typecode, mapped)
+        values.byteswap()
+        return values
+
+    return memoryview(mapped).cast(typecode)
+
+
+def _unmap_arrays(views: Iterable[Union[memoryview, array]], mmaps: list):
+    """Releases views returned by _map_array() and closes their mmap objects"""
+    for values in views:
+        if isinstance(values, memoryview):
+            values.release()
+
+    for mapped in mmaps:
+        try:
+            mapped.close()
+        except BufferError:
+            # slices are still in use, let the garbage collector unmap it
+            pass
+
+
+class Vocabulary:
+    """
+    Interns tokens to consecutive integer IDs
+    """
+
+    def __init__(self, tokens: Optional[Iterable[str]] = None):
+        self.ids: Dict[str, int] = {}
+        self.tokens: List[str] = []
+
+        for token in tokens or []:
+            self.add(token)
+
+    def add(self, token: str) -> int:
+        """Returns the ID of a given token, adds it to the vocabulary if needed"""
+        token_id = self.ids.get(token)
+
+        if token_id is None:
+            token_id = self.ids[token] = len(self.tokens)
+            self.tokens.append(token)
+
+        return token_id
+
+    def encode(self, tokens: Iterable[str], grow: bool = True) -> array:
+        """
+        Encodes tokens as an array of IDs.
+        When grow is False, tokens that are not in the vocabulary are skipped.
+        """
+        if grow:
+            return array("I", map(self.add, tokens))
+
+        ids = self.ids
+        return array("I", (ids[token] for token in tokens if token in ids))
+
+    def decode(self, ids: Iterable[int]) -> List[str]:
+        """Maps IDs back to tokens"""
+        return [self.tokens[token_id] for token_id in ids]
+
+    def save(self, path: str):
+        """Stores the vocabulary in a text file, one token per line"""
+        with open(path, mode="wt", encoding="utf-8") as file:
+            file.writelines(f"{token}\n" for token in self.tokens)
+
+    @classmethod
+    def load(cls, path: str) -> "Vocabulary":
+        """Reads the vocabulary stored by save()"""
+        with open(path, mode="rt", encoding="utf-8") as file:
+            return cls(line.rstrip("\n") for line in file)
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self.ids
+
+    def __getitem__(self, token_id: int) -> str:
+        return self.tokens[token_id]
+
+
+def _write_array(file, values: array):
+    if _SWAP_BYTES:
+        values = array(values.typecode, values)
+        values.byteswap()
+
+    values.tofile(file)
+
+
+class CorpusWriter:
+    """
+    Writes encoded pages to a directory, see the module docstring for the format
+    """
+
+    def __init__(self, directory: str, vocabulary: Optional[Vocabulary] = None):
+        self.directory = directory
+        self.vocabulary = vocabulary if vocabulary is not None else Vocabulary()
+
+        os.makedirs(directory, exist_ok=True)
+
+        # pylint:disable=consider-using-with
+        self.tokens_file = open(os.path.join(directory, TOKENS_FILE), mode="wb")
+        self.offsets_file = open(os.path.join(directory, OFFSETS_FILE), mode="wb")
+        self.pages_file = open(os.path.join(directory, PAGES_FILE), mode="wb")
+
+        self.offset = 0
+        _write_array(self.offsets_file, array("Q", [0]))
+
+    def add(self, tokens: Iterable[str], page_id: int = 0) -> array:
+        """Encodes and stores the tokens of a page, returns the array of IDs"""
+        ids = self.vocabulary.encode(tokens)
+
+        self.offset += len(ids)
+
+        _write_array(self.tokens_file, ids)
+        _write_array(self.offsets_file, array("Q", [self.offset]))
+        _write_array(self.pages_file, array("Q", [page_id]))
+
+        return ids
+
+    def close(self):
+        """Flushes the files and stores the vocabulary"""
+        for file in (self.tokens_file, self.offsets_file, self.pages_file):
+            file.close()
+
+        self.vocabulary.save(os.path.join(self.directory, VOCABULARY_FILE))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class EncodedCorpus:
+    """
+    Memory-maps the corpus stored by CorpusWriter and gives access to pages' token IDs
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.vocabulary = Vocabulary.load(os.path.join(directory, VOCABULARY_FILE))
+
+        self._mmaps = []
+        self.tokens = self._map(TOKENS_FILE, "I")
+        self.offsets = self._map(OFFSETS_FILE, "Q")
+        self.page_ids = self._map(PAGES_FILE, "Q")
+
+    def _map(self, file_name: str, typecode: str) -> Union[memoryview, array]:
+        return _map_array(
+            os.path.join(self.directory, file_name), typecode, self._mmaps
+        )
+
+    def __len__(self) -> int:
+        return len(self.page_ids)
+
+    def __getitem__(self, index: int) -> Union[memoryview, array]:
+        """Returns token IDs of the page with a given index (a zero-copy slice)"""
+        if not 0 <= index < len(self):
+            raise IndexError(f"Page index out of range: {index}")
+
+        return self.tokens[self.offsets[index] : self.offsets[index + 1]]
+
+    def get_numpy(self, index: int):
+        """Returns token IDs of the page with a given index as a NumPy array (zero-copy)"""
+        try:
+            # pylint:disable=import-outside-toplevel
+            import numpy
+        except ImportError as ex:
+            raise DumpError("numpy needs to be installed to use get_numpy()") from ex
+
+        return numpy.frombuffer(self[index], dtype=numpy.uint32)
+
+    def decode(self, index: int) -> List[str]:
+        """Returns tokens of the page with a given index"""
+        return self.vocabulary.decode(self[index])
+
+    def close(self):
+        """Unmaps the files"""
+        _unmap_arrays((self.tokens, self.offsets, self.page_ids), self._mmaps)
+
+        self.tokens = self.offsets = self.page_ids = array("I")
+        self._mmaps = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _tokenize_pages(
+    entries: Iterable[DumpEntry],
+    filter_func: Callable,
+    workers: int,
+    cache: Optional[TextCache],
+) -> Generator[Tuple[int, List[str]], None, None]:
+    """Yields (page ID, tokens) tuples, pages are tokenized by worker processes"""
+    # keep the IDs of pages that are being processed by workers
+    page_ids = deque()
+
+    def get_entries():
+        for entry in entries:
+            page_ids.append(entry.page_id)
+            yield entry
+
+    for tokens in clean_and_tokenize_many(
+        get_entries(), filter_func, workers=workers, cache=cache
+    ):
+        yield page_ids.popleft(), tokens
+
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments
+def encode_pages(
+    entries: Iterable[DumpEntry],
+    directory: str,
+    vocabulary: Optional[Vocabulary] = None,
+    filter_func: Callable = tokenize_filter,
+    workers: int = 1,
+    cache: Optional[TextCache] = None,
+) -> EncodedCorpus:
+    """
+    Cleans up, tokenizes and encodes pages (e.g. coming from DumpReader.read())
+    and stores them in a given directory. Returns the memory-mapped corpus.
+
+    :param cache: tokens of pages that did not change are taken from this cache
+    """
+    with CorpusWriter(directory, vocabulary) as writer:
+        for page_id, tokens in _tokenize_pages(entries, filter_func, workers, cache):
+            writer.add(tokens, page_id=page_id)
+
+    return EncodedCorpus(directory)
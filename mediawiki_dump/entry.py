@@ -22,6 +22,8 @@ class DumpEntry:
         revision_id: int,
         timestamp: str,
         contributor: str = None,
+        sha1: str = None,
+        redirect: str = None,
     ):
         self.namespace = namespace
         self.page_id = page_id
@@ -32,6 +34,16 @@ class DumpEntry:
         self.timestamp = timestamp
         self.contributor = contributor
 
+        # base36-encoded SHA-1 of the revision text, as provided in <sha1> node
+        self.sha1 = sha1
+
+        # the title of the redirect target, as provided in <redirect> node
+        self.redirect = redirect
+
+    def is_redirect(self) -> bool:
+        """Is this page a redirect?"""
+        return self.redirect is not None
+
     @property
     def unix_timestamp(self) -> float:
         """When was given article most recently edited"""
@@ -46,3 +58,17 @@ class DumpEntry:
         date = parse_date_string(self.timestamp).isoformat()
 
         return f'<{self.__class__.__name__} "{self.title}" by {contributor} at {date}>'
+
+
+class DuplicateEntry(DumpEntry):
+    """
+    A revision with the same text as an earlier revision of the page (e.g. a revert
+    or a null edit). The text is not kept, duplicate_of is the ID of that earlier revision.
+    """
+
+    def __init__(self, duplicate_of: int, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.duplicate_of = duplicate_of
+
+    def __repr__(self) -> str:
+        return f"{super().__repr__()[:-1]} (duplicate of #{self.duplicate_of})>"
@@ -0,0 +1,321 @@
+"""
+Exports DumpEntry objects as rows of JSON Lines, CSV or Parquet files
+
+Rows are serialized into a buffer that is written at once when it grows above buffer_size.
+Output can be compressed (bz2, gzip or zstd, taken from the path extension by default)
+and split into files of a given size, e.g. pages-{part:04d}.jsonl.gz -> pages-0000.jsonl.gz, ...
+"""
+
+import csv
+import io
+import json
+from collections import deque
+from operator import attrgetter
+from types import SimpleNamespace
+from typing import Iterable, List, Optional, Sequence
+
+from .dumps import DumpError
+from .entry import DumpEntry
+from .tokenizer import clean_many
+from .writer import _get_compression, _open_file
+
+DEFAULT_FIELDS = (
+    "page_id",
+    "namespace",
+    "title",
+    "revision_id",
+    "timestamp",
+    "contributor",
+    "sha1",
+    "redirect",
+    "content",
+)
+
+# gzip's default level (9) is about three times slower than 6 for a few percent smaller output
+DEFAULT_COMPRESSION_LEVELS = {"gzip": 6}
+
+
+# pylint: disable=too-many-instance-attributes
+class BaseSink:
+    """
+    Serializes rows into a buffer and writes it to (possibly rotated) output files
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+        self,
+        path: str,
+        fields: Sequence[str] = DEFAULT_FIELDS,
+        compression: Optional[str] = None,
+        buffer_size: int = 1024 * 1024,
+        max_file_size: Optional[int] = None,
+        compression_level: Optional[int] = None,
+    ):
+        """
+        :param path: output file, needs a {part} placeholder when max_file_size is set
+        :param fields: DumpEntry attributes that are written, in this order
+        :param compression: "bz2", "gzip", "zstd" or None, taken from the path extension by default
+        :param compression_level: see DEFAULT_COMPRESSION_LEVELS for the default one
+        :param buffer_size: serialized rows are written when the buffer grows above this size
+        :param max_file_size: start a new file when this many (uncompressed) bytes
+            were written to the current one
+        """
+        if max_file_size is not None and "{part" not in path:
+            raise ValueError("The path needs a {part} placeholder to rotate files")
+
+        self.path = path
+        self.fields = tuple(fields)
+        self.compression = compression
+        self.compression_level = compression_level
+        self.buffer_size = buffer_size
+        self.max_file_size = max_file_size
+
+        # returns a tuple of fields' values
+        self._get_row = (
+            attrgetter(*self.fields)
+            if len(self.fields) > 1
+            else lambda entry: (getattr(entry, self.fields[0]),)
+        )
+
+        self.buffer: list = []
+        self.buffered_size = 0
+
+        self.file = None
+        self.file_size = 0
+
+        # paths of files written so far
+        self.files: List[str] = []
+        self.rows_count = 0
+
+    def write(self, entry: DumpEntry, content: Optional[str] = None):
+        """
+        Adds a row with fields of a given entry
+
+        :param content: used instead of entry.content, e.g. the text cleaned up by clean()
+        """
+        row = self._get_row(entry)
+
+        if content is not None and "content" in self.fields:
+            index = self.fields.index("content")
+            row = row[:index] + (content,) + row[index + 1 :]
+
+        self._append_row(row)
+        self.rows_count += 1
+
+        if self.buffered_size >= self.buffer_size:
+            self.flush()
+
+    def write_many(self, entries: Iterable[DumpEntry]):
+        """Adds rows with fields of given entries"""
+        for entry in entries:
+            self.write(entry)
+
+    def _append_row(self, row: tuple):
+        """Serializes the row and appends it to the buffer"""
+        raise NotImplementedError("_append_row method needs to be implemented")
+
+    def _append(self, data: str):
+        self.buffer.append(data)
+        self.buffered_size += len(data)
+
+    def _get_header(self) -> str:
+        """Written at the beginning of each file"""
+        return ""
+
+    def _open(self, path: str):
+        compression = self.compression or _get_compression(path)
+        level = self.compression_level or DEFAULT_COMPRESSION_LEVELS.get(compression)
+
+        return _open_file(path, compression, level)
+
+    def _open_next(self):
+        """Closes the current file and opens the next one"""
+        self._close_file()
+
+        path = self.path.format(part=len(self.files))
+        self.file = self._open(path)
+        self.files.append(path)
+
+        header = self._get_header().encode("utf-8")
+        self.file.write(header)
+        self.file_size = len(header)
+
+    def _close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def _write_buffer(self) -> int:
+        """Writes the buffer to self.file, returns the number of bytes written"""
+        data = "".join(self.buffer).encode("utf-8")
+        self.file.write(data)
+        return len(data)
+
+    def flush(self):
+        """Writes the buffered rows"""
+        if not self.buffer:
+            return
+
+        if self.file is None or (
+            self.max_file_size is not None and self.file_size >= self.max_file_size
+        ):
+            self._open_next()
+
+        self.file_size += self._write_buffer()
+        self.buffer = []
+        self.buffered_size = 0
+
+    def close(self):
+        """Writes the buffered rows and closes the file"""
+        self.flush()
+
+        if self.file is None:
+            # always create a file, even when there are no rows
+            self._open_next()
+
+        self._close_file()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class JsonLinesSink(BaseSink):
+    """
+    Writes rows as JSON objects, one per line
+    """
+
+    # rows never contain circular references, non-ASCII characters are escaped
+    # (as json.dumps() does), the output is plain ASCII that is cheap to encode
+    _encoder = json.JSONEncoder(check_circular=False)
+
+    def _append_row(self, row: tuple):
+        self._append(self._encoder.encode(dict(zip(self.fields, row))) + "\n")
+
+
+class CsvSink(BaseSink):
+    """
+    Writes rows as CSV, each file starts with a header
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # rows are serialized straight into the buffer
+        self._writer = csv.writer(SimpleNamespace(write=self._append))
+
+    def _append_row(self, row: tuple):
+        self._writer.writerow(row)
+
+    def _get_header(self) -> str:
+        header = io.StringIO()
+        csv.writer(header).writerow(self.fields)
+        return header.getvalue()
+
+
+class ParquetSink(BaseSink):
+    """
+    Writes rows as Parquet files, each batch of rows is a row group. Needs pyarrow to be installed.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+        self,
+        path: str,
+        fields: Sequence[str] = DEFAULT_FIELDS,
+        compression: Optional[str] = "snappy",
+        batch_size: int = 10000,
+        max_file_size: Optional[int] = None,
+    ):
+        """
+        :param compression: Parquet compression codec, e.g. "snappy", "zstd", "gzip" or None
+        :param batch_size: rows in a row group
+        """
+        try:
+            # pylint:disable=import-outside-toplevel
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as ex:
+            raise DumpError(
+                "pyarrow package needs to be installed to write Parquet files"
+            ) from ex
+
+        # the buffer keeps rows, its size is the number of rows
+        super().__init__(path, fields, compression, batch_size, max_file_size)
+
+        self.pyarrow = pyarrow
+        self.parquet = pyarrow.parquet
+        self.schema = pyarrow.schema(
+            [(field, self._get_type(field)) for field in self.fields]
+        )
+        self.writer = None
+
+    def _get_type(self, field: str):
+        if field in ("page_id", "revision_id"):
+            return self.pyarrow.int64()
+        if field == "namespace":
+            return self.pyarrow.int32()
+        return self.pyarrow.string()
+
+    def _append_row(self, row: tuple):
+        self.buffer.append(row)
+        self.buffered_size += 1
+
+    def _open(self, path: str):
+        # pylint: disable=consider-using-with
+        file = open(path, mode="wb")
+        self.writer = self.parquet.ParquetWriter(
+            file, self.schema, compression=self.compression or "none"
+        )
+        return file
+
+    def _close_file(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+        super()._close_file()
+
+    def _write_buffer(self) -> int:
+        table = self.pyarrow.Table.from_arrays(
+            [
+                self.pyarrow.array(list(column), type=field.type)
+                for column, field in zip(zip(*self.buffer), self.schema)
+            ],
+            schema=self.schema,
+        )
+
+        start = self.file.tell()
+        self.writer.write_table(table)
+        return self.file.tell() - start
+
+
+def export_entries(
+    entries: Iterable[DumpEntry],
+    sink: BaseSink,
+    clean_text: bool = False,
+    workers: int = 1,
+) -> int:
+    """
+    Writes entries (e.g. coming from DumpReader.read()) to a given sink and closes it,
+    returns the number of rows written
+
+    :param clean_text: write the text cleaned up by clean() (using worker processes)
+    """
+    # keep the entries that are being processed by workers
+    pending = deque()
+
+    def get_entries():
+        for entry in entries:
+            pending.append(entry)
+            yield entry
+
+    with sink:
+        if clean_text:
+            for text in clean_many(get_entries(), workers=workers):
+                sink.write(pending.popleft(), content=text)
+        else:
+            sink.write_many(entries)
+
+    return sink.rows_count
@@ -0,0 +1,249 @@
+"""
+Word frequency counters that can process the entire dump in a bounded memory
+
+  * ExactWordCounter keeps all words in memory (a Counter)
+  * SpillingWordCounter gives exact counts too, but spills sorted runs of counts
+    to temporary files and merges them when results are requested
+  * TopWordsCounter estimates the most common words using a count-min sketch
+    and a bounded set of heavy hitters candidates
+"""
+
+import heapq
+import os
+import shutil
+from array import array
+from collections import Counter
+from hashlib import blake2b
+from itertools import groupby
+from operator import itemgetter
+from tempfile import mkdtemp
+from typing import Callable, Generator, Iterable, List, Optional, Tuple, Union
+
+from .cache import TextCache
+from .entry import DumpEntry
+from .tokenizer import clean, clean_and_tokenize_many, iter_tokens, tokenize_filter
+
+
+class BaseWordCounter:
+    """
+    A generic words counter
+    """
+
+    def __init__(self):
+        # the number of tokens counted so far
+        self.total = 0
+
+    def update(self, words: Iterable[str]):
+        """Counts the provided words"""
+        # count within a batch (usually a single page) first, it's much cheaper
+        counts = Counter(words)
+        self.total += sum(counts.values())
+        self.update_counts(counts)
+
+    def update_counts(self, counts: Counter):
+        """Merges the provided counts"""
+        raise NotImplementedError("update_counts method needs to be implemented")
+
+    def items(self) -> Iterable[Tuple[str, int]]:
+        """Yields (word, count) tuples"""
+        raise NotImplementedError("items method needs to be implemented")
+
+    def most_common(self, n: int) -> List[Tuple[str, int]]:
+        """Returns n most common words with their counts"""
+        return heapq.nlargest(n, self.items(), key=itemgetter(1))
+
+    def close(self):
+        """Releases resources used by the counter"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ExactWordCounter(BaseWordCounter):
+    """
+    Keeps counts of all words in memory
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.counts = Counter()
+
+    def update_counts(self, counts: Counter):
+        self.counts.update(counts)
+
+    def items(self) -> Iterable[Tuple[str, int]]:
+        return self.counts.items()
+
+    def most_common(self, n: int) -> List[Tuple[str, int]]:
+        return self.counts.most_common(n)
+
+
+class SpillingWordCounter(BaseWordCounter):
+    """
+    Gives exact counts, but keeps up to max_words distinct words in memory.
+    When the limit is reached, counts are sorted and written to a temporary file.
+    These sorted runs are merged when results are requested.
+    """
+
+    def __init__(self, max_words: int = 1_000_000, tmp_dir: Optional[str] = None):
+        super().__init__()
+        self.max_words = max_words
+        self.counts = Counter()
+
+        self.tmp_dir = mkdtemp(prefix="mediawiki_dump_words_", dir=tmp_dir)
+        self.runs = []
+
+    def update_counts(self, counts: Counter):
+        self.counts.update(counts)
+
+        if len(self.counts) >= self.max_words:
+            self.spill()
+
+    def spill(self):
+        """Writes the in-memory counts to a sorted run on disk"""
+        if not self.counts:
+            return
+
+        run_file = os.path.join(self.tmp_dir, f"run_{len(self.runs):05d}.tsv")
+
+        with open(run_file, mode="wt", encoding="utf-8") as file:
+            file.writelines(
+                f"{word}\t{count}\n" for word, count in sorted(self.counts.items())
+            )
+
+        self.runs.append(run_file)
+        self.counts = Counter()
+
+    @staticmethod
+    def _read_run(run_file: str) -> Generator[Tuple[str, int], None, None]:
+        with open(run_file, mode="rt", encoding="utf-8") as file:
+            for line in file:
+                word, count = line.rstrip("\n").split("\t")
+                yield word, int(count)
+
+    def items(self) -> Generator[Tuple[str, int], None, None]:
+        """Yields (word, count) tuples sorted by words"""
+        runs = [self._read_run(run_file) for run_file in self.runs]
+        runs.append(iter(sorted(self.counts.items())))
+
+        for word, group in groupby(heapq.merge(*runs), key=itemgetter(0)):
+            yield word, sum(count for _, count in group)
+
+    def close(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        self.runs = []
+
+
+class CountMinSketch:
+    """
+    Approximate counts of items in a fixed memory. Counts are never underestimated.
+
+    https://en.wikipedia.org/wiki/Count%E2%80%93min_sketch
+    """
+
+    def __init__(self, width: int = 2**20, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table = [array("Q", bytes(8 * width)) for _ in range(depth)]
+
+    def _indexes(self, item: str) -> Generator[int, None, None]:
+        # Kirsch-Mitzenmacher double hashing - two hashes are enough to simulate "depth" of them
+        digest = blake2b(item.encode("utf-8"), digest_size=16).digest()
+        hash1 = int.from_bytes(digest[:8], "little")
+        hash2 = int.from_bytes(digest[8:], "little")
+
+        for row in range(self.depth):
+            yield (hash1 + row * hash2) % self.width
+
+    def add(self, item: str, count: int = 1) -> int:
+        """Adds item to the sketch and returns its estimated count"""
+        estimate = None
+
+        for row, index in zip(self.table, self._indexes(item)):
+            row[index] += count
+            estimate = row[index] if estimate is None else min(estimate, row[index])
+
+        return estimate
+
+    def estimate(self, item: str) -> int:
+        """Returns the estimated count of the item"""
+        return min(row[index] for row, index in zip(self.table, self._indexes(item)))
+
+
+class TopWordsCounter(BaseWordCounter):
+    """
+    Estimates the most common words in a fixed memory.
+
+    Counts are kept in a count-min sketch and up to "capacity" words with the highest
+    estimated counts are tracked as heavy hitters candidates.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 10_000,
+        width: int = 2**20,
+        depth: int = 4,
+    ):
+        super().__init__()
+        self.capacity = capacity
+        self.sketch = CountMinSketch(width=width, depth=depth)
+
+        self.candidates = {}
+        self.threshold = 0  # words with lower estimates are not tracked
+
+    def update_counts(self, counts: Counter):
+        for word, count in counts.items():
+            estimate = self.sketch.add(word, count)
+
+            if word in self.candidates or estimate > self.threshold:
+                self.candidates[word] = estimate
+
+        if len(self.candidates) >= 2 * self.capacity:
+            self._prune()
+
+    def _prune(self):
+        """Keeps only "capacity" words with the highest estimates"""
+        kept = heapq.nlargest(self.capacity, self.candidates.items(), key=itemgetter(1))
+
+        self.candidates = dict(kept)
+        self.threshold = kept[-1][1] if kept else 0
+
+    def estimate(self, word: str) -> int:
+        """Returns the estimated count of a given word"""
+        return self.sketch.estimate(word)
+
+    def items(self) -> Iterable[Tuple[str, int]]:
+        """Yields heavy hitters candidates and their estimated counts"""
+        return self.candidates.items()
+
+
+def count_words(
+    items: Iterable[Union[str, DumpEntry]],
+    counter: Optional[BaseWordCounter] = None,
+    filter_func: Callable = tokenize_filter,
+    workers: int = 1,
+    cache: Optional[TextCache] = None,
+) -> BaseWordCounter:
+    """
+    Cleans up and tokenizes texts (or DumpEntry objects, e.g. from DumpReader.read())
+    and counts words using a given counter (ExactWordCounter by default).
+
+    :param workers: when more than one, texts are processed by clean_and_tokenize_many()
+    :param cache: tokens of pages that did not change are taken from this cache
+    """
+    counter = counter if counter is not None else ExactWordCounter()
+
+    if workers == 1 and cache is None:
+        for item in items:
+            text = item.content if isinstance(item, DumpEntry) else item
+            counter.update(iter_tokens(clean(text), filter_func))
+    else:
+        for tokens in clean_and_tokenize_many(
+            items, filter_func, workers=workers, cache=cache
+        ):
+            counter.update(tokens)
+
+    return counter
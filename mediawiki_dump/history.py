@@ -0,0 +1,249 @@
+"""
+A compact archive of full-history revisions
+
+Revisions of a page are stored as periodic full snapshots plus line-based deltas against
+the previous revision of the page. Both are zlib-compressed and kept in an SQLite database.
+Reconstructing a revision takes the nearest snapshot and at most snapshot_interval - 1 deltas.
+"""
+
+import json
+import sqlite3
+import zlib
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Union
+
+from .dumps import DumpError
+from .entry import DumpEntry, DuplicateEntry
+
+# a delta is a list of operations - [start, end] copies lines of the previous revision,
+# a string is the text inserted in the new revision
+Delta = List[Union[List[int], str]]
+
+
+def make_delta(old: str, new: str) -> Delta:
+    """Returns a line-based delta that turns the old text into the new one"""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+
+    delta = []
+    matcher = SequenceMatcher(None, old_lines, new_lines)
+
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == "equal":
+            delta.append([old_start, old_end])
+        elif new_end > new_start:
+            delta.append("".join(new_lines[new_start:new_end]))
+
+    return delta
+
+
+def apply_delta(old: str, delta: Delta) -> str:
+    """Returns the new text using the old one and the delta"""
+    old_lines = old.splitlines(keepends=True)
+
+    return "".join(
+        "".join(old_lines[op[0] : op[1]]) if isinstance(op, list) else op
+        for op in delta
+    )
+
+
+class HistoryArchive:
+    """
+    Stores revisions (e.g. coming from DumpReader.read() on a full history dump)
+    as snapshots and deltas, see the module docstring
+    """
+
+    def __init__(self, path: str, snapshot_interval: int = 20):
+        """
+        :param path: SQLite database file
+        :param snapshot_interval: every n-th revision of a page is stored in full
+        """
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS revisions (
+                revision_id INTEGER PRIMARY KEY,
+                page_id INTEGER NOT NULL,
+                parent_id INTEGER,
+                chain INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                data BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS revisions_page_id ON revisions (page_id);
+            """
+        )
+
+        # the most recently stored revision of each page: page_id -> (revision_id, text, chain)
+        self.last_revisions: Dict[int, tuple] = {}
+        self.pending = 0
+
+    def _get_last_revision(self, page_id: int, revision_id: int) -> Optional[tuple]:
+        """Returns the most recent stored revision of the page older than a given one"""
+        last = self.last_revisions.get(page_id)
+
+        if last is None or last[0] >= revision_id:
+            row = self.connection.execute(
+                "SELECT revision_id, chain FROM revisions "
+                "WHERE page_id = ? AND revision_id < ? "
+                "ORDER BY revision_id DESC LIMIT 1",
+                (page_id, revision_id),
+            ).fetchone()
+
+            last = (row[0], self.get(row[0]), row[1]) if row is not None else None
+
+        return last
+
+    def __contains__(self, revision_id: int) -> bool:
+        return (
+            self.connection.execute(
+                "SELECT 1 FROM revisions WHERE revision_id = ?", (revision_id,)
+            ).fetchone()
+            is not None
+        )
+
+    def add(self, entry: DumpEntry):
+        """
+        Stores the revision. DuplicateEntry objects (see DumpReader's dedup mode)
+        are stored as deltas against the revision they duplicate. Revisions that
+        are already archived are skipped, so the same dump can be archived again.
+        """
+        if entry.revision_id in self:
+            return
+
+        content = entry.content
+
+        if isinstance(entry, DuplicateEntry):
+            content = self.get(entry.duplicate_of)
+
+            if content is None:
+                raise DumpError(
+                    f"Revision #{entry.revision_id} is a duplicate of "
+                    f"#{entry.duplicate_of} that is not archived"
+                )
+
+        # the parent is always an older revision, so that delta chains have no cycles
+        last = self._get_last_revision(entry.page_id, entry.revision_id)
+
+        # chain is the number of deltas since the last snapshot
+        if last is None or last[2] + 1 >= self.snapshot_interval:
+            parent_id, chain, data = None, 0, content
+        else:
+            parent_id, chain = last[0], last[2] + 1
+            data = json.dumps(make_delta(last[1], content), ensure_ascii=False)
+
+        self.connection.execute(
+            "INSERT INTO revisions VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                entry.revision_id,
+                entry.page_id,
+                parent_id,
+                chain,
+                len(content.encode("utf-8")),
+                zlib.compress(data.encode("utf-8")),
+            ),
+        )
+
+        # keep only the last revision of the most recent page, revisions of a page
+        # come one after another in dumps
+        if entry.page_id not in self.last_revisions:
+            self.last_revisions.clear()
+        if entry.revision_id > self.last_revisions.get(entry.page_id, (0,))[0]:
+            self.last_revisions[entry.page_id] = (entry.revision_id, content, chain)
+
+        self.pending += 1
+        if self.pending >= 1000:
+            self.commit()
+
+    def add_many(self, entries: Iterable[DumpEntry]):
+        """Stores revisions"""
+        for entry in entries:
+            self.add(entry)
+
+        self.commit()
+
+    def commit(self):
+        """Writes pending revisions to the disk"""
+        self.connection.commit()
+        self.pending = 0
+
+    def get(self, revision_id: int) -> Optional[str]:
+        """Reconstructs the text of a given revision (None when it's not archived)"""
+        deltas = []
+        visited = set()
+
+        while True:
+            if revision_id in visited:
+                raise DumpError(
+                    f"The delta chain of revision #{revision_id} has a cycle"
+                )
+            visited.add(revision_id)
+
+            row = self.connection.execute(
+                "SELECT parent_id, data FROM revisions WHERE revision_id = ?",
+                (revision_id,),
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            parent_id, data = row
+            data = zlib.decompress(data).decode("utf-8")
+
+            if parent_id is None:
+                break
+
+            deltas.append(json.loads(data))
+            revision_id = parent_id
+
+        for delta in reversed(deltas):
+            data = apply_delta(data, delta)
+
+        return data
+
+    def get_revisions(self, page_id: int) -> List[int]:
+        """Returns IDs of archived revisions of a given page"""
+        return [
+            row[0]
+            for row in self.connection.execute(
+                "SELECT revision_id FROM revisions WHERE page_id = ? ORDER BY revision_id",
+                (page_id,),
+            )
+        ]
+
+    def get_stats(self) -> dict:
+        """Returns the number of revisions, their total size and the size of stored data"""
+        revisions, size, stored_size = self.connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) "
+            "FROM revisions"
+        ).fetchone()
+
+        return {"revisions": revisions, "size": size, "stored_size": stored_size}
+
+    def close(self):
+        """Commits pending revisions and closes the database"""
+        self.commit()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def archive_history(
+    entries: Iterable[DumpEntry], path: str, snapshot_interval: int = 20
+) -> HistoryArchive:
+    """
+    Stores revisions (e.g. coming from DumpReader.read() on a full history dump)
+    in the archive at a given path and returns it.
+    """
+    archive = HistoryArchive(path, snapshot_interval=snapshot_interval)
+    archive.add_many(entries)
+
+    return archive
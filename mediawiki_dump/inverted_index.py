@@ -0,0 +1,299 @@
+"""
+On-disk inverted index - maps words to IDs of pages that contain them
+
+The index is stored in a directory as:
+
+  * terms.bin - sorted terms (lowercase, UTF-8 encoded) concatenated
+  * terms_offsets.bin - N+1 offsets (uint64, little-endian) of terms in terms.bin
+  * postings.bin - sorted page IDs of each term, delta and varint encoded
+  * postings_offsets.bin - N+1 offsets (uint64, little-endian) of terms' postings
+
+The index is built in a bounded memory - postings are spilled to sorted runs
+on disk and merged at the end. Queries run directly on memory-mapped files.
+"""
+
+import heapq
+import os
+import shutil
+from array import array
+from itertools import groupby
+from operator import itemgetter
+from tempfile import mkdtemp
+from typing import Callable, Dict, Generator, Iterable, List, Optional, Tuple, Union
+
+from .cache import TextCache
+from .encoding import _map_array, _tokenize_pages, _unmap_arrays, _write_array
+from .entry import DumpEntry
+from .tokenizer import tokenize_filter
+
+TERMS_FILE = "terms.bin"
+TERMS_OFFSETS_FILE = "terms_offsets.bin"
+POSTINGS_FILE = "postings.bin"
+POSTINGS_OFFSETS_FILE = "postings_offsets.bin"
+
+
+def encode_postings(page_ids: Iterable[int]) -> bytes:
+    """Encodes sorted page IDs as varint-encoded deltas"""
+    encoded = bytearray()
+    previous = 0
+
+    for page_id in page_ids:
+        delta = page_id - previous
+        previous = page_id
+
+        # seven bits per byte, the highest bit is set when more bytes follow
+        while delta >= 0x80:
+            encoded.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        encoded.append(delta)
+
+    return bytes(encoded)
+
+
+def decode_postings(data: Union[bytes, memoryview]) -> List[int]:
+    """Decodes page IDs encoded by encode_postings()"""
+    page_ids = []
+    page_id = value = shift = 0
+
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+
+        if byte & 0x80:
+            shift += 7
+        else:
+            page_id += value
+            page_ids.append(page_id)
+            value = shift = 0
+
+    return page_ids
+
+
+class InvertedIndexWriter:
+    """
+    Collects postings of pages and writes the index to a directory, see the module docstring.
+    Keeps up to max_postings postings in memory, the rest is spilled to sorted runs.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_postings: int = 5_000_000,
+        tmp_dir: Optional[str] = None,
+    ):
+        self.directory = directory
+        self.max_postings = max_postings
+
+        self.postings: Dict[str, List[int]] = {}
+        self.postings_count = 0
+
+        self.tmp_dir = mkdtemp(prefix="mediawiki_dump_index_", dir=tmp_dir)
+        self.runs = []
+
+    def add(self, tokens: Iterable[str], page_id: int):
+        """Records the page as containing given tokens"""
+        for term in {token.lower() for token in tokens}:
+            self.postings.setdefault(term, []).append(page_id)
+            self.postings_count += 1
+
+        if self.postings_count >= self.max_postings:
+            self.spill()
+
+    def spill(self):
+        """Writes the in-memory postings to a sorted run on disk"""
+        if not self.postings:
+            return
+
+        run_file = os.path.join(self.tmp_dir, f"run_{len(self.runs):05d}.tsv")
+
+        with open(run_file, mode="wt", encoding="utf-8") as file:
+            file.writelines(
+                f"{term}\t{' '.join(map(str, page_ids))}\n"
+                for term, page_ids in sorted(self.postings.items())
+            )
+
+        self.runs.append(run_file)
+        self.postings = {}
+        self.postings_count = 0
+
+    @staticmethod
+    def _read_run(run_file: str) -> Generator[Tuple[str, List[int]], None, None]:
+        with open(run_file, mode="rt", encoding="utf-8") as file:
+            for line in file:
+                term, page_ids = line.rstrip("\n").split("\t")
+                yield term, [int(page_id) for page_id in page_ids.split(" ")]
+
+    def items(self) -> Generator[Tuple[str, List[int]], None, None]:
+        """Yields (term, sorted page IDs) tuples sorted by terms"""
+        runs = [self._read_run(run_file) for run_file in self.runs]
+        runs.append(iter(sorted(self.postings.items())))
+
+        for term, group in groupby(
+            heapq.merge(*runs, key=itemgetter(0)), itemgetter(0)
+        ):
+            page_ids = set()
+
+            for _, run_page_ids in group:
+                page_ids.update(run_page_ids)
+
+            yield term, sorted(page_ids)
+
+    def close(self):
+        """Merges the runs, writes the index and removes temporary files"""
+        os.makedirs(self.directory, exist_ok=True)
+
+        terms_offsets = array("Q", [0])
+        postings_offsets = array("Q", [0])
+
+        with open(
+            os.path.join(self.directory, TERMS_FILE), mode="wb"
+        ) as terms_file, open(
+            os.path.join(self.directory, POSTINGS_FILE), mode="wb"
+        ) as postings_file:
+            for term, page_ids in self.items():
+                terms_offsets.append(
+                    terms_offsets[-1] + terms_file.write(term.encode("utf-8"))
+                )
+                postings_offsets.append(
+                    postings_offsets[-1]
+                    + postings_file.write(encode_postings(page_ids))
+                )
+
+        for file_name, offsets in (
+            (TERMS_OFFSETS_FILE, terms_offsets),
+            (POSTINGS_OFFSETS_FILE, postings_offsets),
+        ):
+            with open(os.path.join(self.directory, file_name), mode="wb") as file:
+                _write_array(file, offsets)
+
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        self.runs = []
+        self.postings = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class InvertedIndex:
+    """
+    Memory-maps the index stored by InvertedIndexWriter and answers queries
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+        self._mmaps = []
+        self.terms = self._map(TERMS_FILE, "B")
+        self.terms_offsets = self._map(TERMS_OFFSETS_FILE, "Q")
+        self.postings = self._map(POSTINGS_FILE, "B")
+        self.postings_offsets = self._map(POSTINGS_OFFSETS_FILE, "Q")
+
+    def _map(self, file_name: str, typecode: str) -> Union[memoryview, array]:
+        return _map_array(
+            os.path.join(self.directory, file_name), typecode, self._mmaps
+        )
+
+    def __len__(self) -> int:
+        """The number of terms"""
+        return len(self.terms_offsets) - 1
+
+    def get_term(self, index: int) -> str:
+        """Returns the index-th term"""
+        start, end = self.terms_offsets[index], self.terms_offsets[index + 1]
+        return bytes(self.terms[start:end]).decode("utf-8")
+
+    def find(self, term: str) -> int:
+        """Returns the position of a given term in the dictionary or -1 (binary search)"""
+        encoded = term.lower().encode("utf-8")
+        low, high = 0, len(self)
+
+        while low < high:
+            middle = (low + high) // 2
+            start = self.terms_offsets[middle]
+            current = self.terms[start : self.terms_offsets[middle + 1]]
+
+            if current == encoded:
+                return middle
+            if bytes(current) < encoded:
+                low = middle + 1
+            else:
+                high = middle
+
+        return -1
+
+    def get_postings(self, term: str) -> List[int]:
+        """Returns sorted IDs of pages that contain a given term"""
+        index = self.find(term)
+
+        if index == -1:
+            return []
+
+        start, end = self.postings_offsets[index], self.postings_offsets[index + 1]
+        return decode_postings(self.postings[start:end])
+
+    def document_frequency(self, term: str) -> int:
+        """Returns the number of pages that contain a given term"""
+        return len(self.get_postings(term))
+
+    def search(self, *terms: str, match_all: bool = True) -> List[int]:
+        """
+        Returns sorted IDs of pages that contain all (or any, when match_all is False)
+        of given terms
+        """
+        # start with the rarest term, so that intersections stay small
+        postings = sorted((self.get_postings(term) for term in terms), key=len)
+
+        if not postings:
+            return []
+
+        result = set(postings[0])
+
+        for page_ids in postings[1:]:
+            if match_all:
+                result.intersection_update(page_ids)
+            else:
+                result.update(page_ids)
+
+        return sorted(result)
+
+    def close(self):
+        """Unmaps the files"""
+        _unmap_arrays(
+            (self.terms, self.terms_offsets, self.postings, self.postings_offsets),
+            self._mmaps,
+        )
+
+        self.terms = self.postings = array("B")
+        self.terms_offsets = self.postings_offsets = array("Q", [0])
+        self._mmaps = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments
+def build_inverted_index(
+    entries: Iterable[DumpEntry],
+    directory: str,
+    filter_func: Callable = tokenize_filter,
+    workers: int = 1,
+    cache: Optional[TextCache] = None,
+    max_postings: int = 5_000_000,
+) -> InvertedIndex:
+    """
+    Cleans up and tokenizes pages (e.g. coming from DumpReader.read()), indexes
+    their words and stores the index in a given directory. Returns the memory-mapped index.
+
+    :param cache: tokens of pages that did not change are taken from this cache
+    :param max_postings: the number of postings kept in memory before spilling them to disk
+    """
+    with InvertedIndexWriter(directory, max_postings=max_postings) as writer:
+        for page_id, tokens in _tokenize_pages(entries, filter_func, workers, cache):
+            writer.add(tokens, page_id=page_id)
+
+    return InvertedIndex(directory)
@@ -0,0 +1,271 @@
+"""
+Extracts links, categories, templates and external links from wikitext in a single scan
+
+Link graphs of many pages are stored in a directory as:
+
+  * titles.txt - titles of link targets, one per line, the line number (starting from zero)
+    is the title ID, categories and templates are stored with their namespace prefix
+  * links.bin, categories.bin, templates.bin - edges as (page ID, title ID) pairs
+    (uint32, little-endian)
+
+Binary files can be loaded by graph tools directly, e.g. numpy.fromfile(path, "<u4").reshape(-1, 2)
+"""
+
+import os
+import re
+from array import array
+from collections import deque
+from functools import partial
+from typing import Dict, Generator, Iterable, List, NamedTuple, Optional, Tuple
+
+from .encoding import Vocabulary, _SWAP_BYTES, _write_array
+from .entry import DumpEntry
+from .utils import parallel_map
+
+TITLES_FILE = "titles.txt"
+EDGE_KINDS = ("links", "categories", "templates")
+
+# quantifiers are bounded, so that unclosed markup is scanned in linear time
+_LINKS = re.compile(
+    r"(?P<comment><!--)"
+    # [[target#anchor|text]], text can contain single brackets
+    r"|\[\[(?P<target>[^\[\]{}|\n]+)(?:\|(?P<text>(?:[^\[\]]|\[(?!\[)|\](?!\]))*))?\]\]"
+    # {{name|...}}, but not {{{parameter}}}
+    r"|(?<!\{)\{\{(?!\{)\s*(?P<template>[^{}|<\n]+)"
+    r"|\[(?P<external_url>(?:https?:)?//[^\s\[\]]{1,2048})"
+    r"(?:\s+(?P<external_text>[^\]\n]{0,1024}))?\]"
+    r"|(?P<url>https?://[^\s<>\[\]{}|]+)"
+)
+
+
+class WikiLink(NamedTuple):
+    """[[target#anchor|text]]"""
+
+    target: str
+    anchor: Optional[str] = None
+    text: Optional[str] = None
+
+
+class ExternalLink(NamedTuple):
+    """[url text]"""
+
+    url: str
+    text: Optional[str] = None
+
+
+class PageLinks(NamedTuple):
+    """Links found in the page text, in the order of their appearance"""
+
+    links: List[WikiLink]
+    categories: List[str]
+    templates: List[str]
+    external_links: List[ExternalLink]
+
+
+def normalize_title(title: str) -> str:
+    """Normalizes the title the way MediaWiki does: "foo_bar " -> "Foo bar" """
+    title = " ".join(title.replace("_", " ").split())
+    return title[:1].upper() + title[1:]
+
+
+def _iter_matches(text: str) -> Generator[re.Match, None, None]:
+    """Yields _LINKS matches outside of <!-- comments -->"""
+    position = 0
+
+    # when there is no "-->" left, the remaining comments are not closed either
+    comments_closed = True
+
+    while True:
+        match = _LINKS.search(text, position)
+        if match is None:
+            return
+
+        position = match.end()
+
+        if match.lastgroup != "comment":
+            yield match
+        elif comments_closed:
+            # str.find() is used as a lazy regex makes unclosed comments quadratic
+            end = text.find("-->", position)
+
+            if end != -1:
+                position = end + len("-->")
+            else:
+                comments_closed = False
+
+
+def extract_links(
+    text: str, category_prefixes: Iterable[str] = ("Category",)
+) -> PageLinks:
+    """
+    Returns links, categories, templates and external links of a given wikitext.
+    Links to sections of the same page (e.g. [[#History]]) are skipped.
+
+    :param category_prefixes: names of the category namespace, e.g. ("Category", "Bólkur")
+    """
+    category_prefixes = {prefix.lower() for prefix in category_prefixes}
+    page_links = PageLinks([], [], [], [])
+
+    for match in _iter_matches(text):
+        kind = match.lastgroup
+
+        if kind in ("target", "text"):
+            target, _, anchor = match.group("target").partition("#")
+            prefix, colon, name = target.partition(":")
+
+            if colon and prefix.strip().lower() in category_prefixes:
+                page_links.categories.append(normalize_title(name))
+            else:
+                # [[:Category:Foo]] links to a category page
+                target = normalize_title(target.lstrip(":"))
+
+                # [[#History]] links to a section of the same page
+                if not target:
+                    continue
+
+                page_links.links.append(
+                    WikiLink(target, anchor.strip() or None, match.group("text"))
+                )
+        elif kind == "template":
+            name = match.group("template").strip()
+            prefix, colon, rest = name.partition(":")
+
+            # skip parser functions and magic words, e.g. {{#if:...}} or {{DEFAULTSORT:...}}
+            if colon:
+                if prefix.strip().lower() != "template":
+                    continue
+                name = rest
+
+            if name and not name.startswith("#"):
+                page_links.templates.append(normalize_title(name))
+        elif kind in ("external_url", "external_text"):
+            page_links.external_links.append(
+                ExternalLink(match.group("external_url"), match.group("external_text"))
+            )
+        elif kind == "url":
+            # punctuation that ends a sentence is not a part of the URL
+            url = match.group("url").rstrip(".,;:!?)'\"")
+            page_links.external_links.append(ExternalLink(url))
+
+    return page_links
+
+
+class LinkGraphWriter:
+    """
+    Writes edges of pages to a directory, see the module docstring for the format
+    """
+
+    def __init__(self, directory: str, vocabulary: Optional[Vocabulary] = None):
+        self.directory = directory
+        self.vocabulary = vocabulary if vocabulary is not None else Vocabulary()
+
+        os.makedirs(directory, exist_ok=True)
+
+        # pylint:disable=consider-using-with
+        self.files = {
+            kind: open(os.path.join(directory, f"{kind}.bin"), mode="wb")
+            for kind in EDGE_KINDS
+        }
+
+    def add(self, page_id: int, page_links: PageLinks):
+        """Stores the edges of a page, each target is stored once"""
+        targets = {
+            "links": (link.target for link in page_links.links),
+            "categories": (f"Category:{name}" for name in page_links.categories),
+            "templates": (f"Template:{name}" for name in page_links.templates),
+        }
+
+        for kind, titles in targets.items():
+            edges = array("I")
+
+            for title in dict.fromkeys(titles):
+                edges.append(page_id)
+                edges.append(self.vocabulary.add(title))
+
+            _write_array(self.files[kind], edges)
+
+    def close(self):
+        """Flushes the files and stores the titles"""
+        for file in self.files.values():
+            file.close()
+
+        self.vocabulary.save(os.path.join(self.directory, TITLES_FILE))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class LinkGraph:
+    """
+    Reads the link graph stored by LinkGraphWriter
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.vocabulary = Vocabulary.load(os.path.join(directory, TITLES_FILE))
+
+    def get_edges(self, kind: str = "links") -> array:
+        """Returns (page ID, title ID) pairs flattened into a single array"""
+        if kind not in EDGE_KINDS:
+            raise ValueError(f"Unknown kind of edges: {kind}")
+
+        edges = array("I")
+
+        with open(os.path.join(self.directory, f"{kind}.bin"), mode="rb") as file:
+            edges.frombytes(file.read())
+
+        if _SWAP_BYTES:
+            edges.byteswap()
+
+        return edges
+
+    def iter_edges(self, kind: str = "links") -> Generator[Tuple[int, str], None, None]:
+        """Yields (page ID, target title) tuples"""
+        edges = self.get_edges(kind)
+
+        for index in range(0, len(edges), 2):
+            yield edges[index], self.vocabulary[edges[index + 1]]
+
+    def get_targets(self, kind: str = "links") -> Dict[int, List[str]]:
+        """Returns titles of targets of each page"""
+        targets: Dict[int, List[str]] = {}
+
+        for page_id, title in self.iter_edges(kind):
+            targets.setdefault(page_id, []).append(title)
+
+        return targets
+
+
+def _extract_entry_links(category_prefixes: Tuple[str, ...], text: str) -> PageLinks:
+    """Runs in the worker process"""
+    return extract_links(text, category_prefixes)
+
+
+def write_link_graph(
+    entries: Iterable[DumpEntry],
+    directory: str,
+    category_prefixes: Iterable[str] = ("Category",),
+    workers: int = 1,
+) -> LinkGraph:
+    """
+    Extracts links of pages (e.g. coming from DumpReader.read()) using given number of
+    worker processes and stores them in a given directory. Returns the link graph.
+    """
+    # keep the IDs of pages that are being processed by workers
+    page_ids = deque()
+
+    def get_texts():
+        for entry in entries:
+            page_ids.append(entry.page_id)
+            yield entry.content
+
+    func = partial(_extract_entry_links, tuple(category_prefixes))
+
+    with LinkGraphWriter(directory) as writer:
+        for page_links in parallel_map(func, get_texts(), workers=workers):
+            writer.add(page_ids.popleft(), page_links)
+
+    return LinkGraph(directory)
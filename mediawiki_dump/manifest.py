@@ -0,0 +1,84 @@
+"""
+Manifest of a dump - the most recent revision ID and text SHA-1 of each page
+
+Manifests of two dump versions tell which pages were added, changed or deleted
+in between, see DumpReader's manifest and previous_manifest arguments.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class Manifest:
+    """
+    Maps page IDs to (revision ID, SHA-1) of their most recent revision
+    """
+
+    def __init__(self):
+        self.pages: Dict[int, Tuple[int, Optional[str]]] = {}
+
+    def add(self, page_id: int, revision_id: int, sha1: Optional[str] = None):
+        """Records the revision, unless a more recent one is already known"""
+        current = self.pages.get(page_id)
+
+        if current is None or revision_id >= current[0]:
+            self.pages[page_id] = (revision_id, sha1)
+
+    def get(self, page_id: int) -> Optional[Tuple[int, Optional[str]]]:
+        """Returns (revision ID, SHA-1) of a given page or None"""
+        return self.pages.get(page_id)
+
+    def is_changed(self, page_id: int, revision_id: int, sha1: Optional[str]) -> bool:
+        """
+        Is the revision newer than the one in this manifest, with a different text?
+        Pages that are not in the manifest are considered changed.
+        """
+        current = self.pages.get(page_id)
+
+        if current is None:
+            return True
+
+        if revision_id <= current[0]:
+            return False
+
+        # compare texts when SHA-1 is provided in both dumps
+        return sha1 is None or current[1] is None or sha1 != current[1]
+
+    def get_deleted(self, manifest: "Manifest") -> List[int]:
+        """Returns sorted IDs of pages that are in this manifest, but not in the given one"""
+        return sorted(self.pages.keys() - manifest.pages.keys())
+
+    def save(self, path: str):
+        """Stores the manifest in a TSV file"""
+        with open(path, mode="wt", encoding="utf-8") as file:
+            file.writelines(
+                f"{page_id}\t{revision_id}\t{sha1 or ''}\n"
+                for page_id, (revision_id, sha1) in sorted(self.pages.items())
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "Manifest":
+        """Reads the manifest stored by save()"""
+        manifest = cls()
+
+        with open(path, mode="rt", encoding="utf-8") as file:
+            for line in file:
+                page_id, revision_id, sha1 = line.rstrip("\n").split("\t")
+                manifest.add(int(page_id), int(revision_id), sha1 or None)
+
+        return manifest
+
+    @classmethod
+    def from_entries(cls, entries: Iterable) -> "Manifest":
+        """Builds the manifest from DumpEntry objects"""
+        manifest = cls()
+
+        for entry in entries:
+            manifest.add(entry.page_id, entry.revision_id, entry.sha1)
+
+        return manifest
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def __contains__(self, page_id: int) -> bool:
+        return page_id in self.pages
@@ -0,0 +1,248 @@
+"""
+Fetches and processes dumps of many wikis concurrently
+
+Dumps are fetched by a bounded pool of threads sharing a pool of HTTP connections.
+As soon as a dump is fetched, it's parsed by one of the worker processes.
+A failure of a single wiki does not stop the others.
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from queue import Empty
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Tuple,
+    Type,
+    Union,
+)
+
+from .dumps import USER_AGENT, BaseDump, WikipediaDump, _import_requests
+from .entry import DumpEntry
+from .parts import _start_worker, _stop_workers
+from .reader import DumpReader
+
+if TYPE_CHECKING:  # pragma: no cover
+    import requests
+
+
+def _aggregate(
+    reader_class: Type[DumpReader], reader_kwargs: dict, dump: BaseDump, func: Callable
+):
+    """Runs in the worker process"""
+    return func(reader_class(**reader_kwargs).read(dump))
+
+
+# pylint: disable=too-many-instance-attributes
+class MultiWikiReader:
+    """
+    Reads dumps of many wikis using a pool of fetching threads and worker processes
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+        self,
+        wikis: Iterable[Union[str, BaseDump]],
+        reader_class: Type[DumpReader] = DumpReader,
+        fetch_workers: int = 8,
+        workers: int = None,
+        max_queue_size: int = 64,
+        batch_size: int = 64,
+        **reader_kwargs,
+    ):
+        """
+        :param wikis: Wikipedia language codes (e.g. "fo") or BaseDump instances
+        :param reader_class: DumpReader or its subclass used to read each dump
+        :param fetch_workers: the number of dumps fetched at the same time
+        :param workers: the number of dumps parsed at the same time, defaults to the number of CPUs
+        :param reader_kwargs: passed to reader_class constructor
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self.reader_class = reader_class
+        self.reader_kwargs = reader_kwargs
+        self.fetch_workers = fetch_workers
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+
+        # all wikis share a pool of HTTP connections, created when the first one
+        # needs to be downloaded (see http property)
+        self._http = None
+
+        self.dumps: List[BaseDump] = []
+        self.names: List[str] = []
+
+        for wiki in wikis:
+            if isinstance(wiki, str):
+                dump = WikipediaDump(wiki)
+                dump.http = self.http
+            else:
+                dump = wiki
+
+            self.dumps.append(dump)
+            self.names.append(
+                dump.wiki or getattr(dump, "dump_file", None) or f"#{len(self.names)}"
+            )
+
+        # wiki -> the reason why it could not be processed
+        self.failures: Dict[str, str] = {}
+
+    @property
+    def http(self) -> "requests.Session":
+        """
+        :rtype: requests.Session
+        """
+        if self._http is None:
+            requests = _import_requests()
+
+            self._http = requests.session()
+            self._http.headers["User-Agent"] = USER_AGENT
+            self._http.mount(
+                "https://",
+                requests.adapters.HTTPAdapter(pool_maxsize=self.fetch_workers),
+            )
+
+        return self._http
+
+    def _fetch(self, dump: BaseDump):
+        """Fetches the dump to the local cache (in a thread)"""
+        url = dump.get_url()
+
+        if isinstance(url, str) and url.startswith("http"):
+            dump.fetch().close()
+
+    def _fail(self, index: int, reason: str):
+        self.logger.error("Failed to process %s: %s", self.names[index], reason)
+        self.failures[self.names[index]] = reason
+
+    def fetch(self) -> Generator[int, None, None]:
+        """
+        Fetches dumps and yields their indexes as soon as they're fetched
+        """
+        with ThreadPoolExecutor(max_workers=self.fetch_workers) as pool:
+            futures = {
+                pool.submit(self._fetch, dump): index
+                for index, dump in enumerate(self.dumps)
+            }
+
+            for future in as_completed(futures):
+                if future.exception() is not None:
+                    self._fail(futures[future], repr(future.exception()))
+                else:
+                    yield futures[future]
+
+    # pylint: disable=too-many-branches
+    def read(self) -> Generator[Tuple[str, DumpEntry], None, None]:
+        """
+        Yields (wiki, DumpEntry) tuples, entries of different wikis are interleaved.
+
+        Failed wikis are reported in the failures dict, some of their entries
+        may have been yielded before the failure.
+        """
+        queue = multiprocessing.Queue(maxsize=self.max_queue_size)
+        fetch_pool = ThreadPoolExecutor(max_workers=self.fetch_workers)
+
+        fetching = {
+            fetch_pool.submit(self._fetch, dump): index
+            for index, dump in enumerate(self.dumps)
+        }
+        fetched: List[int] = []
+        running: Dict[int, multiprocessing.Process] = {}
+
+        try:
+            while fetching or fetched or running:
+                if not (fetched or running):
+                    wait(fetching, return_when=FIRST_COMPLETED)
+
+                for future in [future for future in fetching if future.done()]:
+                    index = fetching.pop(future)
+
+                    if future.exception() is not None:
+                        self._fail(index, repr(future.exception()))
+                    else:
+                        fetched.append(index)
+
+                while fetched and len(running) < self.workers:
+                    index = fetched.pop(0)
+                    running[index] = _start_worker(
+                        self.reader_class,
+                        self.reader_kwargs,
+                        index,
+                        self.dumps[index],
+                        queue,
+                        self.batch_size,
+                    )
+
+                if not running:
+                    continue
+
+                try:
+                    kind, index, payload = queue.get(timeout=0.1)
+                except Empty:
+                    # a worker could have been killed without reporting it
+                    for index, process in list(running.items()):
+                        if not process.is_alive() and queue.empty():
+                            running.pop(index)
+                            self._fail(index, f"exited with code {process.exitcode}")
+                    continue
+
+                if kind == "entries":
+                    for entry in payload:
+                        yield self.names[index], entry
+                else:
+                    if kind == "error":
+                        self._fail(index, payload)
+
+                    running.pop(index).join()
+        finally:
+            _stop_workers(running, queue)
+            fetch_pool.shutdown(wait=False, cancel_futures=True)
+
+    def aggregate(self, func: Callable) -> Generator[Tuple[str, object], None, None]:
+        """
+        Calls func with DumpEntry objects of each wiki in a worker process
+        and yields (wiki, result) tuples in the order they're ready.
+
+        func needs to be picklable (i.e. defined at the module level),
+        failed wikis are reported in the failures dict.
+        """
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = {}
+
+            for index in self.fetch():
+                future = pool.submit(
+                    _aggregate,
+                    self.reader_class,
+                    self.reader_kwargs,
+                    self.dumps[index],
+                    func,
+                )
+                futures[future] = index
+
+                # yield results that are ready while fetching the rest
+                done, _ = wait(futures, timeout=0, return_when=FIRST_COMPLETED)
+                yield from self._collect(futures, done)
+
+            yield from self._collect(futures, list(futures))
+
+    def _collect(self, futures: dict, done: Iterable):
+        for future in as_completed(done):
+            index = futures.pop(future)
+
+            if future.exception() is not None:
+                self._fail(index, repr(future.exception()))
+            else:
+                yield self.names[index], future.result()
@@ -0,0 +1,262 @@
+"""
+Support for dumps split into multiple part files
+
+Large wikis publish their dumps as numbered part files, e.g.
+enwiki-20240101-pages-articles1.xml-p1p41242.bz2. Parts are discovered using
+dumpstatus.json (or a local directory listing) and read in parallel worker processes.
+"""
+
+import logging
+import multiprocessing
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from queue import Empty
+from typing import Dict, Generator, List, Optional, Type
+
+from .dumps import (
+    BaseDump,
+    DumpError,
+    LocalWikipediaDump,
+    WikipediaDump,
+    _import_requests,
+)
+from .entry import DumpEntry
+from .reader import DumpReader
+
+# e.g. enwiki-20240101-pages-articles1.xml-p1p41242.bz2
+PART_FILE = re.compile(r"-pages-[a-z-]+\d+\.xml-p(\d+)p(\d+)\.bz2$")
+
+
+class WikipediaPartDump(WikipediaDump):
+    """
+    A single part of Wikipedia dump, fetched from a given URL (and cached locally)
+    """
+
+    def __init__(self, wiki: str, url: str):
+        super().__init__(wiki)
+        self.url = url
+
+    def get_url(self):
+        return self.url
+
+
+def _sort_parts(file_names: List[str]) -> List[str]:
+    """Keeps part files only and sorts them by the range of page IDs"""
+    parts = [name for name in file_names if PART_FILE.search(name)]
+    return sorted(parts, key=lambda name: int(PART_FILE.search(name).group(1)))
+
+
+def get_dump_parts(
+    wiki: str, date: str = "latest", job: str = "articlesdump"
+) -> List[WikipediaPartDump]:
+    """
+    Returns parts of the Wikipedia dump listed in dumpstatus.json
+
+    :param wiki: e.g. "en"
+    :param date: e.g. "20240101"
+    :param job: "articlesdump" (pages-articles) or "metacurrentdump" (pages-meta-current)
+    """
+    requests = _import_requests()
+
+    url = f"https://dumps.wikimedia.org/{wiki}wiki/{date}/dumpstatus.json"
+    response = requests.get(url, timeout=30)
+
+    try:
+        response.raise_for_status()
+        files: Dict[str, dict] = response.json()["jobs"][job]["files"]
+    except (requests.HTTPError, KeyError, ValueError) as ex:
+        raise DumpError(f"Failed to get the list of dump parts from <{url}>") from ex
+
+    return [
+        WikipediaPartDump(wiki, f"https://dumps.wikimedia.org{files[name]['url']}")
+        for name in _sort_parts(list(files))
+    ]
+
+
+def get_local_parts(directory: str) -> List[LocalWikipediaDump]:
+    """
+    Returns parts of the dump stored in a local directory
+    """
+    return [
+        LocalWikipediaDump(os.path.join(directory, name))
+        for name in _sort_parts(os.listdir(directory))
+    ]
+
+
+def fetch_parts(dumps: List[BaseDump], workers: int = 4):
+    """
+    Fetches dump parts to the local cache, up to "workers" parts are fetched concurrently
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for file in pool.map(lambda dump: dump.fetch(), dumps):
+            file.close()
+
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments
+def _read_part(
+    reader_class: Type[DumpReader],
+    reader_kwargs: dict,
+    index: int,
+    dump: BaseDump,
+    queue,
+    batch_size: int,
+):
+    """Runs in the worker process"""
+    try:
+        reader = reader_class(**reader_kwargs)
+        batch = []
+
+        for entry in reader.read(dump):
+            batch.append(entry)
+
+            if len(batch) >= batch_size:
+                queue.put(("entries", index, batch))
+                batch = []
+
+        queue.put(("entries", index, batch))
+        queue.put(
+            (
+                "done",
+                index,
+                (reader.handler.get_metadata(), reader.handler.get_siteinfo()),
+            )
+        )
+    except Exception as ex:  # pylint: disable=broad-exception-caught
+        queue.put(("error", index, repr(ex)))
+
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments
+def _start_worker(
+    reader_class: Type[DumpReader],
+    reader_kwargs: dict,
+    index: int,
+    dump: BaseDump,
+    queue,
+    batch_size: int,
+) -> multiprocessing.Process:
+    """Starts the process that reads a given dump and puts its entries to the queue"""
+    process = multiprocessing.Process(
+        target=_read_part,
+        args=(reader_class, reader_kwargs, index, dump, queue, batch_size),
+        daemon=True,
+    )
+    process.start()
+    return process
+
+
+def _stop_workers(running: Dict[int, multiprocessing.Process], queue):
+    """Terminates workers that are still running"""
+    for process in running.values():
+        process.terminate()
+        process.join()
+
+    queue.close()
+
+
+# pylint: disable=too-many-instance-attributes
+class MultiPartReader:
+    """
+    Reads dump parts in parallel worker processes and emits a combined stream
+    of DumpEntry objects. Entries of a single part keep their order, but entries
+    of different parts are interleaved.
+    """
+
+    def __init__(
+        self,
+        reader_class: Type[DumpReader] = DumpReader,
+        workers: Optional[int] = None,
+        max_queue_size: int = 64,
+        batch_size: int = 64,
+        **reader_kwargs,
+    ):
+        """
+        :param reader_class: DumpReader or its subclass used to read each part
+        :param workers: the number of parts read at the same time, defaults to the number of CPUs
+        :param max_queue_size: batches of entries that wait to be consumed,
+            workers stop when the queue is full
+        :param reader_kwargs: passed to reader_class constructor (e.g. dedup)
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self.reader_class = reader_class
+        self.reader_kwargs = reader_kwargs
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+
+        self.metadata = None
+        self.siteinfo = {}
+
+    # pylint: disable=too-many-branches
+    def read(self, dumps: List[BaseDump]) -> Generator[DumpEntry, None, None]:
+        """Reads given dump parts and emits DumpEntry objects"""
+        queue = multiprocessing.Queue(maxsize=self.max_queue_size)
+        pending = list(enumerate(dumps))[::-1]
+        running: Dict[int, multiprocessing.Process] = {}
+
+        self.logger.info(
+            "Reading %d dump parts using %d workers", len(dumps), self.workers
+        )
+
+        def start_workers():
+            while pending and len(running) < self.workers:
+                index, dump = pending.pop()
+                running[index] = _start_worker(
+                    self.reader_class,
+                    self.reader_kwargs,
+                    index,
+                    dump,
+                    queue,
+                    self.batch_size,
+                )
+
+        try:
+            start_workers()
+
+            while running:
+                try:
+                    kind, index, payload = queue.get(timeout=1)
+                except Empty:
+                    # a worker could have been killed without reporting it
+                    for index, process in running.items():
+                        if not process.is_alive() and queue.empty():
+                            raise DumpError(  # pylint: disable=raise-missing-from
+                                f"Worker reading part #{index} exited with "
+                                f"code {process.exitcode}"
+                            )
+                    continue
+
+                if kind == "entries":
+                    yield from payload
+                elif kind == "done":
+                    if self.metadata is None:
+                        self.metadata, self.siteinfo = payload
+
+                    running.pop(index).join()
+                    self.logger.info("Dump part #%d read", index)
+                    start_workers()
+                else:
+                    raise DumpError(f"Failed to read dump part #{index}: {payload}")
+        finally:
+            _stop_workers(running, queue)
+
+    def get_dump_language(self) -> str:
+        """
+        :rtype: str
+        """
+        return self.metadata.get("xml:lang")
+
+    def get_siteinfo(self) -> dict:
+        """
+        :rtype: dict
+        """
+        return self.siteinfo
+
+    def get_base_url(self) -> str:
+        """
+        :rtype: str
+        """
+        # see DumpHandler.get_base_url()
+        main_page = str(self.siteinfo.get("base"))
+        return "/".join(main_page.split("/")[0:-1]) + "/"
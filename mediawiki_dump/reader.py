@@ -5,13 +5,21 @@ https://gist.github.com/macbre/1543d945f5244c5c68681966f07e2d6c
 """
 
 import logging
-from typing import Generator
+from hashlib import blake2b
+from threading import Event, Thread
+from typing import AsyncGenerator, Generator, Iterable, List, Optional, Tuple
 
 from xml import sax
 from xml.sax.xmlreader import AttributesImpl
 
 from .dumps import BaseDump
-from .entry import DumpEntry
+from .entry import DumpEntry, DuplicateEntry
+from .manifest import Manifest
+from .utils import BackgroundIterator
+
+# modes of handling revisions identical to an earlier revision of the same page
+DEDUP_SKIP = "skip"
+DEDUP_REFERENCE = "reference"
 
 
 class DumpHandler(sax.ContentHandler):
@@ -41,18 +49,29 @@ class DumpHandler(sax.ContentHandler):
     # https://docs.python.org/3.6/library/xml.sax.handler.html#xml.sax.handler.ContentHandler
 
     # pylint: disable=too-many-instance-attributes
-    def __init__(self):
+    def __init__(self, skip_redirects: bool = False):
+        """
+        :param skip_redirects: do not emit redirect pages, their text is not even buffered
+        """
         super().__init__()
         self.logger = logging.getLogger(self.__class__.__name__)
 
+        self.skip_redirects = skip_redirects
+        self.redirects_skipped = 0
+
+        # (page ID, revision ID, SHA-1) of redirects that were skipped
+        self.skipped_batch = []
+
         self.entries_batch = []
         self.entries_count = 0
 
         # attributes from <mediawiki> root XML tag
         self.metadata = None
 
-        # nodes from <siteinfo> XML tag
+        # nodes from <siteinfo> XML tag, <namespaces> are kept as a list of dicts
+        # with <namespace> attributes and its name
         self.siteinfo = {}
+        self.namespace_attributes = {}
         self.base_url = None
 
         # parser state, are we inside <page> or <revision> tag?
@@ -60,6 +79,7 @@ class DumpHandler(sax.ContentHandler):
         self.in_page = False
         self.in_revision = False
         self.in_contributor = False
+        self.in_text = False
 
         # concatenated content of tags
         self.tag_content = ""
@@ -72,6 +92,8 @@ class DumpHandler(sax.ContentHandler):
         self.current_revision_timestamp = 0
         self.current_content = ""
         self.current_contributor = None
+        self.current_sha1 = None
+        self.current_redirect = None
 
     def reset_state(self):
         """
@@ -89,6 +111,8 @@ class DumpHandler(sax.ContentHandler):
         self.current_revision_timestamp = 0
         self.current_content = ""
         self.current_contributor = None
+        self.current_sha1 = None
+        self.current_redirect = None
 
     def startElement(self, name: str, attrs: AttributesImpl):
         """
@@ -103,10 +127,19 @@ class DumpHandler(sax.ContentHandler):
             self.in_page = True
         elif name == "revision":
             self.in_revision = True
+            self.current_sha1 = None
         elif name == "contributor":
             self.in_contributor = True
+        elif name == "text":
+            self.in_text = True
+        elif name == "redirect" and self.in_page:
+            # <redirect title="Target" />
+            self.current_redirect = attrs.get("title")
         elif name == "mediawiki":
             self.metadata = dict(zip(attrs.keys(), attrs.values()))
+        elif name == "namespace" and self.in_siteinfo:
+            # <namespace key="1" case="first-letter">Talk</namespace>
+            self.namespace_attributes = dict(zip(attrs.keys(), attrs.values()))
 
         self.tag_content = ""
 
@@ -126,6 +159,13 @@ class DumpHandler(sax.ContentHandler):
         if name == "revision":
             self.in_revision = False
 
+            if self.skip_redirects and self.current_redirect is not None:
+                self.redirects_skipped += 1
+                self.skipped_batch.append(
+                    (self.current_page_id, self.current_revision_id, self.current_sha1)
+                )
+                return
+
             # add next entry information
             self.logger.debug("Page #%d: %s", self.current_page_id, self.current_title)
 
@@ -142,6 +182,8 @@ class DumpHandler(sax.ContentHandler):
                     self.current_revision_id,
                     self.current_revision_timestamp,
                     self.current_contributor,
+                    self.current_sha1,
+                    self.current_redirect,
                 )
             )
 
@@ -160,7 +202,10 @@ class DumpHandler(sax.ContentHandler):
             elif name == "timestamp":
                 self.current_revision_timestamp = self.tag_content
             elif name == "text":
+                self.in_text = False
                 self.current_content = self.tag_content
+            elif name == "sha1":
+                self.current_sha1 = self.tag_content or None
         elif self.in_page:
             if name == "title":
                 self.current_title = self.tag_content
@@ -169,13 +214,21 @@ class DumpHandler(sax.ContentHandler):
             elif name == "id":
                 self.current_page_id = int(self.tag_content)
         elif self.in_siteinfo:
-            if name in ["dbname", "base", "generator"]:
+            if name in ["sitename", "dbname", "base", "generator", "case"]:
                 self.siteinfo[name] = self.tag_content
+            elif name == "namespace":
+                self.siteinfo.setdefault("namespaces", []).append(
+                    {**self.namespace_attributes, "name": self.tag_content}
+                )
 
     def characters(self, content: str):
         # print('=', content)
         # self.logger.info('= characters %s', content)
 
+        # the text of redirects that are skipped is not needed
+        if self.in_text and self.skip_redirects and self.current_redirect is not None:
+            return
+
         self.tag_content += content
 
     def get_entries(self) -> Generator[tuple, None, None]:
@@ -186,6 +239,14 @@ class DumpHandler(sax.ContentHandler):
 
         self.entries_batch = []
 
+    def get_skipped(self) -> Generator[tuple, None, None]:
+        """
+        Used by DumpReader to record redirects that were skipped in the manifest
+        """
+        yield from self.skipped_batch
+
+        self.skipped_batch = []
+
     def get_entries_count(self) -> int:
         """
         :rtype: int
@@ -218,16 +279,72 @@ class DumpHandler(sax.ContentHandler):
         return self.base_url
 
 
+# pylint: disable=too-many-instance-attributes
 class DumpReader:
     """
     This class uses provided BaseDump instance to read and parse MediaWiki's XML dump
     """
 
-    def __init__(self):
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+        self,
+        dedup: Optional[str] = None,
+        pipeline_depth: int = 0,
+        manifest: Optional[Manifest] = None,
+        previous_manifest: Optional[Manifest] = None,
+        shard: Optional[Tuple[int, int]] = None,
+        skip_redirects: bool = False,
+    ):
+        """
+        :param dedup: how to handle revisions with the same text as an earlier revision
+            of the page (reverts and null edits in full history dumps) -
+            DEDUP_SKIP does not emit them, DEDUP_REFERENCE emits DuplicateEntry objects
+            (without the text) pointing to the earlier revision
+        :param pipeline_depth: when above zero, the dump is fetched and decompressed
+            in a background thread, up to this many batches of decompressed chunks
+            wait in the queue for the parser
+        :param manifest: revision IDs and SHA-1 of read pages are recorded in it
+            (including pages that are not emitted, e.g. empty ones, skipped redirects
+            or pages from other namespaces)
+        :param previous_manifest: the manifest of the previous version of the dump,
+            when provided only new and changed pages are emitted, IDs of deleted pages
+            are available in deleted_page_ids when the dump is read
+        :param shard: (k, n) - read only the k-th (counting from zero) of n parts
+            of the dump, see BaseDump.get_shard_content(). When the dump can not be split,
+            pages are assigned to shards by their IDs. With previous_manifest,
+            deleted_page_ids lists only pages that belong to the shard.
+        :param skip_redirects: do not emit redirect pages, this is cheaper than
+            filtering them out as their text is not buffered
+        """
+        if dedup not in (None, DEDUP_SKIP, DEDUP_REFERENCE):
+            raise ValueError(f"Unknown dedup mode: {dedup}")
+
+        if shard is not None and not 0 <= shard[0] < shard[1]:
+            raise ValueError(f"Invalid shard: {shard}")
+
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.dedup = dedup
+        self.duplicates_count = 0
+
+        self.pipeline_depth = pipeline_depth
+        self.pipeline_stats = None
+
+        self.previous_manifest = previous_manifest
+        self.manifest = manifest
+        if manifest is None and previous_manifest is not None:
+            self.manifest = Manifest()
+
+        self.unchanged_count = 0
+        self.deleted_page_ids = None
+
+        self.shard = shard
+
+        # texts of the current page revisions, key -> revision ID
+        self.current_page = None
+        self.seen_texts = {}
 
         # https://docs.python.org/2/library/xml.etree.elementtree.html#parsing-xml
-        self.handler = DumpHandler()
+        self.handler = DumpHandler(skip_redirects=skip_redirects)
 
     @staticmethod
     def filter_by_namespace(namespace: int) -> bool:
@@ -237,6 +354,50 @@ class DumpReader:
         """
         return isinstance(namespace, int)
 
+    def in_shard(self, page_id: int) -> bool:
+        """
+        Does the page belong to the shard that is being read?
+        """
+        index, count = self.shard
+
+        # Fibonacci hashing spreads consecutive IDs evenly
+        return (page_id * 0x9E3779B97F4A7C15 % 2**64) % count == index
+
+    @staticmethod
+    def get_text_key(content: str, sha1: Optional[str]):
+        """
+        Identifies the revision text, uses <sha1> node when provided by the dump
+        """
+        return sha1 or blake2b(content.encode("utf-8"), digest_size=16).digest()
+
+    # pylint: disable=too-many-positional-arguments,too-many-arguments
+    def find_duplicate(
+        self,
+        page_id: int,
+        title: str,
+        content: str,
+        sha1: Optional[str],
+        revision_id: int,
+    ) -> Optional[int]:
+        """
+        Returns the ID of an earlier revision of the page with the same text (or None).
+        Revisions of a page come one after another in the dump, so only texts
+        of the current page are remembered.
+        """
+        if self.current_page != (page_id, title):
+            self.current_page = (page_id, title)
+            self.seen_texts = {}
+
+        key = self.get_text_key(content, sha1)
+
+        if key in self.seen_texts:
+            self.duplicates_count += 1
+            return self.seen_texts[key]
+
+        self.seen_texts[key] = revision_id
+        return None
+
+    # pylint: disable=too-many-locals
     def read(self, dump: BaseDump) -> Generator[DumpEntry, None, None]:
         """Read a dump and emit DumpEntry objects"""
         self.logger.info("Parsing XML dump...")
@@ -244,9 +405,16 @@ class DumpReader:
         parser = sax.make_parser()
         parser.setContentHandler(self.handler)
 
-        for chunk in dump.get_content():
+        chunks, filter_by_id = self.get_chunks(dump)
+
+        for chunk in chunks:
             parser.feed(chunk)
 
+            # skipped redirects are not reported as deleted next time
+            for page_id, revision_id, sha1 in self.handler.get_skipped():
+                if self.manifest is not None:
+                    self.manifest.add(page_id, revision_id, sha1)
+
             # yield pages as we go through XML stream
             for page in self.handler.get_entries():
                 (
@@ -258,14 +426,55 @@ class DumpReader:
                     revision_id,
                     revision_timestamp,
                     contributor,
+                    sha1,
+                    redirect,
                 ) = page
 
+                # pages that are not emitted are recorded as well, so that they
+                # are not reported as deleted when the manifest is used next time
+                if self.manifest is not None:
+                    self.manifest.add(page_id, revision_id, sha1)
+
+                if filter_by_id and not self.in_shard(page_id):
+                    continue
+
                 if self.filter_by_namespace(namespace):
                     if content == "":
                         # https://fo.wikipedia.org/wiki/Kjak:L%C3%ADvfr%C3%B8%C3%B0i
                         self.logger.warning("Page #%d: %s is empty", page_id, title)
                         continue
 
+                    if self.previous_manifest is not None and (
+                        not self.previous_manifest.is_changed(
+                            page_id, revision_id, sha1
+                        )
+                    ):
+                        self.unchanged_count += 1
+                        continue
+
+                    duplicate_of = (
+                        self.find_duplicate(page_id, title, content, sha1, revision_id)
+                        if self.dedup is not None
+                        else None
+                    )
+
+                    if duplicate_of is not None:
+                        if self.dedup == DEDUP_REFERENCE:
+                            yield DuplicateEntry(
+                                duplicate_of,
+                                namespace,
+                                page_id,
+                                url,
+                                title,
+                                None,
+                                revision_id,
+                                revision_timestamp,
+                                contributor,
+                                sha1,
+                                redirect,
+                            )
+                        continue
+
                     yield DumpEntry(
                         namespace,
                         page_id,
@@ -275,12 +484,151 @@ class DumpReader:
                         revision_id,
                         revision_timestamp,
                         contributor,
+                        sha1,
+                        redirect,
                     )
 
         self.logger.info(
             "Parsing completed, entries found: %d", self.handler.get_entries_count()
         )
 
+        if self.previous_manifest is not None:
+            self.deleted_page_ids = self.get_deleted_page_ids(dump, filter_by_id)
+
+        self.log_stats(chunks)
+
+    def get_deleted_page_ids(self, dump: BaseDump, filter_by_id: bool) -> List[int]:
+        """
+        Returns IDs of pages from the previous manifest that are no longer in the dump,
+        when a shard is read only pages that belong to it are taken into account
+        """
+        deleted = self.previous_manifest.get_deleted(self.manifest)
+
+        if self.shard is None:
+            return deleted
+
+        if filter_by_id:
+            return [page_id for page_id in deleted if self.in_shard(page_id)]
+
+        page_ids = dump.get_shard_page_ids(*self.shard)
+
+        if page_ids is None:
+            # fall back to the range of IDs of pages that were read
+            read_ids = self.manifest.pages.keys()
+            page_ids = range(min(read_ids), max(read_ids) + 1) if read_ids else range(0)
+
+        return [page_id for page_id in deleted if page_id in page_ids]
+
+    def get_chunks(self, dump: BaseDump) -> Tuple[Iterable, bool]:
+        """
+        Returns the dump content to parse and whether pages need to be filtered
+        by their IDs to get the requested shard
+        """
+        chunks = None
+        if self.shard is not None:
+            chunks = dump.get_shard_content(*self.shard)
+
+            if chunks is None:
+                self.logger.info("Dump can not be split, filtering pages by their IDs")
+
+        filter_by_id = self.shard is not None and chunks is None
+
+        if chunks is None:
+            chunks = dump.get_content()
+
+        if self.pipeline_depth > 0:
+            chunks = BackgroundIterator(chunks, queue_size=self.pipeline_depth)
+
+        return chunks, filter_by_id
+
+    def log_stats(self, chunks: Iterable):
+        """
+        Reports the stats of the optional reading modes when the dump is read
+        """
+        if self.dedup is not None:
+            self.logger.info("Duplicated revisions found: %d", self.duplicates_count)
+
+        if self.handler.skip_redirects:
+            self.logger.info("Redirects skipped: %d", self.handler.redirects_skipped)
+
+        if self.previous_manifest is not None:
+            self.logger.info(
+                "Unchanged revisions: %d, deleted pages: %d",
+                self.unchanged_count,
+                len(self.deleted_page_ids),
+            )
+
+        if isinstance(chunks, BackgroundIterator):
+            self.pipeline_stats = chunks.get_stats()
+            self.logger.info(
+                "Pipeline: fetching and decompression busy %.0f%% of time, "
+                "parsing busy %.0f%% of time",
+                self.pipeline_stats["producer_utilisation"] * 100,
+                self.pipeline_stats["consumer_utilisation"] * 100,
+            )
+
+    async def aread(
+        self, dump: BaseDump, max_queue_size: int = 16, batch_size: int = 64
+    ) -> AsyncGenerator[DumpEntry, None]:
+        """
+        Read a dump and emit DumpEntry objects without blocking the event loop.
+
+        Fetching, decompression and parsing are run by read() in a separate thread.
+        Entries are passed to the loop in batches via a bounded queue - the thread waits
+        when there are max_queue_size batches that were not consumed yet.
+        """
+        # asyncio is imported on demand, so that the reader starts quickly
+        import asyncio  # pylint:disable=import-outside-toplevel
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=max_queue_size)
+        stopped = Event()
+
+        def put(item) -> bool:
+            # blocks until there's a room in the queue
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+            return not stopped.is_set()
+
+        def produce():
+            batch = []
+
+            try:
+                for entry in self.read(dump):
+                    batch.append(entry)
+
+                    if len(batch) >= batch_size:
+                        if not put(batch):
+                            return
+                        batch = []
+
+                put(batch)
+                put(None)
+            except Exception as ex:  # pylint: disable=broad-exception-caught
+                put(ex)
+
+        thread = Thread(target=produce, name="DumpReader.aread", daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                batch = await queue.get()
+
+                if batch is None:
+                    break
+                if isinstance(batch, Exception):
+                    raise batch
+
+                for entry in batch:
+                    yield entry
+        finally:
+            stopped.set()
+
+            # unblock the thread if it waits for a room in the queue
+            while thread.is_alive():
+                while not queue.empty():
+                    queue.get_nowait()
+                await asyncio.sleep(0.01)
+
     def get_dump_language(self) -> str:
         """
         :rtype: str
@@ -0,0 +1,110 @@
+"""
+Maps titles of redirect pages to titles of the pages they (eventually) point to
+
+The map is built in a single pass over the dump - redirect targets are taken from
+<redirect> nodes (see DumpEntry.redirect) and chains of redirects are resolved at the end.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+from .entry import DumpEntry
+
+
+class RedirectMap:
+    """
+    Maps redirect titles to canonical titles
+    """
+
+    def __init__(self, max_depth: int = 10):
+        """
+        :param max_depth: longer chains of redirects are not followed
+        """
+        self.max_depth = max_depth
+        self.redirects: Dict[str, str] = {}
+
+    def add(self, title: str, target: str):
+        """Records the redirect, a section the redirect points to is ignored"""
+        target = target.split("#", 1)[0]
+
+        if target and target != title:
+            self.redirects[title] = target
+
+    def resolve(self, title: str) -> str:
+        """
+        Returns the canonical title for a given one (the title itself when it's not
+        a redirect). The title of the last redirect is returned when the chain is too
+        long or it contains a loop.
+        """
+        seen = {title}
+
+        for _ in range(self.max_depth):
+            target = self.redirects.get(title)
+
+            if target is None or target in seen:
+                break
+
+            seen.add(target)
+            title = target
+
+        return title
+
+    def resolve_chains(self) -> List[str]:
+        """
+        Points each redirect directly to its canonical title, so that resolve() needs
+        a single lookup. Returns the titles of redirects that form loops (or chains
+        longer than max_depth), they're removed.
+        """
+        resolved = {title: self.resolve(title) for title in self.redirects}
+        loops = [
+            title for title, target in resolved.items() if target in self.redirects
+        ]
+
+        for title in loops:
+            del resolved[title]
+
+        self.redirects = resolved
+        return sorted(loops)
+
+    def get(self, title: str) -> Optional[str]:
+        """Returns the target of a given redirect or None"""
+        return self.redirects.get(title)
+
+    def save(self, path: str):
+        """Stores the map in a TSV file"""
+        with open(path, mode="wt", encoding="utf-8") as file:
+            file.writelines(
+                f"{title}\t{target}\n"
+                for title, target in sorted(self.redirects.items())
+            )
+
+    @classmethod
+    def load(cls, path: str, max_depth: int = 10) -> "RedirectMap":
+        """Reads the map stored by save()"""
+        redirects = cls(max_depth=max_depth)
+
+        with open(path, mode="rt", encoding="utf-8") as file:
+            for line in file:
+                title, target = line.rstrip("\n").split("\t")
+                redirects.redirects[title] = target
+
+        return redirects
+
+    @classmethod
+    def from_entries(
+        cls, entries: Iterable[DumpEntry], max_depth: int = 10
+    ) -> "RedirectMap":
+        """Builds the map from DumpEntry objects and resolves chains of redirects"""
+        redirects = cls(max_depth=max_depth)
+
+        for entry in entries:
+            if entry.redirect is not None:
+                redirects.add(entry.title, entry.redirect)
+
+        redirects.resolve_chains()
+        return redirects
+
+    def __len__(self) -> int:
+        return len(self.redirects)
+
+    def __contains__(self, title: str) -> bool:
+        return title in self.redirects
@@ -0,0 +1,268 @@
+"""
+Draws random samples of pages
+
+Multistream dumps are sampled using their index, only bz2 streams with the chosen pages
+are decompressed. Plain XML dumps can be sampled using a page index built once (offsets
+of <page> tags). Other dumps are read in full and sampled with a reservoir.
+"""
+
+import mmap
+import os
+import random
+from array import array
+from bisect import bisect_right
+from collections import deque
+from itertools import groupby
+from operator import attrgetter
+from typing import Callable, Dict, Generator, Iterable, List, Optional, Set, Type
+
+from .dumps import (
+    BaseDump,
+    IteratorDump,
+    LocalFileDump,
+    LocalMultistreamDump,
+    _decompress_streams,
+)
+from .encoding import _SWAP_BYTES, _write_array
+from .entry import DumpEntry
+from .reader import DumpReader
+
+
+def _iter_pages(entries: Iterable[DumpEntry]) -> Generator[DumpEntry, None, None]:
+    """Yields the last (i.e. the latest) revision of each page"""
+    for _, revisions in groupby(entries, key=attrgetter("page_id")):
+        yield deque(revisions, maxlen=1)[0]
+
+
+def reservoir_sample(
+    entries: Iterable[DumpEntry], k: int, seed: Optional[int] = None
+) -> List[DumpEntry]:
+    """
+    Returns k entries chosen uniformly at random from a stream of unknown length,
+    in the order they appear in the stream
+    """
+    rnd = random.Random(seed)
+    reservoir: List[tuple] = []
+
+    for position, entry in enumerate(entries):
+        if position < k:
+            reservoir.append((position, entry))
+        else:
+            index = rnd.randrange(position + 1)
+            if index < k:
+                reservoir[index] = (position, entry)
+
+    return [entry for _, entry in sorted(reservoir, key=lambda item: item[0])]
+
+
+class PageIndex:
+    """
+    Byte offsets of <page> tags in a plain XML dump, used to read random pages
+    """
+
+    def __init__(self, offsets: array):
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, dump_file: str) -> "PageIndex":
+        """Scans the memory-mapped file for <page> tags"""
+        offsets = array("Q")
+
+        with open(dump_file, mode="rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return cls(offsets)
+
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                position = mapped.find(b"<page>")
+
+                while position != -1:
+                    offsets.append(position)
+                    position = mapped.find(b"<page>", position + 1)
+
+        return cls(offsets)
+
+    def save(self, path: str):
+        """Stores offsets in a binary file (uint64, little-endian)"""
+        with open(path, mode="wb") as file:
+            _write_array(file, self.offsets)
+
+    @classmethod
+    def load(cls, path: str) -> "PageIndex":
+        """Reads the index stored by save()"""
+        offsets = array("Q")
+
+        with open(path, mode="rb") as file:
+            offsets.frombytes(file.read())
+
+        if _SWAP_BYTES:
+            offsets.byteswap()
+
+        return cls(offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+
+def _draw(
+    rnd: random.Random, population: int, count: int, drawn: Set[int]
+) -> List[int]:
+    """Draws up to count positions from range(population) that were not drawn yet"""
+    count = min(count, population - len(drawn))
+
+    if len(drawn) > population // 2:
+        # most of the positions were drawn already, pick from the rest
+        return rnd.sample(sorted(set(range(population)) - drawn), count)
+
+    chosen = []
+    while len(chosen) < count:
+        position = rnd.randrange(population)
+
+        if position not in drawn:
+            drawn.add(position)
+            chosen.append(position)
+
+    return chosen
+
+
+def _sample_positions(
+    rnd: random.Random,
+    population: int,
+    k: int,
+    read: Callable[[List[int]], Dict[int, DumpEntry]],
+) -> List[DumpEntry]:
+    """
+    Draws random positions and reads their pages until k of them are accepted
+    by the reader (e.g. pass its namespace filter) or all positions were tried.
+    Pages are returned in the order of their positions.
+
+    :param read: returns pages accepted by the reader keyed by their positions
+    """
+    drawn: Set[int] = set()
+    sample: Dict[int, DumpEntry] = {}
+
+    while len(sample) < k and len(drawn) < population:
+        # pages that are filtered out are replaced by the next batch
+        positions = _draw(rnd, population, max(2 * (k - len(sample)), 16), drawn)
+        drawn.update(positions)
+
+        # positions are sorted for reading only, pages are taken in the order
+        # they were drawn, so that the sample is not biased towards the dump start
+        pages = read(sorted(positions))
+        accepted = [position for position in positions if position in pages]
+
+        for position in accepted[: k - len(sample)]:
+            sample[position] = pages[position]
+
+    return [sample[position] for position in sorted(sample)]
+
+
+def sample_multistream(
+    dump: LocalMultistreamDump,
+    k: int,
+    seed: Optional[int] = None,
+    reader_class: Type[DumpReader] = DumpReader,
+) -> List[DumpEntry]:
+    """
+    Returns k random pages of a multistream dump, the index file is used to pick pages
+    and only streams that contain them are decompressed
+    """
+    # stream offsets and IDs of pages listed in the index, titles are not kept
+    page_offsets, page_ids, stream_offsets = array("Q"), array("I"), array("Q")
+
+    for offset, page_id, _ in dump.get_index_entries():
+        page_offsets.append(offset)
+        page_ids.append(page_id)
+
+        if not stream_offsets or stream_offsets[-1] != offset:
+            stream_offsets.append(offset)
+
+    if not stream_offsets:
+        return []
+
+    def get_stream_end(offset: int) -> Optional[int]:
+        # the stream ends where the next one starts, the last one ends with the file
+        following = bisect_right(stream_offsets, offset)
+        return stream_offsets[following] if following < len(stream_offsets) else None
+
+    def read_streams(positions: List[int]):
+        streams = sorted({page_offsets[position] for position in positions})
+
+        with dump.fetch() as file:
+            yield from _decompress_streams(file, 0, stream_offsets[0])
+
+            for offset in streams:
+                yield from _decompress_streams(file, offset, get_stream_end(offset))
+
+        if get_stream_end(streams[-1]) is not None:
+            yield b"</mediawiki>\n"
+
+    def read(positions: List[int]) -> Dict[int, DumpEntry]:
+        page_positions = {page_ids[position]: position for position in positions}
+        entries = reader_class().read(IteratorDump(read_streams(positions)))
+
+        return {
+            page_positions[entry.page_id]: entry
+            for entry in _iter_pages(entries)
+            if entry.page_id in page_positions
+        }
+
+    return _sample_positions(random.Random(seed), len(page_ids), k, read)
+
+
+def sample_indexed(
+    dump: LocalFileDump,
+    page_index: PageIndex,
+    k: int,
+    seed: Optional[int] = None,
+    reader_class: Type[DumpReader] = DumpReader,
+) -> List[DumpEntry]:
+    """
+    Returns k random pages of a plain XML dump, only the chosen pages are read
+    using their offsets from the page index (see PageIndex.build())
+    """
+
+    def read(positions: List[int]) -> Dict[int, DumpEntry]:
+        pages = {}
+
+        for position in positions:
+            offset = page_index.offsets[position]
+            page = LocalFileDump(
+                dump.dump_file, use_mmap=dump.use_mmap, start=offset, end=offset + 1
+            )
+
+            for entry in _iter_pages(reader_class().read(page)):
+                pages[position] = entry
+
+        return pages
+
+    return _sample_positions(random.Random(seed), len(page_index), k, read)
+
+
+def sample_pages(
+    dump: BaseDump,
+    k: int,
+    seed: Optional[int] = None,
+    reader_class: Type[DumpReader] = DumpReader,
+    page_index: Optional[PageIndex] = None,
+) -> List[DumpEntry]:
+    """
+    Returns k pages chosen at random (all of them when there are fewer pages),
+    the same seed gives the same sample.
+
+    Multistream dumps (and plain XML dumps with page_index provided) are sampled
+    without reading them in full, other dumps are sampled with a reservoir.
+    Pages of full history dumps are sampled as well (not their revisions),
+    the latest revision of each sampled page is returned.
+
+    :param reader_class: DumpReader or its subclass, e.g. DumpReaderArticles to sample articles
+    """
+    if k <= 0:
+        return []
+
+    if isinstance(dump, LocalMultistreamDump):
+        return sample_multistream(dump, k, seed, reader_class)
+
+    if page_index is not None and isinstance(dump, LocalFileDump):
+        return sample_indexed(dump, page_index, k, seed, reader_class)
+
+    return reservoir_sample(_iter_pages(reader_class().read(dump)), k, seed)
@@ -0,0 +1,272 @@
+"""
+Finds pages that mention any of (possibly thousands of) keywords
+
+Keywords are compiled into an Aho-Corasick automaton, so that each page text is
+scanned once, no matter how many keywords are searched for.
+"""
+
+import concurrent.futures
+import os
+from collections import deque
+from typing import Dict, Generator, Iterable, List, Optional, Tuple, Union
+
+from .dumps import BaseDump
+from .entry import DumpEntry
+from .reader import DumpReader
+from .utils import parallel_map
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton built from a set of keywords. Plain lists and dicts are used,
+    so it can be pickled and sent to worker processes.
+    """
+
+    def __init__(
+        self,
+        keywords: Iterable[str],
+        case_sensitive: bool = False,
+        whole_words: bool = False,
+    ):
+        """
+        :param case_sensitive: when False, texts and keywords are case-folded
+        :param whole_words: ignore matches that are a part of a longer word
+        """
+        self.case_sensitive = case_sensitive
+        self.whole_words = whole_words
+
+        # keywords as given, indexed by their normalized form
+        self.keywords: List[str] = []
+        normalized: Dict[str, int] = {}
+
+        for keyword in keywords:
+            if not keyword:
+                raise ValueError("Keywords can not be empty")
+
+            normalized.setdefault(self._normalize(keyword), len(self.keywords))
+            if len(normalized) > len(self.keywords):
+                self.keywords.append(keyword)
+
+        # the trie: transitions, failure links and keywords ending in each node
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[Tuple[int, ...]] = [()]
+        self.lengths: List[int] = [len(keyword) for keyword in normalized]
+
+        for keyword, index in normalized.items():
+            self._add(keyword, index)
+
+        self._link()
+
+    def _normalize(self, text: str) -> str:
+        # unlike lower() (e.g. a final "Σ" -> "ς"), casefold() maps each character on its own
+        return text if self.case_sensitive else text.casefold()
+
+    def _add(self, keyword: str, index: int):
+        node = 0
+
+        for char in keyword:
+            if char not in self.goto[node]:
+                self.goto[node][char] = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(())
+
+            node = self.goto[node][char]
+
+        self.output[node] += (index,)
+
+    def _link(self):
+        """Sets failure links in the breadth-first order"""
+        queue = deque(self.goto[0].values())
+
+        while queue:
+            node = queue.popleft()
+
+            for char, child in self.goto[node].items():
+                queue.append(child)
+
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                # keywords that end with this one are matched here as well
+                self.output[child] += self.output[self.fail[child]]
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def iter_matches(self, text: str) -> Generator[Tuple[int, str], None, None]:
+        """Yields (position, keyword) tuples, overlapping matches are included"""
+        goto, fail, output = self.goto, self.fail, self.output
+        keywords, lengths, whole_words = self.keywords, self.lengths, self.whole_words
+        node = 0
+
+        normalized = self._normalize(text)
+
+        # some characters are case-folded into a few (e.g. "ß" -> "ss"), positions
+        # of the normalized text are mapped back to the given one then
+        origins = _get_origins(text) if len(normalized) != len(text) else None
+
+        for position, char in enumerate(normalized):
+            while node and char not in goto[node]:
+                node = fail[node]
+
+            node = goto[node].get(char, 0)
+
+            for index in output[node]:
+                span = _map_span(origins, position - lengths[index] + 1, position + 1)
+
+                if span is None or (whole_words and not _is_whole_word(text, *span)):
+                    continue
+
+                yield span[0], keywords[index]
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Returns the number of occurrences of each keyword found in a given text"""
+        counts: Dict[str, int] = {}
+
+        for _, keyword in self.iter_matches(text):
+            counts[keyword] = counts.get(keyword, 0) + 1
+
+        return counts
+
+
+def _get_origins(text: str) -> List[int]:
+    """Returns the position in the text of each character of text.casefold()"""
+    return [
+        position
+        for position, char in enumerate(text)
+        for _ in range(len(char.casefold()))
+    ]
+
+
+def _map_span(
+    origins: Optional[List[int]], start: int, end: int
+) -> Optional[Tuple[int, int]]:
+    """
+    Maps the span of the case-folded text to the given one (see _get_origins()),
+    None is returned when it begins or ends in the middle of a case-folded character
+    """
+    if origins is None:
+        return start, end
+
+    if (start > 0 and origins[start - 1] == origins[start]) or (
+        end < len(origins) and origins[end] == origins[end - 1]
+    ):
+        return None
+
+    return origins[start], origins[end - 1] + 1
+
+
+def _is_whole_word(text: str, start: int, end: int) -> bool:
+    """Is text[start:end] surrounded by non-word characters?"""
+    return not (
+        (start > 0 and text[start - 1].isalnum())
+        or (end < len(text) and text[end].isalnum())
+    )
+
+
+# the matcher of the worker process, set by the pool initializer
+_WORKER_MATCHER: Optional[KeywordMatcher] = None
+
+
+def _init_worker(matcher: KeywordMatcher):
+    """Runs in the worker process, the matcher is unpickled once per worker"""
+    global _WORKER_MATCHER  # pylint: disable=global-statement
+    _WORKER_MATCHER = matcher
+
+
+def _count_matches(text: str) -> Dict[str, int]:
+    """Runs in the worker process"""
+    return _WORKER_MATCHER.count(text)
+
+
+def search_entries(
+    entries: Iterable[DumpEntry],
+    keywords: Union[KeywordMatcher, Iterable[str]],
+    workers: int = 1,
+    chunk_size: int = 64,
+) -> Generator[Tuple[DumpEntry, Dict[str, int]], None, None]:
+    """
+    Yields (entry, matches) tuples for entries (e.g. coming from DumpReader.read())
+    whose content mentions any of the keywords, matches are counts of each keyword found.
+
+    :param keywords: KeywordMatcher or keywords to search for (case-insensitive)
+    :param workers: texts are scanned by this many worker processes
+    """
+    matcher = (
+        keywords if isinstance(keywords, KeywordMatcher) else KeywordMatcher(keywords)
+    )
+    workers = workers or os.cpu_count() or 1
+
+    # keep the entries that are being processed by workers
+    pending = deque()
+
+    def get_texts():
+        for entry in entries:
+            pending.append(entry)
+            yield entry.content
+
+    if workers == 1:
+        results = map(matcher.count, get_texts())
+        executor = None
+    else:
+        # send the automaton to each worker once, not with every chunk of texts
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(matcher,)
+        )
+        results = parallel_map(
+            _count_matches,
+            get_texts(),
+            workers=workers,
+            chunk_size=chunk_size,
+            executor=executor,
+        )
+
+    try:
+        for matches in results:
+            entry = pending.popleft()
+
+            if matches:
+                yield entry, matches
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+class KeywordSearchReader(DumpReader):
+    """
+    Emits only pages that mention any of the keywords. Can be used as the reader_class
+    of MultiPartReader or MultiWikiReader, so that pages are searched in their worker
+    processes and only the matching ones are sent to the main process.
+    """
+
+    def __init__(
+        self,
+        keywords: Iterable[str],
+        case_sensitive: bool = False,
+        whole_words: bool = False,
+        **kwargs,
+    ):
+        """
+        :param kwargs: passed to DumpReader constructor
+        """
+        super().__init__(**kwargs)
+        self.matcher = KeywordMatcher(keywords, case_sensitive, whole_words)
+
+    def search(
+        self, dump: BaseDump
+    ) -> Generator[Tuple[DumpEntry, Dict[str, int]], None, None]:
+        """Reads the dump and yields (entry, matches) tuples, see search_entries()"""
+        for entry in super().read(dump):
+            matches = self.matcher.count(entry.content)
+
+            if matches:
+                yield entry, matches
+
+    def read(self, dump: BaseDump) -> Generator[DumpEntry, None, None]:
+        """Reads the dump and emits entries that mention any of the keywords"""
+        for entry, _ in self.search(dump):
+            yield entry
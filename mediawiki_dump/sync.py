@@ -0,0 +1,194 @@
+"""
+Incremental sync of a locally cached dump with a live MediaWiki site
+
+The recent changes API tells which pages were edited, created, moved or deleted
+since a given timestamp. Only these pages are exported and they replace their older
+versions from the cached dump.
+"""
+
+import re
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Dict, Generator, Iterable, Optional, Set, Union
+from xml.sax.saxutils import unescape
+
+from .dumps import BaseDump, MediaWikiClientDump
+
+if TYPE_CHECKING:  # pragma: no cover
+    from mwclient import Site
+
+# entities that MediaWiki uses when escaping titles, on top of &amp; &lt; &gt;
+_ENTITIES = {"&quot;": '"', "&#039;": "'", "&apos;": "'"}
+
+_PAGE_MARKUP = re.compile(rb"<page>|</page>|</title>|</mediawiki>")
+
+
+class RecentChangesDump(MediaWikiClientDump):
+    """
+    Exports pages that were changed on a given site since a given timestamp
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+        self,
+        site: "Site",
+        since: Union[str, datetime],
+        namespaces: Optional[Iterable[int]] = None,
+        batch_size: int = 50,
+        workers: int = 4,
+    ):
+        """
+        :param since: e.g. "2024-01-01T00:00:00Z" or a datetime object
+        :param namespaces: report changes in these namespaces only
+        """
+        if isinstance(since, datetime):
+            since = since.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        self.since = since
+        self.namespaces = namespaces
+
+        # title -> was the page deleted?
+        self.changes: Optional[Dict[str, bool]] = None
+
+        # timestamp of the most recent change, pass it as "since" on the next sync
+        self.last_timestamp = since
+
+        super().__init__(
+            site,
+            articles=self.get_changed_titles(),
+            batch_size=batch_size,
+            workers=workers,
+        )
+
+    def get_changes(self) -> Dict[str, bool]:
+        """
+        Returns titles of changed pages (in the order of their most recent change)
+        mapped to whether the page was deleted
+        """
+        if self.changes is not None:
+            return self.changes
+
+        # https://www.mediawiki.org/wiki/API:RecentChanges
+        params = {
+            "list": "recentchanges",
+            "rcstart": self.since,
+            "rcdir": "newer",
+            "rcprop": "title|timestamp|loginfo",
+            "rctype": "edit|new|log",
+            "rclimit": "max",
+        }
+
+        if self.namespaces is not None:
+            params["rcnamespace"] = "|".join(map(str, self.namespaces))
+
+        changes = {}
+        continuation = {"continue": ""}
+
+        while continuation is not None:
+            self.logger.info("Fetching recent changes since %s", self.since)
+            result = self.site.api("query", **params, **continuation)
+
+            for change in result["query"]["recentchanges"]:
+                title = change["title"]
+                self.last_timestamp = max(self.last_timestamp, change["timestamp"])
+
+                # keep titles ordered by their most recent change
+                changes.pop(title, None)
+
+                if change["type"] != "log":
+                    changes[title] = False
+                elif change.get("logtype") == "delete":
+                    changes[title] = change.get("logaction") == "delete"
+                elif change.get("logtype") == "move":
+                    # the page was moved, its old title becomes a redirect (or is gone)
+                    changes[title] = False
+                    target = change.get("logparams", {}).get("target_title")
+
+                    if target is not None:
+                        changes.pop(target, None)
+                        changes[target] = False
+
+            continuation = result.get("continue")
+
+        self.logger.info("Pages changed since %s: %d", self.since, len(changes))
+
+        self.changes = changes
+        return changes
+
+    def get_changed_titles(self) -> Generator[str, None, None]:
+        """Yields titles of pages that need to be exported"""
+        for title, deleted in self.get_changes().items():
+            if not deleted:
+                yield title
+
+
+class SyncedDump(BaseDump):
+    """
+    Passes a cached dump with pages changed since its creation replaced by their
+    current versions fetched from the site (using RecentChangesDump).
+
+    Deleted pages are removed, the new ones are added at the end.
+    """
+
+    def __init__(self, base_dump: BaseDump, changes: RecentChangesDump):
+        super().__init__("")
+
+        self.base_dump = base_dump
+        self.changes = changes
+
+    def get_url(self):
+        return self.changes.get_url()
+
+    def _filter_base(
+        self, titles: Set[str], chunks: Iterable[Union[bytes, str]]
+    ) -> Generator[bytes, None, None]:
+        """
+        Passes the base dump without the closing </mediawiki> tag and without
+        pages with given titles. Page content is not buffered.
+        """
+        buffer = b""
+        # position of <page> in the buffer when its title is not known yet
+        page_start = None
+        skipping = False  # are we inside a page that is being removed?
+
+        for chunk in chunks:
+            buffer += chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+            pos = 0
+
+            for match in _PAGE_MARKUP.finditer(buffer):
+                tag = match.group()
+
+                if tag == b"<page>":
+                    if not skipping:
+                        yield buffer[pos : match.start()]
+                    page_start = pos = match.start()
+                elif tag == b"</title>" and page_start is not None:
+                    title = buffer[page_start : match.start()].split(b"<title>")[-1]
+                    skipping = unescape(title.decode("utf-8"), _ENTITIES) in titles
+                    page_start = None
+                elif tag == b"</page>" and skipping:
+                    pos = match.end()
+                    skipping = False
+                elif tag == b"</mediawiki>":
+                    if not skipping:
+                        yield buffer[pos : match.start()]
+                    return
+
+            if page_start is not None:
+                # keep the page start until its title is known
+                buffer = buffer[page_start:]
+                page_start = 0
+            else:
+                # keep the tail that can contain the beginning of the next tag
+                tail = max(pos, len(buffer) - len(b"</mediawiki>"))
+
+                if not skipping:
+                    yield buffer[pos:tail]
+
+                buffer = buffer[tail:]
+
+    def get_content(self) -> Generator[bytes, None, None]:
+        titles = set(self.changes.get_changes())
+
+        yield from self._filter_base(titles, self.base_dump.get_content())
+        yield from self.changes.get_pages_content(with_header=False)
+        yield b"</mediawiki>\n"
@@ -2,91 +2,198 @@
 Cleans and tokenizes given text
 """
 
+import concurrent.futures
+import json
+import os
 import re
-from typing import Callable, List
+from functools import partial
+from hashlib import sha1
+from typing import TYPE_CHECKING, Callable, Generator, Iterable, List, Optional, Union
 
+from .entry import DumpEntry
+from .utils import iter_chunks, parallel_map
 
-def clean(text: str) -> str:
-    """Cleans up the provided wikitext.
-    Removes templates, tables, parser hooks, magic words, HTML tags and file embeds.
-    Keeps links.
+if TYPE_CHECKING:  # pragma: no cover
+    from .cache import TextCache
+
+# ''foo'' / '''foo''' - removed before the rest of the markup, as it can be put around it
+_BOLD = re.compile(r"'''?([^']+)'''?")
+
+# tokens that open and close templates and tables, see _strip_templates_and_tables()
+_BRACES = re.compile(r"\{\{|\}\}|\{\||\}")
+
+# the rest of the markup is handled by a single regular expression,
+# alternatives are listed in the order they used to be applied in.
+#
+# The lookahead lets the regex engine quickly skip the plain text. Links and tags
+# have a bounded length (titles have at most 255 characters), so that an unclosed
+# markup (e.g. "[[foo " repeated) is not scanned till the end of the text from each opener.
+_MARKUP = re.compile(
+    r"(?=[\[\]=*<&_h])(?:"
+    r"(?P<heading>^=+\s?(?P<heading_text>[^=]+)\s?=+)"  # == a == -> a
+    r"|(?P<namespaced_link>\[\[[^:\]]{1,255}:[^\]]{1,1024}\]\])"  # [[foo:b]] -> ''
+    r"|(?P<link>\[\[(?P<link_text>[^|\]]{1,255})\]\])"  # [[a]] -> a
+    r"|(?P<piped_link>\[\[[^|]{1,255}\|(?P<piped_link_text>[^\]]{1,1024})\]\])"
+    r"|(?P<brackets>\[\[|\]\])"
+    r"|(?P<external_link>\[http[^\s]{1,2048} (?P<external_link_text>[^\]]{1,1024})\])"
+    r"|(?P<url>https?://[^\s]+)"  # remove http://example.com
+    r"|(?P<list>\*+\s?)"  # at the beginning of a line, see _clean_markup()
+    r"|(?P<parser_hook><[^>]{1,1024}>[^<]+</[^>]{1,255}>)"  # <ref>foo</ref>
+    r"|(?P<html><[^>]{1,1024}/?>)"  # <br> / <br />
+    r"|(?P<nbsp>&nbsp;)"
+    r"|(?P<magic_word>__\w+__)"  # __TOC__
+    r")",
+    flags=re.MULTILINE,
+)
+
+# markup replaced with a space, the rest is either removed or replaced with its inner text
+_MARKUP_REPLACED_WITH_SPACE = ("parser_hook", "html", "nbsp")
+_MARKUP_WITH_INNER_TEXT = ("link", "piped_link", "external_link")
+
+
+def _strip_templates_and_tables(text: str, tables: bool = True) -> str:
     """
-    # basic formatting
-    text = re.sub(r"'''?([^']+)'''?", "\\1", text)
-
-    # templates
-    # {{foo}}
-    # {{foo|{{test}}|123}}
-    while "{{" in text:
-        start = text.find("{{")
-        level = 1
-        pos = start + 2
-
-        while pos < len(text):
-            # print('>' + text[pos:pos+2] + '<')
-
-            if text[pos : pos + 2] == "{{":
-                # nested template - enter next level
-                level += 1
-                pos += 1
-            elif text[pos : pos + 2] == "}}":
+    Replaces templates with a space and removes tables in a single, linear scan.
+
+    {{foo}} / {{foo|{{test}}|123}} / {|foo..|}
+    """
+    pieces = []
+    last = 0  # the end of the text already copied to pieces
+
+    level = 0  # templates nesting level
+    template_start = 0
+    template_end = -1  # position right after the most recently removed template
+
+    table_start = None  # index of pieces where the current table starts
+    table_content_start = 0  # position right after {|
+
+    for match in _BRACES.finditer(text):
+        token = match.group()
+
+        if token == "{{":
+            # nested template - enter next level
+            if level == 0:
+                template_start = match.start()
+            level += 1
+        elif level > 0:
+            if token == "}}":
                 # nested template - leave this level
-                pos += 1
                 level -= 1
 
-            # template is now completed
-            if level == 0:
-                # print(text, start, pos, text[start:pos+1])
-                text = text[:start] + " " + text[pos + 1 :]
-                break
+                # template is now completed
+                if level == 0:
+                    pieces.append(text[last:template_start])
+                    pieces.append(" ")
+                    last = template_end = match.end()
+        elif token == "{|":
+            if tables and table_start is None:
+                pieces.append(text[last : match.start()])
+                last = match.start()
+                table_start = len(pieces)
+                table_content_start = match.end()
+        elif table_start is not None:
+            # the first closing brace ends the table when preceded by "|"
+            # and there's something between it and the opening {|
+            pos = match.start()
 
-            # check next character
-            pos += 1
+            if (
+                pos != template_end
+                and text[pos - 1] == "|"
+                and pos - 1 > table_content_start
+            ):
+                del pieces[table_start:]
+                last = pos + 1
 
-        # the template is not well balanced, leave the endless loop
-        if level != 0:
-            break
+            table_start = None
 
-    # tables
-    text = re.sub(r"{\|[^}]+\|}", "", text)  # {|foo..|}
+    if level != 0 and tables:
+        # the template is not well balanced and the rest of the text is kept intact,
+        # remove tables up to the first closing brace then
+        return _strip_tables(_strip_templates_and_tables(text, tables=False))
 
-    # headings
-    text = re.sub(
-        r"^=+\s?([^=]+)\s?=+",
-        lambda matches: matches.group(1).strip(),
-        text,
-        flags=re.MULTILINE,
-    )  # == a == -> a
+    pieces.append(text[last:])
+    return "".join(pieces)
 
-    # files and other links with namespaces
-    text = re.sub(r"\[\[[^:\]]+:[^\]]+\]\]", "", text)  # [[foo:b]] -> ''
 
-    # local links
-    text = re.sub(r"\[\[([^|\]]+)\]\]", "\\1", text)  # [[a]] -> a
-    text = re.sub(r"\[\[[^|]+\|([^\]]+)\]\]", "\\1", text)  # [[a|b]] -> b
+def _strip_tables(text: str) -> str:
+    """
+    Removes tables that end at the first closing brace after {| - gives the same result
+    as re.sub(r"{\\|[^}]+\\|}", "", text), but does not rescan the text from each {|
+    """
+    segments = text.split("}")
+    pieces = []
 
-    text = text.replace("[[", "").replace("]]", "")
+    for segment in segments[:-1]:
+        start = segment.find("{|")
 
-    # external links
-    text = re.sub(
-        r"\[http[^\s]+ ([^\]]+)\]", "\\1", text
-    )  # [[http://example.com foo]] -> foo
-    text = re.sub(r"https?://[^\s]+", "", text)  # remove http://example.com
+        # the table needs some content and "|" right before the closing brace
+        if start != -1 and segment.endswith("|") and len(segment) - start > 3:
+            pieces.append(segment[:start])
+        else:
+            pieces.append(segment + "}")
 
-    # lists
-    text = re.sub(r"^\*+\s?", "", text, flags=re.MULTILINE)
+    pieces.append(segments[-1])
+    return "".join(pieces)
 
-    # parser hooks
-    text = re.sub(r"<[^>]+>[^<]+</[^>]+>", " ", text)  # <ref>foo</ref>
 
-    # HTML
-    text = re.sub(r"<[^>]+/?>", " ", text)  # <br> / <br />
-    text = text.replace("&nbsp;", " ")
+def _clean_markup(text: str, start: int, end: int, pieces: List[str]):
+    """
+    Appends the cleaned up text[start:end] to the pieces list
+    """
+    last = start
+
+    for match in _MARKUP.finditer(text, start, end):
+        if last < match.start():
+            pieces.append(text[last : match.start()])
+        last = match.end()
+
+        kind = match.lastgroup
+
+        if kind in _MARKUP_REPLACED_WITH_SPACE:
+            pieces.append(" ")
+        elif kind == "list":
+            # list markers are removed at the beginning of a line of the cleaned up text,
+            # i.e. also when the markup before them on that line was removed.
+            # An empty piece marks the line as no longer empty (see magic words)
+            at_line_start = not pieces or pieces[-1].endswith("\n")
+            pieces.append("" if at_line_start else match.group())
+        elif kind == "magic_word":
+            # magic words used to be removed after list markers,
+            # the marker that follows is not at the beginning of a line then
+            pieces.append("")
+        elif kind in _MARKUP_WITH_INNER_TEXT:
+            # keep the inner text, but clean it up as well
+            inner_start, inner_end = match.span(f"{kind}_text")
+            _clean_markup(text, inner_start, inner_end, pieces)
+        elif kind == "heading":
+            inner_start, inner_end = match.span("heading_text")
+            heading = text[inner_start:inner_end]
+
+            # strip the heading text
+            inner_start += len(heading) - len(heading.lstrip())
+            inner_end -= len(heading) - len(heading.rstrip())
+            _clean_markup(text, inner_start, max(inner_start, inner_end), pieces)
+
+    if last < end:
+        pieces.append(text[last:end])
+
+
+def clean(text: str) -> str:
+    """Cleans up the provided wikitext.
+    Removes templates, tables, parser hooks, magic words, HTML tags and file embeds.
+    Keeps links.
 
-    # magic words
-    text = re.sub(r"__\w+__", "", text)  # __TOC__
+    Runs in a linear time - bold and italic markup is removed first, templates
+    and tables are removed in the next scan, the rest of the markup is handled
+    in the last one (with a bounded length of links and tags, see _MARKUP).
+    """
+    text = _BOLD.sub("\\1", text)
+    text = _strip_templates_and_tables(text)
 
-    return text.strip()
+    pieces = []
+    _clean_markup(text, 0, len(text), pieces)
+
+    return "".join(pieces).strip()
 
 
 def tokenize_filter(text: str) -> bool:
@@ -113,3 +220,206 @@ def tokenize(text: str, filter_func: Callable = tokenize_filter) -> List[str]:
     parts = filter(filter_func, parts)
 
     return list(parts)
+
+
+# runs of characters that are neither a noise nor a separator (see tokenize() above)
+_TOKEN = re.compile(r'[^?.,:;!()=+"\-–\s/|_&{}\xAD]+')
+
+
+def iter_tokens(
+    text: str, filter_func: Callable = tokenize_filter
+) -> Generator[str, None, None]:
+    """Yields tokens of a given text one by one, without building a list of them.
+    Gives the same tokens as tokenize()."""
+    for match in _TOKEN.finditer(text):
+        token = match.group()
+
+        if filter_func(token):
+            yield token
+
+
+def clean_and_tokenize(text: str, filter_func: Callable = tokenize_filter) -> List[str]:
+    """Cleans up the wikitext and tokenizes it."""
+    return tokenize(clean(text), filter_func)
+
+
+def _get_texts(items: Iterable[Union[str, DumpEntry]]) -> Generator[str, None, None]:
+    """Takes the content of DumpEntry objects, passes strings as they are"""
+    for item in items:
+        yield item.content if isinstance(item, DumpEntry) else item
+
+
+def _get_cache_key(item: Union[str, DumpEntry]) -> str:
+    """Revision's SHA-1 from the dump or the SHA-1 of the text"""
+    if isinstance(item, DumpEntry):
+        if item.sha1:
+            return item.sha1
+        item = item.content
+
+    return sha1(item.encode("utf-8")).hexdigest()
+
+
+def _get_filter_name(filter_func: Callable) -> Optional[str]:
+    """
+    Returns the module and the name of a given filter, used as a part of the cache namespace.
+    None is returned for lambdas, nested functions, partials etc. that can not be told apart.
+    """
+    name = getattr(filter_func, "__qualname__", None)
+
+    if name is None or "<" in name:
+        return None
+
+    return f"{filter_func.__module__}.{name}"
+
+
+def _get_cache_namespace(name: str, filter_func: Callable) -> Optional[str]:
+    filter_name = _get_filter_name(filter_func)
+    return f"{name}:{filter_name}" if filter_name is not None else None
+
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+def _map_texts(
+    func: Callable,
+    items: Iterable[Union[str, DumpEntry]],
+    workers: Optional[int],
+    chunk_size: int,
+    max_in_flight: Optional[int],
+    cache: Optional["TextCache"] = None,
+    cache_namespace: Optional[str] = None,
+    tokens: bool = False,
+) -> Generator:
+    """
+    Runs parallel_map() on texts, results stored in the cache are not computed again.
+
+    :param cache_namespace: results are not cached when it's None
+    :param tokens: results are lists of tokens (stored as JSON), not strings
+    """
+    if cache is None or cache_namespace is None:
+        yield from parallel_map(
+            func, _get_texts(items), workers, chunk_size, max_in_flight
+        )
+        return
+
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+
+    # look up and compute in batches that keep all workers busy
+    executor = (
+        concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        if workers > 1
+        else None
+    )
+
+    try:
+        for batch in iter_chunks(items, chunk_size * max_in_flight):
+            keys = [_get_cache_key(item) for item in batch]
+            cached = cache.get_many(cache_namespace, keys)
+
+            missing = {key: item for key, item in zip(keys, batch) if key not in cached}
+            computed = dict(
+                zip(
+                    missing,
+                    parallel_map(
+                        func,
+                        _get_texts(missing.values()),
+                        workers,
+                        chunk_size,
+                        max_in_flight,
+                        executor,
+                    ),
+                )
+            )
+
+            cache.set_many(
+                cache_namespace,
+                (
+                    (key, json.dumps(value, ensure_ascii=False) if tokens else value)
+                    for key, value in computed.items()
+                ),
+            )
+
+            for key in keys:
+                if key in computed:
+                    yield computed[key]
+                elif tokens:
+                    yield json.loads(cached[key])
+                else:
+                    yield cached[key]
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments
+def clean_many(
+    items: Iterable[Union[str, DumpEntry]],
+    workers: Optional[int] = None,
+    chunk_size: int = 64,
+    max_in_flight: Optional[int] = None,
+    cache: Optional["TextCache"] = None,
+) -> Generator[str, None, None]:
+    """
+    Cleans up wikitexts (or content of DumpEntry objects) using a pool of processes.
+    Results are yielded in order.
+
+    See mediawiki_dump.utils.parallel_map() for the description of parameters.
+
+    When TextCache instance is provided, texts that were already cleaned up
+    (with the same revision SHA-1) are taken from the cache.
+    """
+    yield from _map_texts(
+        clean, items, workers, chunk_size, max_in_flight, cache, "clean"
+    )
+
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments
+def tokenize_many(
+    items: Iterable[Union[str, DumpEntry]],
+    filter_func: Callable = tokenize_filter,
+    workers: Optional[int] = None,
+    chunk_size: int = 64,
+    max_in_flight: Optional[int] = None,
+    cache: Optional["TextCache"] = None,
+) -> Generator[List[str], None, None]:
+    """
+    Tokenizes texts (or content of DumpEntry objects) using a pool of processes.
+    Results are yielded in order.
+
+    filter_func needs to be picklable, i.e. defined at the module level.
+    Results are cached only for such filters (see _get_filter_name()).
+    """
+    yield from _map_texts(
+        partial(tokenize, filter_func=filter_func),
+        items,
+        workers,
+        chunk_size,
+        max_in_flight,
+        cache,
+        _get_cache_namespace("tokenize", filter_func),
+        tokens=True,
+    )
+
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments
+def clean_and_tokenize_many(
+    items: Iterable[Union[str, DumpEntry]],
+    filter_func: Callable = tokenize_filter,
+    workers: Optional[int] = None,
+    chunk_size: int = 64,
+    max_in_flight: Optional[int] = None,
+    cache: Optional["TextCache"] = None,
+) -> Generator[List[str], None, None]:
+    """
+    Cleans up and tokenizes wikitexts (or content of DumpEntry objects) using a pool
+    of processes. Results are yielded in order.
+    """
+    yield from _map_texts(
+        partial(clean_and_tokenize, filter_func=filter_func),
+        items,
+        workers,
+        chunk_size,
+        max_in_flight,
+        cache,
+        _get_cache_namespace("clean_and_tokenize", filter_func),
+        tokens=True,
+    )
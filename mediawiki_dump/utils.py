@@ -2,7 +2,15 @@
 Utility functions
 """
 
+import concurrent.futures
+import os
+import time
+from collections import deque
 from datetime import datetime, timezone
+from itertools import islice
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+from typing import Callable, Dict, Generator, Iterable, Optional
 
 
 def parse_date_string(date: str) -> datetime:
@@ -13,3 +21,192 @@ def parse_date_string(date: str) -> datetime:
 
     # now apply UTC timezone
     return parsed.replace(tzinfo=timezone.utc)
+
+
+def iter_chunks(items: Iterable, chunk_size: int) -> Generator[list, None, None]:
+    """Yields lists of up to chunk_size items from a given iterable"""
+    items = iter(items)
+
+    while True:
+        chunk = list(islice(items, chunk_size))
+
+        if not chunk:
+            return
+
+        yield chunk
+
+
+def _apply_to_chunk(func: Callable, chunk: list) -> list:
+    """Runs in the worker process"""
+    return [func(item) for item in chunk]
+
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments
+def parallel_map(
+    func: Callable,
+    items: Iterable,
+    workers: Optional[int] = None,
+    chunk_size: int = 64,
+    max_in_flight: Optional[int] = None,
+    executor: Optional[concurrent.futures.Executor] = None,
+) -> Generator:
+    """
+    Applies func to each of the items in a pool of processes and yields results in order.
+
+    Items are sent to workers in chunks and at most max_in_flight chunks (two per worker
+    by default) are queued or processed at any time, so the memory usage stays bounded
+    even when items come from a very long stream (like DumpReader.read()).
+
+    func needs to be picklable (i.e. defined at the module level).
+
+    :param workers: number of worker processes, defaults to the number of CPUs,
+        when set to 1 items are processed in the current process
+    :param executor: an already running pool to use, it's left running when done
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+
+    if workers == 1:
+        yield from map(func, items)
+        return
+
+    # concurrent.futures imports multiprocessing on first use of ProcessPoolExecutor
+    pool = executor or concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    in_flight = deque()
+
+    try:
+        for chunk in iter_chunks(items, chunk_size):
+            in_flight.append(pool.submit(_apply_to_chunk, func, chunk))
+
+            if len(in_flight) >= max_in_flight:
+                yield from in_flight.popleft().result()
+
+        while in_flight:
+            yield from in_flight.popleft().result()
+    finally:
+        if executor is None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        else:
+            for future in in_flight:
+                future.cancel()
+
+
+# pylint: disable=too-many-instance-attributes
+class BackgroundIterator:
+    """
+    Iterates over items in a background thread and passes them to the consumer
+    via a bounded queue, so that producing the items (e.g. reading and decompressing
+    a file - both release the GIL) overlaps with consuming them.
+
+    Items are queued in batches of at least batch_bytes (as reported by len()).
+    """
+
+    def __init__(self, items: Iterable, queue_size: int = 8, batch_bytes: int = 65536):
+        self.items = items
+        self.batch_bytes = batch_bytes
+        self.queue = Queue(maxsize=queue_size)
+        self.stopped = Event()
+
+        # time (in seconds) spent by producer and consumer, see get_stats()
+        self.producer_busy = 0.0
+        self.producer_blocked = 0.0
+        self.consumer_waiting = 0.0
+        self.started = None
+        self.finished = None
+
+        # the thread does not keep the interpreter running when iteration is abandoned
+        self.thread = Thread(
+            target=self._produce, name=self.__class__.__name__, daemon=True
+        )
+
+    def _put(self, item) -> bool:
+        start = time.perf_counter()
+
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                break
+            except Full:
+                continue
+
+        self.producer_blocked += time.perf_counter() - start
+        return not self.stopped.is_set()
+
+    def _produce(self):
+        batch, size = [], 0
+        items = iter(self.items)
+
+        try:
+            while True:
+                start = time.perf_counter()
+                item = next(items, self)  # self is used as the end marker
+                self.producer_busy += time.perf_counter() - start
+
+                if item is self:
+                    break
+
+                batch.append(item)
+                size += len(item) if hasattr(item, "__len__") else 1
+
+                if size >= self.batch_bytes:
+                    if not self._put(batch):
+                        return
+                    batch, size = [], 0
+
+            self._put(batch)
+            self._put(None)
+        except Exception as ex:  # pylint: disable=broad-exception-caught
+            self._put(ex)
+        finally:
+            # e.g. closes the file when the consumer stopped early
+            if hasattr(items, "close"):
+                items.close()
+
+    def __iter__(self) -> Generator:
+        self.started = time.perf_counter()
+        self.thread.start()
+
+        try:
+            while True:
+                start = time.perf_counter()
+                batch = self.queue.get()
+                self.consumer_waiting += time.perf_counter() - start
+
+                if batch is None:
+                    break
+                if isinstance(batch, Exception):
+                    raise batch
+
+                yield from batch
+        finally:
+            self.finished = time.perf_counter()
+            self.close()
+
+    def close(self):
+        """Stops the background thread"""
+        self.stopped.set()
+
+        # unblock the producer, the remaining items are not needed
+        try:
+            while True:
+                self.queue.get_nowait()
+        except Empty:
+            pass
+
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Returns the elapsed time and the utilisation of both stages, i.e. the part
+        of time they were not waiting for each other
+        """
+        elapsed = ((self.finished or time.perf_counter()) - self.started) or 1e-9
+
+        return {
+            "elapsed": elapsed,
+            "producer_utilisation": self.producer_busy / elapsed,
+            "producer_blocked": self.producer_blocked,
+            "consumer_utilisation": 1 - self.consumer_waiting / elapsed,
+            "consumer_waiting": self.consumer_waiting,
+        }
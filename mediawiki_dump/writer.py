@@ -0,0 +1,418 @@
+"""
+Writes DumpEntry objects back as MediaWiki export XML
+
+Can be used to build subsets of a large dump (e.g. selected namespaces or titles),
+compressed with bz2, gzip or zstd. bz2 output can also be written as a multistream file
+with its own index, just like *-pages-articles-multistream.xml.bz2 Wikipedia dumps.
+"""
+
+import bz2
+import gzip
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from xml.sax.saxutils import escape, quoteattr
+
+from .dumps import BaseDump, DumpError
+from .entry import DumpEntry, DuplicateEntry
+from .reader import DEDUP_REFERENCE, DumpReader
+
+COMPRESSIONS = {".bz2": "bz2", ".gz": "gzip", ".zst": "zstd"}
+
+DEFAULT_METADATA = {
+    "xmlns": "http://www.mediawiki.org/xml/export-0.11/",
+    "version": "0.11",
+}
+
+
+def get_index_path(path: str) -> str:
+    """
+    Returns the path of the index file for a given multistream dump, e.g.
+    foo-multistream.xml.bz2 -> foo-multistream-index.txt.bz2
+    """
+    return re.sub(r"(\.xml)?\.bz2$", "", path) + "-index.txt.bz2"
+
+
+def _get_compression(path: str) -> Optional[str]:
+    """Returns the compression implied by the path extension"""
+    return next(
+        (value for ext, value in COMPRESSIONS.items() if path.endswith(ext)), None
+    )
+
+
+def _open_file(path: str, compression: Optional[str], level: Optional[int] = None):
+    """
+    Opens a binary file for writing, compressed with "bz2", "gzip", "zstd" or None
+
+    :param level: compression level, the library default is used when not set
+    """
+    # pylint: disable=consider-using-with
+    if compression is None:
+        return open(path, mode="wb")
+    if compression == "bz2":
+        return bz2.open(path, mode="wb", compresslevel=level or 9)
+    if compression == "gzip":
+        return gzip.open(path, mode="wb", compresslevel=level or 9)
+    if compression == "zstd":
+        try:
+            # pylint:disable=import-outside-toplevel
+            import zstandard
+        except ImportError as ex:
+            raise DumpError(
+                "zstandard package needs to be installed to write zstd files"
+            ) from ex
+
+        return zstandard.ZstdCompressor(level=level or 3).stream_writer(
+            open(path, mode="wb")
+        )
+
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def _get_namespaces_node(namespaces: List[dict]) -> str:
+    """
+    Returns the <namespaces> node, namespaces are dicts of <namespace> attributes
+    and its name (see DumpHandler.get_siteinfo())
+    """
+    nodes = []
+
+    for namespace in namespaces:
+        attributes = "".join(
+            f" {name}={quoteattr(value)}"
+            for name, value in namespace.items()
+            if name != "name"
+        )
+        name = namespace.get("name")
+        nodes.append(
+            f"      <namespace{attributes}>{escape(name)}</namespace>\n"
+            if name
+            else f"      <namespace{attributes} />\n"
+        )
+
+    return "    <namespaces>\n" + "".join(nodes) + "    </namespaces>\n"
+
+
+# pylint: disable=too-many-instance-attributes
+class DumpWriter:
+    """
+    Writes pages (and their revisions) as XML, writes are buffered and
+    passed to the compressor in batches of buffer_size bytes (in multistream mode
+    the buffer is passed to the compressor of the current stream when a page is closed)
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+        self,
+        path: str,
+        compression: Optional[str] = None,
+        multistream: bool = False,
+        index_path: Optional[str] = None,
+        pages_per_stream: int = 100,
+        buffer_size: int = 1024 * 1024,
+        dedup: bool = False,
+    ):
+        """
+        :param path: output file
+        :param compression: "bz2", "gzip", "zstd" or None, taken from the path extension by default
+        :param multistream: write each pages_per_stream pages as a separate bz2 stream
+        :param index_path: multistream index file, see get_index_path()
+        :param dedup: keep texts of the current page revisions, so that DuplicateEntry objects
+            (see DumpReader's dedup mode) can be written in full
+        """
+        if compression is None:
+            compression = _get_compression(path)
+
+        if multistream and compression != "bz2":
+            raise ValueError("Multistream output needs to be bz2-compressed")
+
+        self.path = path
+        self.compression = compression
+        self.multistream = multistream
+        self.pages_per_stream = pages_per_stream
+        self.buffer_size = buffer_size
+        self.dedup = dedup
+
+        self.file = self._open(path, compression, multistream)
+        self.index = (
+            bz2.open(index_path or get_index_path(path), mode="wt", encoding="utf-8")
+            if multistream
+            else None
+        )
+
+        self.buffer: List[str] = []
+        self.buffered_size = 0
+        self.header_written = False
+
+        # the page that is being written: (page ID, title)
+        self.page: Optional[Tuple[int, str]] = None
+
+        # dedup mode: texts of revisions of the most recent page (including skipped ones),
+        # keyed by SHA-1 (or by revision ID when the dump does not provide it)
+        self.texts_page_id: Optional[int] = None
+        self.page_texts: Dict[Union[str, int], str] = {}
+
+        # pages of the current stream, listed in the index when the stream is written
+        self.stream_pages: List[Tuple[int, str]] = []
+        self.stream_offset = 0
+        self.compressor: Optional[bz2.BZ2Compressor] = None
+
+        self.pages_count = 0
+        self.revisions_count = 0
+
+    @staticmethod
+    def _open(path: str, compression: Optional[str], multistream: bool):
+        if multistream:
+            # pylint: disable=consider-using-with
+            return open(path, mode="wb")
+
+        return _open_file(path, compression)
+
+    def write_header(
+        self, metadata: Optional[dict] = None, siteinfo: Optional[dict] = None
+    ):
+        """
+        Writes the <mediawiki> tag with given attributes (see DumpHandler.get_metadata())
+        and the <siteinfo> node (see DumpHandler.get_siteinfo())
+        """
+        attributes = "".join(
+            f" {name}={quoteattr(value)}"
+            for name, value in (metadata or DEFAULT_METADATA).items()
+        )
+        nodes = "".join(
+            (
+                _get_namespaces_node(value)
+                if name == "namespaces"
+                else f"    <{name}>{escape(value)}</{name}>\n"
+            )
+            for name, value in (siteinfo or {}).items()
+        )
+
+        self._append(f"<mediawiki{attributes}>\n  <siteinfo>\n{nodes}  </siteinfo>\n")
+        self.header_written = True
+
+        if self.multistream:
+            # the header is the first stream
+            self._write_stream()
+
+    def write(self, entry: DumpEntry):
+        """
+        Writes a revision, consecutive revisions of the same page are put
+        in a single <page> node (as in full history dumps)
+        """
+        if not self.header_written:
+            self.write_header()
+
+        content = self._get_content(entry)
+
+        if (entry.page_id, entry.title) != self.page:
+            self._close_page()
+
+            self.page = (entry.page_id, entry.title)
+            self._append(
+                "  <page>\n"
+                f"    <title>{escape(entry.title)}</title>\n"
+                f"    <ns>{entry.namespace}</ns>\n"
+                f"    <id>{entry.page_id}</id>\n"
+            )
+
+            if entry.redirect is not None:
+                self._append(f"    <redirect title={quoteattr(entry.redirect)} />\n")
+
+        if entry.contributor is not None:
+            contributor = (
+                f"<contributor><username>{escape(entry.contributor)}</username>"
+                "</contributor>"
+            )
+        else:
+            # IP addresses are not kept in DumpEntry
+            contributor = '<contributor deleted="deleted" />'
+
+        sha1 = f"      <sha1>{entry.sha1}</sha1>\n" if entry.sha1 else ""
+
+        self._append(
+            "    <revision>\n"
+            f"      <id>{entry.revision_id}</id>\n"
+            f"      <timestamp>{entry.timestamp}</timestamp>\n"
+            f"      {contributor}\n"
+            f'      <text bytes="{len(content.encode("utf-8"))}" xml:space="preserve">'
+            f"{escape(content)}</text>\n"
+            f"{sha1}"
+            "    </revision>\n"
+        )
+
+        self.revisions_count += 1
+
+    def resolve(self, entry: DumpEntry) -> DumpEntry:
+        """
+        Sets the text of DuplicateEntry objects to the text of the revision they duplicate.
+        In dedup mode texts of all revisions passed here are kept (including the ones
+        that are not written), so that their later duplicates can be resolved.
+        """
+        entry.content = self._get_content(entry)
+        return entry
+
+    def _get_content(self, entry: DumpEntry) -> str:
+        """Returns the text of the revision, duplicates are resolved using earlier revisions"""
+        if not self.dedup:
+            if isinstance(entry, DuplicateEntry):
+                raise DumpError(
+                    f"Revision #{entry.revision_id} is a duplicate, "
+                    "pass dedup=True to the writer to write it"
+                )
+
+            return entry.content
+
+        if entry.page_id != self.texts_page_id:
+            self.texts_page_id = entry.page_id
+            self.page_texts = {}
+
+        if isinstance(entry, DuplicateEntry):
+            content = self.page_texts.get(entry.sha1 or entry.duplicate_of)
+
+            if content is None:
+                raise DumpError(
+                    f"Revision #{entry.revision_id} is a duplicate of "
+                    f"#{entry.duplicate_of} that was not passed to the writer"
+                )
+        else:
+            content = entry.content
+            self.page_texts[entry.sha1 or entry.revision_id] = content
+
+        return content
+
+    def write_many(self, entries: Iterable[DumpEntry]):
+        """Writes revisions"""
+        for entry in entries:
+            self.write(entry)
+
+    def _append(self, data: str):
+        self.buffer.append(data)
+        self.buffered_size += len(data)
+
+        # multistream buffer is flushed when a page is closed, see _close_page()
+        if not self.multistream and self.buffered_size >= self.buffer_size:
+            self._flush()
+
+    def _close_page(self):
+        if self.page is None:
+            return
+
+        self._append("  </page>\n")
+        self.stream_pages.append(self.page)
+        self.pages_count += 1
+        self.page = None
+
+        if self.multistream:
+            if len(self.stream_pages) >= self.pages_per_stream:
+                self._write_stream()
+            elif self.buffered_size >= self.buffer_size:
+                self._flush()
+
+    def _flush(self):
+        """Passes the buffered XML to the compressor"""
+        data = "".join(self.buffer).encode("utf-8")
+        self.buffer = []
+        self.buffered_size = 0
+
+        if not self.multistream:
+            self.file.write(data)
+            return
+
+        if self.compressor is None:
+            # start a new bz2 stream
+            self.stream_offset = self.file.tell()
+            self.compressor = bz2.BZ2Compressor()
+
+        self.file.write(self.compressor.compress(data))
+
+    def _write_stream(self):
+        """Ends the current bz2 stream and lists its pages in the index"""
+        self._flush()
+        self.file.write(self.compressor.flush())
+        self.compressor = None
+
+        # each line is "offset:page_id:title"
+        self.index.writelines(
+            f"{self.stream_offset}:{page_id}:{title}\n"
+            for page_id, title in self.stream_pages
+        )
+        self.stream_pages = []
+
+    def close(self):
+        """Closes the last page and the <mediawiki> tag and closes the file"""
+        if not self.header_written:
+            self.write_header()
+
+        self._close_page()
+
+        if self.multistream:
+            if self.stream_pages:
+                self._write_stream()
+
+            # the closing tag is the last stream
+            self._append("</mediawiki>\n")
+            self._write_stream()
+            self.index.close()
+        else:
+            self._append("</mediawiki>\n")
+            self._flush()
+
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments
+def write_filtered_dump(
+    dump: BaseDump,
+    path: str,
+    reader: Optional[DumpReader] = None,
+    namespaces: Optional[Iterable[int]] = None,
+    titles: Optional[Iterable[str]] = None,
+    predicate: Optional[Callable[[DumpEntry], bool]] = None,
+    **writer_kwargs,
+) -> dict:
+    """
+    Reads the dump and writes revisions that pass all given filters to a new dump,
+    returns the number of pages and revisions written
+
+    :param reader: DumpReader instance, e.g. DumpReaderArticles() or DumpReader(dedup=...)
+    :param namespaces: keep pages from these namespaces only
+    :param titles: keep pages with these titles only
+    :param predicate: keep revisions for which it returns True
+    :param writer_kwargs: passed to DumpWriter constructor
+    """
+    reader = reader or DumpReader()
+    writer_kwargs.setdefault("dedup", reader.dedup == DEDUP_REFERENCE)
+    namespaces = set(namespaces) if namespaces is not None else None
+    titles = set(titles) if titles is not None else None
+
+    def passes(entry: DumpEntry) -> bool:
+        if namespaces is not None and entry.namespace not in namespaces:
+            return False
+
+        if titles is not None and entry.title not in titles:
+            return False
+
+        return predicate is None or predicate(entry)
+
+    with DumpWriter(path, **writer_kwargs) as writer:
+        for entry in reader.read(dump):
+            if not writer.header_written:
+                writer.write_header(
+                    reader.handler.get_metadata(), reader.handler.get_siteinfo()
+                )
+
+            # the text of duplicates is passed to the predicate as well
+            if passes(writer.resolve(entry)):
+                writer.write(entry)
+
+        if not writer.header_written:
+            writer.write_header(
+                reader.handler.get_metadata(), reader.handler.get_siteinfo()
+            )
+
+    return {"pages": writer.pages_count, "revisions": writer.revisions_count}
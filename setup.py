@@ -2,6 +2,12 @@ from setuptools import setup, find_packages
 
 VERSION = "1.4.0"
 
+HTTP_REQUIRES = ["requests>=2.26.0"]
+MWCLIENT_REQUIRES = ["mwclient>=0.10.1"]
+ARCHIVE_REQUIRES = ["libarchive-c==5.3"]
+ZSTD_REQUIRES = ["zstandard>=0.22.0"]
+PARQUET_REQUIRES = ["pyarrow>=14.0.0"]
+
 # @see https://packaging.python.org/tutorials/packaging-projects/#creating-setup-py
 with open("README.md", "r") as fh:
     long_description = fh.read()
@@ -32,8 +38,19 @@ setup(
         "License :: OSI Approved :: MIT License",
     ],
     python_requires=">=3.9",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks"]),
+    # network, mwclient and 7zip support are optional, reading local dumps needs none of them
     extras_require={
+        "http": HTTP_REQUIRES,
+        "mwclient": MWCLIENT_REQUIRES,
+        "7z": ARCHIVE_REQUIRES,
+        "zstd": ZSTD_REQUIRES,
+        "parquet": PARQUET_REQUIRES,
+        "all": HTTP_REQUIRES
+        + MWCLIENT_REQUIRES
+        + ARCHIVE_REQUIRES
+        + ZSTD_REQUIRES
+        + PARQUET_REQUIRES,
         "dev": [
             "black==25.11.0",
             "pylint==3.3.9",
@@ -41,10 +58,9 @@ setup(
             "pytest-cov==7.0.0",
             "responses==0.25.8",
         ]
+        + HTTP_REQUIRES
+        + MWCLIENT_REQUIRES
+        + ARCHIVE_REQUIRES,
     },
-    install_requires=[
-        "libarchive-c==5.3",
-        "requests>=2.26.0",
-        "mwclient>=0.10.1",
-    ],
+    install_requires=[],
 )
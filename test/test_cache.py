@@ -0,0 +1,57 @@
+from mediawiki_dump import cache as cache_module
+from mediawiki_dump.cache import TextCache
+
+
+def test_get_and_set(tmp_path):
+    with TextCache(str(tmp_path / "cache.db")) as cache:
+        assert cache.get("clean", "foo") is None
+
+        cache.set("clean", "foo", "bar")
+        cache.set_many("tokenize", [("foo", "a b"), ("bar", "")])
+
+        assert cache.get("clean", "foo") == "bar"
+        assert cache.get_many("tokenize", ["foo", "bar", "baz"]) == {
+            "foo": "a b",
+            "bar": "",
+        }
+        assert len(cache) == 3
+        assert (cache.hits, cache.misses) == (3, 2)
+
+        # replace the value
+        cache.set("clean", "foo", "foo bar")
+        assert cache.get("clean", "foo") == "foo bar"
+        assert cache.size == len("foo bar") + len("a b")
+
+    # the cache is persistent
+    with TextCache(str(tmp_path / "cache.db")) as cache:
+        assert cache.get("clean", "foo") == "foo bar"
+        assert cache.size == len("foo bar") + len("a b")
+
+
+def test_eviction():
+    with TextCache(":memory:", max_size=100) as cache:
+        cache.set_many("clean", [(str(i), "x" * 10) for i in range(10)])
+        assert len(cache) == 10
+
+        # make the first entry the most recently used one
+        assert cache.get("clean", "0") == "x" * 10
+
+        cache.set("clean", "new", "y" * 10)
+
+        # the least recently used entries were removed to make room for the new one
+        assert cache.size <= 90
+        assert cache.get("clean", "0") == "x" * 10
+        assert cache.get("clean", "new") == "y" * 10
+        assert cache.get("clean", "1") is None
+
+
+def test_version(tmp_path, monkeypatch):
+    with TextCache(str(tmp_path / "cache.db")) as cache:
+        cache.set("clean", "foo", "bar")
+
+    # clean() has changed, cached values are now stale
+    monkeypatch.setattr(cache_module, "CACHE_VERSION", "test")
+
+    with TextCache(str(tmp_path / "cache.db")) as cache:
+        assert len(cache) == 0
+        assert cache.get("clean", "foo") is None
@@ -1,6 +1,9 @@
+import sys
 from contextlib import contextmanager
 from typing import ContextManager, AnyStr
 from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
 
 
 import pytest
@@ -133,3 +136,73 @@ def test_fetch_via_mocked_http():
 
     assert body.startswith("<mediawiki")
     assert body.endswith("</mediawiki>\n")
+
+
+def get_export_response(request):
+    """Mocks Special:Export response for the requested titles"""
+    titles = parse_qs(urlparse(request.url).query)["pages"][0].split("\n")
+
+    pages = "".join(
+        f"<page><title>{escape(title)}</title><ns>0</ns><id>{len(title)}</id>"
+        f"<revision><id>1</id><timestamp>2018-10-29T16:01:01Z</timestamp>"
+        f"<text>{escape(title)} is a page</text></revision></page>"
+        for title in titles
+    )
+
+    return (
+        200,
+        {},
+        '<mediawiki xml:lang="en"><siteinfo><sitename>Vim Tips Wiki</sitename>'
+        "<base>https://vim.fandom.com/wiki/Vim_Tips_Wiki</base></siteinfo>"
+        f"{pages}</mediawiki>\n",
+    )
+
+
+def test_mediawiki_client_dump_batches():
+    wiki = Site(host="vim.fandom.com", path="/", do_init=False)
+    titles = [f"Page {n}" for n in range(7)]
+
+    with responses.RequestsMock() as mocked_responses:
+        mocked_responses.add_callback(
+            method=responses.GET,
+            url="https://vim.fandom.com/index.php",
+            callback=get_export_response,
+        )
+
+        dump = MediaWikiClientDump(wiki, articles=iter(titles), batch_size=3, workers=2)
+        reader = DumpReader()
+        pages = list(reader.read(dump))
+
+        # 3 + 3 + 1 pages
+        assert len(mocked_responses.calls) == 3
+        assert "curonly=1" in mocked_responses.calls[0].request.url
+
+    assert [page.title for page in pages] == titles
+    assert pages[1].content == "Page 1 is a page"
+    assert pages[1].url == "https://vim.fandom.com/wiki/Page_1"
+    assert reader.get_dump_language() == "en"
+
+
+def test_mediawiki_client_dump_errors():
+    wiki = Site(host="vim.fandom.com", path="/", do_init=False)
+
+    with responses.RequestsMock() as mocked_responses:
+        mocked_responses.add(
+            method=responses.GET, url="https://vim.fandom.com/index.php", status=503
+        )
+
+        with pytest.raises(DumpError) as ex:
+            list(MediaWikiClientDump(wiki, articles=["Foo"]).get_content())
+
+        assert "request ended with HTTP 503" in str(ex)
+
+    # no articles at all
+    assert list(DumpReader().read(MediaWikiClientDump(wiki, articles=[]))) == []
+
+
+def test_mediawiki_client_dump_requires_requests(monkeypatch):
+    wiki = Site(host="vim.fandom.com", path="/", do_init=False)
+    monkeypatch.setitem(sys.modules, "requests", None)
+
+    with pytest.raises(DumpError, match="requests package needs to be installed"):
+        MediaWikiClientDump(wiki, articles=["Foo"])
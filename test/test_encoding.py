@@ -0,0 +1,88 @@
+import sys
+from array import array
+
+import pytest
+
+from mediawiki_dump.dumps import DumpError, LocalWikipediaDump
+from mediawiki_dump.encoding import (
+    CorpusWriter,
+    EncodedCorpus,
+    Vocabulary,
+    encode_pages,
+)
+from mediawiki_dump.reader import DumpReader
+from mediawiki_dump.tokenizer import clean, tokenize
+
+
+def test_vocabulary(tmp_path):
+    vocabulary = Vocabulary()
+
+    assert vocabulary.encode(["foo", "bar", "foo"]) == array("I", [0, 1, 0])
+    assert vocabulary.encode(["bar", "test"], grow=False) == array("I", [1])
+    assert vocabulary.decode([1, 0]) == ["bar", "foo"]
+
+    assert len(vocabulary) == 2
+    assert "foo" in vocabulary
+    assert "test" not in vocabulary
+    assert vocabulary[1] == "bar"
+
+    vocabulary.save(str(tmp_path / "vocab.txt"))
+    assert Vocabulary.load(str(tmp_path / "vocab.txt")).tokens == ["foo", "bar"]
+
+
+def test_corpus_writer(tmp_path):
+    with CorpusWriter(str(tmp_path)) as writer:
+        writer.add(["foo", "bar"], page_id=12)
+        writer.add([], page_id=13)
+        writer.add(["bar", "test", "foo"], page_id=14)
+
+    with EncodedCorpus(str(tmp_path)) as corpus:
+        assert len(corpus) == 3
+        assert list(corpus.page_ids) == [12, 13, 14]
+
+        assert list(corpus[0]) == [0, 1]
+        assert list(corpus[1]) == []
+        assert list(corpus[2]) == [1, 2, 0]
+        assert corpus.decode(2) == ["bar", "test", "foo"]
+
+        with pytest.raises(IndexError):
+            corpus[3]  # pylint:disable=pointless-statement
+
+
+def test_empty_corpus(tmp_path):
+    CorpusWriter(str(tmp_path)).close()
+
+    with EncodedCorpus(str(tmp_path)) as corpus:
+        assert len(corpus) == 0
+
+
+def test_encode_pages(tmp_path):
+    dump = LocalWikipediaDump(dump_file="test/fixtures/dump.xml.bz2")
+    pages = list(DumpReader().read(dump))
+
+    corpus = encode_pages(iter(pages), str(tmp_path), workers=2)
+
+    assert list(corpus.page_ids) == [121, 2201]
+    assert corpus.decode(1) == tokenize(clean(pages[1].content))
+    assert len(corpus.vocabulary) < len(corpus.tokens)
+
+    corpus.close()
+
+
+def test_get_numpy(tmp_path, monkeypatch):
+    with CorpusWriter(str(tmp_path)) as writer:
+        writer.add(["foo", "bar", "foo"], page_id=1)
+
+    with EncodedCorpus(str(tmp_path)) as corpus:
+        try:
+            import numpy  # pylint:disable=import-outside-toplevel,unused-import
+
+            assert corpus.get_numpy(0).tolist() == [0, 1, 0]
+        except ImportError:
+            pass
+
+        # numpy is an optional dependency
+        monkeypatch.setitem(sys.modules, "numpy", None)
+
+        with pytest.raises(DumpError):
+            corpus.get_numpy(0)
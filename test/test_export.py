@@ -0,0 +1,135 @@
+import bz2
+import csv
+import gzip
+import json
+import sys
+
+import pytest
+
+from mediawiki_dump.dumps import DumpError, LocalFileDump
+from mediawiki_dump.export import (
+    CsvSink,
+    JsonLinesSink,
+    ParquetSink,
+    export_entries,
+)
+from mediawiki_dump.reader import DumpReader
+from mediawiki_dump.tokenizer import clean
+
+from benchmarks.synthetic import write_dump
+
+
+@pytest.fixture(name="pages")
+def pages_fixture(tmp_path):
+    dump_file = str(tmp_path / "dump.xml")
+    write_dump(dump_file, pages=25, text_size=200, seed=7)
+    return list(DumpReader().read(LocalFileDump(dump_file)))
+
+
+def read_jsonl(path: str) -> list:
+    opener = gzip.open if path.endswith(".gz") else open
+
+    with opener(path, mode="rt", encoding="utf-8") as file:
+        return [json.loads(line) for line in file]
+
+
+def test_jsonl_sink(tmp_path, pages):
+    path = str(tmp_path / "pages.jsonl.gz")
+
+    sink = JsonLinesSink(path, buffer_size=4096)
+    assert export_entries(iter(pages), sink) == 25
+    assert sink.files == [path]
+
+    rows = read_jsonl(path)
+    assert [row["page_id"] for row in rows] == [page.page_id for page in pages]
+    assert rows[0] == {
+        "page_id": pages[0].page_id,
+        "namespace": pages[0].namespace,
+        "title": pages[0].title,
+        "revision_id": pages[0].revision_id,
+        "timestamp": pages[0].timestamp,
+        "contributor": pages[0].contributor,
+        "sha1": pages[0].sha1,
+        "redirect": None,
+        "content": pages[0].content,
+    }
+
+
+def test_csv_sink(tmp_path, pages):
+    path = str(tmp_path / "pages.csv.bz2")
+
+    with CsvSink(path, fields=("page_id", "title", "content")) as sink:
+        sink.write_many(pages)
+
+    with bz2.open(path, mode="rt", encoding="utf-8", newline="") as file:
+        rows = list(csv.reader(file))
+
+    assert rows[0] == ["page_id", "title", "content"]
+    assert rows[1:] == [[str(page.page_id), page.title, page.content] for page in pages]
+
+
+def test_sink_rotation(tmp_path, pages):
+    path = str(tmp_path / "pages-{part:02d}.csv")
+
+    # a new file is started when the current one is above 2 kB
+    sink = CsvSink(
+        path, fields=("page_id", "content"), buffer_size=1, max_file_size=2048
+    )
+    export_entries(iter(pages), sink)
+
+    assert len(sink.files) > 2
+    assert sink.files[:2] == [
+        str(tmp_path / "pages-00.csv"),
+        str(tmp_path / "pages-01.csv"),
+    ]
+
+    page_ids = []
+    for file_name in sink.files:
+        with open(file_name, mode="rt", encoding="utf-8", newline="") as file:
+            rows = list(csv.reader(file))
+
+        # each file has its own header
+        assert rows[0] == ["page_id", "content"]
+        page_ids += [int(row[0]) for row in rows[1:]]
+
+    assert page_ids == [page.page_id for page in pages]
+
+    with pytest.raises(ValueError):
+        CsvSink(str(tmp_path / "pages.csv"), max_file_size=1024)
+
+
+def test_export_cleaned_text(tmp_path, pages):
+    path = str(tmp_path / "pages.jsonl")
+    sink = JsonLinesSink(path, fields=("title", "content"))
+
+    assert export_entries(iter(pages), sink, clean_text=True, workers=2) == 25
+    assert [row["content"] for row in read_jsonl(path)] == [
+        clean(page.content) for page in pages
+    ]
+
+
+def test_empty_export(tmp_path):
+    path = str(tmp_path / "pages.csv")
+    export_entries([], CsvSink(path, fields=("page_id", "title")))
+
+    with open(path, mode="rb") as file:
+        assert file.read() == b"page_id,title\r\n"
+
+
+def test_parquet_sink(tmp_path, pages):
+    parquet = pytest.importorskip("pyarrow.parquet")
+
+    path = str(tmp_path / "pages.parquet")
+    export_entries(iter(pages), ParquetSink(path, batch_size=10))
+
+    table = parquet.read_table(path)
+    assert table.num_rows == 25
+    assert table.column("title").to_pylist() == [page.title for page in pages]
+
+
+def test_parquet_sink_missing_pyarrow(tmp_path, monkeypatch):
+    # pyarrow is an optional dependency
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+
+    with pytest.raises(DumpError):
+        ParquetSink(str(tmp_path / "pages.parquet"))
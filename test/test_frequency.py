@@ -0,0 +1,87 @@
+from collections import Counter
+from random import Random
+
+from mediawiki_dump.dumps import LocalWikipediaDump
+from mediawiki_dump.frequency import (
+    CountMinSketch,
+    ExactWordCounter,
+    SpillingWordCounter,
+    TopWordsCounter,
+    count_words,
+)
+from mediawiki_dump.reader import DumpReader
+
+
+def get_words(count: int = 20000):
+    # Zipf-like distribution of words
+    rnd = Random(42)
+    return [f"word{int(rnd.paretovariate(1.0))}" for _ in range(count)]
+
+
+def test_exact_counter():
+    counter = ExactWordCounter()
+    counter.update(["foo", "bar", "foo"])
+    counter.update(["foo"])
+
+    assert counter.total == 4
+    assert counter.most_common(1) == [("foo", 3)]
+    assert dict(counter.items()) == {"foo": 3, "bar": 1}
+
+
+def test_spilling_counter(tmp_path):
+    words = get_words()
+    expected = Counter(words)
+
+    with SpillingWordCounter(max_words=10, tmp_dir=str(tmp_path)) as counter:
+        for i in range(0, len(words), 100):
+            counter.update(words[i : i + 100])
+
+        assert len(counter.runs) > 1, "counts were spilled to disk"
+        assert counter.total == len(words)
+
+        items = list(counter.items())
+        assert items == sorted(expected.items())
+        assert counter.most_common(3) == expected.most_common(3)
+
+    assert list(tmp_path.iterdir()) == [], "temporary files were removed"
+
+
+def test_count_min_sketch():
+    sketch = CountMinSketch(width=64, depth=3)
+    counts = Counter(get_words(2000))
+
+    for word, count in counts.items():
+        sketch.add(word, count)
+
+    # counts are never underestimated
+    for word, count in counts.items():
+        assert sketch.estimate(word) >= count
+
+    assert sketch.estimate("word1") - counts["word1"] < 100
+
+
+def test_top_words_counter():
+    words = get_words()
+    expected = Counter(words)
+
+    counter = TopWordsCounter(capacity=10, width=1024, depth=4)
+    for i in range(0, len(words), 50):
+        counter.update(words[i : i + 50])
+
+    assert len(counter.candidates) < 20
+    assert [word for word, _ in counter.most_common(3)] == [
+        word for word, _ in expected.most_common(3)
+    ]
+    assert counter.estimate("word1") >= expected["word1"]
+
+
+def test_count_words_from_dump():
+    dump = LocalWikipediaDump(dump_file="test/fixtures/dump.xml.bz2")
+    counter = count_words(DumpReader().read(dump))
+
+    assert counter.most_common(2) == [("í", 24), ("Klaksvíkar", 11)]
+
+    dump = LocalWikipediaDump(dump_file="test/fixtures/dump.xml.bz2")
+    assert count_words(DumpReader().read(dump), workers=2).most_common(
+        2
+    ) == counter.most_common(2)
@@ -0,0 +1,123 @@
+import pytest
+
+from mediawiki_dump.dumps import DumpError, LocalFileDump
+from mediawiki_dump.entry import DumpEntry, DuplicateEntry
+from mediawiki_dump.history import (
+    HistoryArchive,
+    apply_delta,
+    archive_history,
+    make_delta,
+)
+from mediawiki_dump.reader import DEDUP_REFERENCE, DumpReader
+
+
+def get_entry(revision_id: int, content: str, page_id: int = 1) -> DumpEntry:
+    return DumpEntry(
+        0, page_id, "", "Foo", content, revision_id, "2018-10-29T16:01:01Z"
+    )
+
+
+def test_delta():
+    old = "foo\nbar\n\nbaz"
+    new = "foo\nbar is changed\n\nbaz\nand a new line"
+
+    delta = make_delta(old, new)
+    assert delta == [[0, 1], "bar is changed\n", [2, 3], "baz\nand a new line"]
+    assert apply_delta(old, delta) == new
+
+    assert make_delta(old, old) == [[0, 4]]
+    assert apply_delta(old, make_delta(old, "")) == ""
+    assert apply_delta("", make_delta("", new)) == new
+
+
+def test_archive(tmp_path):
+    texts = [
+        "\n".join(f"line #{line}" for line in range(revision))
+        for revision in range(1, 30)
+    ]
+
+    with HistoryArchive(str(tmp_path / "history.db"), snapshot_interval=10) as archive:
+        archive.add_many(
+            [get_entry(revision_id, text) for revision_id, text in enumerate(texts)]
+        )
+        archive.add(get_entry(100, "Another page", page_id=2))
+
+        assert archive.get_revisions(1) == list(range(len(texts)))
+        assert archive.get_revisions(2) == [100]
+        assert archive.get(123) is None
+
+        # every 10th revision is a snapshot
+        assert [
+            row[0]
+            for row in archive.connection.execute(
+                "SELECT revision_id FROM revisions WHERE parent_id IS NULL"
+            )
+        ] == [0, 10, 20, 100]
+
+        stats = archive.get_stats()
+        assert stats["revisions"] == 30
+        assert stats["size"] == sum(len(text) for text in texts) + 12
+        assert stats["stored_size"] < stats["size"] / 3
+
+    # reopen the archive and continue with the page
+    with HistoryArchive(str(tmp_path / "history.db"), snapshot_interval=10) as archive:
+        archive.add(get_entry(200, texts[-1] + "\nthe last line"))
+
+        for revision_id, text in enumerate(texts):
+            assert archive.get(revision_id) == text
+
+        assert archive.get(100) == "Another page"
+        assert archive.get(200) == texts[-1] + "\nthe last line"
+
+
+def test_archive_history(tmp_path):
+    dump = LocalFileDump(dump_file="test/fixtures/history.xml")
+    entries = list(DumpReader(dedup=DEDUP_REFERENCE).read(dump))
+
+    with archive_history(entries, str(tmp_path / "history.db")) as archive:
+        assert archive.get_revisions(1) == [11, 12, 13]
+
+        # the revert is stored as a delta against the previous revision
+        assert archive.get(13) == "Foo is a [[bar]]."
+        assert archive.get(12) == "Foo is vandalised."
+        assert archive.get(22) == "Foo is a [[bar]]."
+
+        # archiving the same dump again skips archived revisions
+        archive.add_many(DumpReader(dedup=DEDUP_REFERENCE).read(dump))
+
+        assert archive.get_stats()["revisions"] == len(entries)
+        assert [archive.get(entry.revision_id) for entry in entries] == [
+            entry.content or archive.get(entry.duplicate_of) for entry in entries
+        ]
+
+
+def test_archive_out_of_order(tmp_path):
+    with HistoryArchive(str(tmp_path / "history.db")) as archive:
+        archive.add_many([get_entry(20, "foo\nbar"), get_entry(10, "foo")])
+        archive.add(get_entry(30, "foo\nbar\nbaz"))
+
+        # revisions are stored as deltas against older revisions only
+        assert list(
+            archive.connection.execute(
+                "SELECT revision_id, parent_id FROM revisions ORDER BY revision_id"
+            )
+        ) == [(10, None), (20, None), (30, 20)]
+        assert archive.get(10) == "foo"
+        assert archive.get(20) == "foo\nbar"
+        assert archive.get(30) == "foo\nbar\nbaz"
+
+        # a broken delta chain raises an error instead of looping forever
+        archive.connection.execute(
+            "UPDATE revisions SET parent_id = 30 WHERE revision_id = 30"
+        )
+
+        with pytest.raises(DumpError, match="has a cycle"):
+            archive.get(30)
+
+
+def test_archive_duplicate_of_missing_revision(tmp_path):
+    with HistoryArchive(str(tmp_path / "history.db")) as archive:
+        entry = DuplicateEntry(11, 0, 1, "", "Foo", None, 13, "2018-10-29T16:01:01Z")
+
+        with pytest.raises(DumpError, match="#11 that is not archived"):
+            archive.add(entry)
@@ -0,0 +1,37 @@
+import subprocess
+import sys
+
+# packages that are not needed to read local dumps and tokenize their content
+OPTIONAL = ("requests", "mwclient", "libarchive", "asyncio", "multiprocessing")
+
+
+def get_imported_modules(code: str) -> list:
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys; {code}; print('\\n'.join(sys.modules))",
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return result.stdout.split()
+
+
+def test_reader_and_tokenizer_import_no_optional_dependencies():
+    modules = get_imported_modules(
+        "import mediawiki_dump.reader, mediawiki_dump.tokenizer"
+    )
+
+    assert "mediawiki_dump.reader" in modules
+    assert [module for module in modules if module.split(".")[0] in OPTIONAL] == []
+
+
+def test_dumps_import_requests_when_needed():
+    modules = get_imported_modules(
+        "from mediawiki_dump.dumps import WikipediaDump; WikipediaDump('fo').http"
+    )
+
+    assert "requests" in modules
+    assert "mwclient" not in modules
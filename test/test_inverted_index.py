@@ -0,0 +1,103 @@
+from mediawiki_dump.dumps import LocalFileDump, LocalWikipediaDump
+from mediawiki_dump.inverted_index import (
+    InvertedIndex,
+    InvertedIndexWriter,
+    build_inverted_index,
+    decode_postings,
+    encode_postings,
+)
+from mediawiki_dump.reader import DumpReader
+from mediawiki_dump.tokenizer import clean, tokenize
+
+from benchmarks.synthetic import write_dump
+
+
+def test_postings_encoding():
+    page_ids = [1, 2, 130, 20000, 2**40]
+    encoded = encode_postings(page_ids)
+
+    # small deltas take a single byte
+    assert encoded[:2] == b"\x01\x01"
+    assert len(encoded) < 8 * len(page_ids)
+    assert decode_postings(encoded) == page_ids
+    assert decode_postings(b"") == []
+
+
+def test_inverted_index_writer(tmp_path):
+    # spill after every page, so that all postings are merged from sorted runs
+    with InvertedIndexWriter(str(tmp_path), max_postings=1) as writer:
+        writer.add(["Foo", "bar", "foo"], page_id=14)
+        writer.add(["bar"], page_id=2)
+        writer.add([], page_id=3)
+        writer.add(["żółw", "bar"], page_id=7)
+
+    with InvertedIndex(str(tmp_path)) as index:
+        assert len(index) == 3
+        assert [index.get_term(i) for i in range(len(index))] == ["bar", "foo", "żółw"]
+
+        assert index.get_postings("bar") == [2, 7, 14]
+        assert index.get_postings("FOO") == [14]
+        assert index.get_postings("Żółw") == [7]
+        assert index.get_postings("test") == []
+        assert index.document_frequency("bar") == 3
+
+        assert index.search("bar", "foo") == [14]
+        assert index.search("foo", "żółw") == []
+        assert index.search("foo", "żółw", match_all=False) == [7, 14]
+        assert index.search() == []
+
+
+def test_empty_inverted_index(tmp_path):
+    InvertedIndexWriter(str(tmp_path)).close()
+
+    with InvertedIndex(str(tmp_path)) as index:
+        assert len(index) == 0
+        assert index.search("foo") == []
+
+
+def test_build_inverted_index(tmp_path):
+    dump = LocalWikipediaDump(dump_file="test/fixtures/dump.xml.bz2")
+    pages = list(DumpReader().read(dump))
+
+    index = build_inverted_index(iter(pages), str(tmp_path), workers=2)
+
+    words = {
+        page.page_id: {token.lower() for token in tokenize(clean(page.content))}
+        for page in pages
+    }
+
+    assert index.get_postings("a") == [2201]
+    assert index.search("fór") == sorted(
+        page_id for page_id, tokens in words.items() if "fór" in tokens
+    )
+    assert len(index) == len(words[121] | words[2201])
+
+    index.close()
+
+
+def test_build_inverted_index_runs(tmp_path):
+    dump_file = str(tmp_path / "dump.xml")
+    write_dump(dump_file, pages=50, text_size=500, seed=3)
+    pages = list(DumpReader().read(LocalFileDump(dump_file)))
+
+    # postings do not fit in memory and are merged from many runs
+    index = build_inverted_index(iter(pages), str(tmp_path / "index"), max_postings=500)
+
+    words = {
+        page.page_id: {token.lower() for token in tokenize(clean(page.content))}
+        for page in pages
+    }
+
+    # every term's postings match a brute-force scan of the pages
+    for term in set().union(*words.values()):
+        assert index.get_postings(term) == sorted(
+            page_id for page_id, tokens in words.items() if term in tokens
+        )
+
+    first, second = sorted(words[pages[0].page_id])[:2]
+    assert index.search(first, second) == sorted(
+        page_id for page_id, tokens in words.items() if {first, second}.issubset(tokens)
+    )
+    assert len(index) == len(set().union(*words.values()))
+
+    index.close()
@@ -0,0 +1,106 @@
+import time
+
+from benchmarks.synthetic import write_dump
+from mediawiki_dump.dumps import LocalFileDump
+from mediawiki_dump.links import (
+    ExternalLink,
+    LinkGraph,
+    WikiLink,
+    extract_links,
+    normalize_title,
+    write_link_graph,
+)
+from mediawiki_dump.reader import DumpReader
+
+TEXT = """
+{{Infobox country
+| capital = [[Tórshavn]]
+| {{{param|}}} {{#if:x|y}} {{template:cite web|url=https://example.org/a|title=A}}
+}}
+'''Foo''' is a [[bar_baz#History|bar]] and [[:Category:Lists]].
+See [https://example.com Example] or http://example.net/b.
+<!-- [[Hidden]] {{Hidden}} -->
+[[File:Foo.jpg|thumb|A [[caption link]] here]]
+{{DEFAULTSORT:Foo}}
+[[Category:Foo|sort key]]
+[[ category : bar_x]]
+"""
+
+
+def test_normalize_title():
+    assert normalize_title("foo_bar ") == "Foo bar"
+    assert normalize_title("  foo   bar") == "Foo bar"
+    assert normalize_title("") == ""
+
+
+def test_extract_links():
+    page_links = extract_links(TEXT)
+
+    assert page_links.links == [
+        WikiLink("Tórshavn"),
+        WikiLink("Bar baz", anchor="History", text="bar"),
+        WikiLink("Category:Lists"),
+        WikiLink("Caption link"),
+    ]
+    assert page_links.categories == ["Foo", "Bar x"]
+    assert page_links.templates == ["Infobox country", "Cite web"]
+    assert page_links.external_links == [
+        ExternalLink("https://example.org/a"),
+        ExternalLink("https://example.com", "Example"),
+        ExternalLink("http://example.net/b"),
+    ]
+
+
+def test_extract_links_localized_categories():
+    page_links = extract_links("[[Bólkur:Føroyar]] [[Category:Foo]]", ["Bólkur"])
+
+    assert page_links.categories == ["Føroyar"]
+    assert page_links.links == [WikiLink("Category:Foo")]
+
+
+def test_extract_links_empty():
+    assert extract_links("Plain text") == ([], [], [], [])
+
+    # links to sections of the same page
+    assert extract_links("[[#History|above]] [[ #Foo]] [[:#Bar]]").links == []
+
+
+def test_extract_links_unclosed_markup():
+    # used to take up to a minute, each opener was scanned till the end of the text
+    for markup in ("<!-- x ", "[http://a b ", "[//a", "[[a|b "):
+        start = time.perf_counter()
+        extract_links(markup * 20000)
+        assert time.perf_counter() - start < 3, markup
+
+    page_links = extract_links("<!-- [[a]] --> [[b]] <!-- [[c]] [//d e] <!-- [[f]]")
+    assert page_links.links == [WikiLink("B"), WikiLink("C"), WikiLink("F")]
+    assert page_links.external_links == [ExternalLink("//d", "e")]
+
+
+def test_write_link_graph(tmp_path):
+    dump = LocalFileDump(write_dump(str(tmp_path / "dump.xml"), pages=20))
+    entries = list(DumpReader().read(dump))
+
+    graph = write_link_graph(entries, str(tmp_path / "graph"), workers=2)
+
+    expected = {
+        entry.page_id: list(
+            dict.fromkeys(link.target for link in extract_links(entry.content).links)
+        )
+        for entry in entries
+    }
+    assert graph.get_targets("links") == {
+        page_id: targets for page_id, targets in expected.items() if targets
+    }
+
+    # every synthetic page has a category and an infobox
+    categories = graph.get_targets("categories")
+    assert sorted(categories) == [entry.page_id for entry in entries]
+    assert all(title.startswith("Category:") for title in sum(categories.values(), []))
+
+    templates = graph.get_targets("templates")
+    assert all("Template:Convert" in titles for titles in templates.values())
+
+    edges = LinkGraph(str(tmp_path / "graph")).get_edges("templates")
+    assert edges.typecode == "I"
+    assert len(edges) == 2 * sum(map(len, templates.values()))
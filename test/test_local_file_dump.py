@@ -1,6 +1,8 @@
 import bz2
+
 import pytest
 
+from benchmarks.synthetic import write_dump
 from mediawiki_dump.dumps import LocalFileDump, IteratorDump
 from mediawiki_dump.reader import DumpReader
 
@@ -32,3 +34,59 @@ def test_read_compressed_local_file_as_stream():
     print(pages)
 
     assert pages == ["MediaWiki:Logouttext", "Klaksvíkar kommuna"]
+
+
+def read_revision_ids(dump) -> list:
+    return [entry.revision_id for entry in DumpReader().read(dump)]
+
+
+def test_read_local_file_mmap(tmp_path):
+    path = write_dump(str(tmp_path / "dump.xml"), pages=40, text_size=512)
+    expected = read_revision_ids(LocalFileDump(path))
+
+    dump = LocalFileDump(path, use_mmap=True, window_size=1000)
+    chunks = list(dump.get_content())
+
+    assert all(isinstance(chunk, memoryview) for chunk in chunks)
+    assert max(len(chunk) for chunk in chunks) == 1000
+    assert read_revision_ids(dump) == expected
+
+    # the pipeline keeps the windows in a queue
+    pages = list(DumpReader(pipeline_depth=2).read(dump))
+    assert [page.revision_id for page in pages] == expected
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_read_local_file_from_offset(tmp_path, use_mmap):
+    path = write_dump(str(tmp_path / "dump.xml"), pages=40, text_size=512)
+    expected = read_revision_ids(LocalFileDump(path))
+
+    with open(path, mode="rb") as file:
+        content = file.read()
+
+    # page-aligned offset of the 11th page and an offset in the middle of the 31st page
+    start = content.index(b"<page>\n    <title>", content.index(b"<id>11</id>") - 200)
+    middle = content.index(b"<id>31</id>")
+
+    parts = [
+        LocalFileDump(path, use_mmap=use_mmap, end=start),
+        LocalFileDump(path, use_mmap=use_mmap, start=start, end=middle),
+        LocalFileDump(path, use_mmap=use_mmap, start=middle),
+    ]
+
+    assert [read_revision_ids(part) for part in parts] == [
+        expected[:10],
+        expected[10:31],
+        expected[31:],
+    ]
+
+    reader = DumpReader()
+    list(reader.read(parts[2]))
+    assert reader.handler.get_siteinfo()["dbname"] == "enwiki"
+
+
+def test_read_empty_file_mmap(tmp_path):
+    (tmp_path / "empty.xml").touch()
+    assert not list(
+        LocalFileDump(str(tmp_path / "empty.xml"), use_mmap=True).get_content()
+    )
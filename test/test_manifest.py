@@ -0,0 +1,162 @@
+import pytest
+
+from benchmarks.synthetic import write_dump, write_multistream_dump
+from mediawiki_dump.dumps import (
+    IteratorDump,
+    LocalFileDump,
+    LocalMultistreamDump,
+    LocalWikipediaDump,
+)
+from mediawiki_dump.manifest import Manifest
+from mediawiki_dump.reader import DumpReader, DumpReaderArticles
+
+NEW_DUMP = """
+<mediawiki xml:lang="en">
+  <siteinfo><base>https://en.wikipedia.org/wiki/Main_Page</base></siteinfo>
+  {pages}
+</mediawiki>
+"""
+
+PAGE = """
+  <page>
+    <title>{title}</title><ns>{namespace}</ns><id>{page_id}</id>
+    <revision>
+      <id>{revision_id}</id><timestamp>2001-01-15T13:15:00Z</timestamp>
+      <text>{text}</text><sha1>{sha1}</sha1>
+    </revision>
+  </page>
+"""
+
+
+def get_dump(*pages) -> IteratorDump:
+    """Pages are (title, page ID, revision ID, SHA-1[, namespace[, text]]) tuples"""
+    xml = NEW_DUMP.format(
+        pages="".join(
+            PAGE.format(
+                title=title,
+                page_id=page_id,
+                revision_id=revision_id,
+                sha1=sha1,
+                namespace=rest[0] if rest else 0,
+                text=rest[1] if len(rest) > 1 else f"{title} text",
+            )
+            for title, page_id, revision_id, sha1, *rest in pages
+        )
+    )
+
+    return IteratorDump([xml.encode("utf-8")])
+
+
+def test_manifest(tmp_path):
+    manifest = Manifest()
+    manifest.add(1, 11, "foo")
+    manifest.add(1, 13, "bar")
+    manifest.add(1, 12, "baz")  # an older revision
+    manifest.add(2, 21)
+
+    assert len(manifest) == 2
+    assert 1 in manifest
+    assert manifest.get(1) == (13, "bar")
+    assert manifest.get(3) is None
+
+    assert manifest.is_changed(3, 1, "foo") is True  # a new page
+    assert manifest.is_changed(1, 13, "bar") is False
+    assert manifest.is_changed(1, 12, "foo") is False  # an older revision
+    assert manifest.is_changed(1, 14, "bar") is False  # a null edit
+    assert manifest.is_changed(1, 14, "foo") is True
+    assert manifest.is_changed(2, 22, "foo") is True  # no SHA-1 in the manifest
+
+    manifest.save(str(tmp_path / "manifest.tsv"))
+    loaded = Manifest.load(str(tmp_path / "manifest.tsv"))
+
+    assert loaded.pages == manifest.pages
+    assert loaded.get_deleted(manifest) == []
+    assert manifest.get_deleted(Manifest()) == [1, 2]
+
+
+def test_reader_manifest():
+    reader = DumpReader(manifest=Manifest())
+    list(reader.read(LocalFileDump("test/fixtures/history.xml")))
+
+    previous = reader.manifest
+    assert previous.pages == {1: (13, "k7bg8hf1r2y6ebqbfjcy2ggszidzdk0"), 2: (22, None)}
+
+    previous.add(5, 50, "foo")
+
+    reader = DumpReader(previous_manifest=previous)
+    pages = list(
+        reader.read(
+            get_dump(
+                ("Foo", 1, 14, "k7bg8hf1r2y6ebqbfjcy2ggszidzdk0"),  # a null edit
+                ("New", 3, 30, "bar"),
+                ("Changed", 5, 51, "bar"),
+            )
+        )
+    )
+
+    # only new and changed pages are emitted
+    assert [page.page_id for page in pages] == [3, 5]
+    assert reader.unchanged_count == 1
+    assert reader.deleted_page_ids == [2]
+
+    # the manifest of the new dump version is ready for the next run
+    assert reader.manifest.pages == {
+        1: (14, "k7bg8hf1r2y6ebqbfjcy2ggszidzdk0"),
+        3: (30, "bar"),
+        5: (51, "bar"),
+    }
+
+
+def test_reader_manifest_pages_not_emitted():
+    pages = [
+        ("Foo", 1, 11, "foo"),
+        ("Talk:Foo", 2, 21, "bar", 1),  # not an article
+        ("Empty", 3, 31, "baz", 0, ""),
+    ]
+
+    reader = DumpReaderArticles(manifest=Manifest())
+    assert [page.page_id for page in reader.read(get_dump(*pages))] == [1]
+    assert len(reader.manifest) == 3
+
+    # pages that are not emitted are not reported as deleted next time
+    reader = DumpReaderArticles(previous_manifest=reader.manifest)
+    assert list(reader.read(get_dump(*pages))) == []
+    assert reader.deleted_page_ids == []
+
+
+def get_sharded_dumps(tmp_path):
+    yield LocalFileDump(write_dump(str(tmp_path / "dump.xml"), pages=50))
+
+    yield LocalMultistreamDump(
+        write_multistream_dump(
+            str(tmp_path / "dump-multistream.xml.bz2"),
+            str(tmp_path / "dump-multistream-index.txt.bz2"),
+            pages_per_stream=10,
+            pages=45,
+        ),
+        str(tmp_path / "dump-multistream-index.txt.bz2"),
+    )
+
+    # can not be split, pages are assigned to shards by their IDs
+    yield LocalWikipediaDump(dump_file="test/fixtures/dump.xml.bz2")
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 7])
+def test_reader_manifest_shards(tmp_path, count):
+    for dump in get_sharded_dumps(tmp_path):
+        previous = Manifest()
+        list(DumpReader(manifest=previous).read(dump))
+
+        # pages deleted since the previous version of the dump
+        previous.add(0, 1)
+        previous.add(10**6, 1)
+
+        deleted = []
+        for index in range(count):
+            reader = DumpReader(shard=(index, count), previous_manifest=previous)
+
+            assert list(reader.read(dump)) == [], "the dump is not changed"
+            deleted += reader.deleted_page_ids
+
+        # each deleted page is reported by exactly one shard
+        assert sorted(deleted) == [0, 10**6], f"{dump} in {count} shards"
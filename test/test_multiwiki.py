@@ -0,0 +1,97 @@
+import sys
+from collections import Counter
+from unittest.mock import patch
+
+import responses
+
+from benchmarks.synthetic import write_dump
+from mediawiki_dump.dumps import LocalWikipediaDump
+from mediawiki_dump.multiwiki import MultiWikiReader
+from mediawiki_dump.reader import DumpReader, DumpReaderArticles
+
+
+def count_entries(entries) -> int:
+    return sum(1 for _ in entries)
+
+
+def write_wikis(directory) -> list:
+    dumps = []
+
+    for seed, wiki in enumerate(["fo", "pl"]):
+        path = str(directory / f"{wiki}wiki.xml.bz2")
+        write_dump(path, compression="bz2", pages=15 + seed, text_size=128, seed=seed)
+        dumps.append(LocalWikipediaDump(path))
+
+    return dumps
+
+
+def test_multi_wiki_reader_read(tmp_path):
+    dumps = write_wikis(tmp_path)
+    dumps.append(LocalWikipediaDump(str(tmp_path / "missing.xml.bz2")))
+
+    reader = MultiWikiReader(dumps, DumpReader, workers=2, batch_size=4)
+    entries = list(reader.read())
+
+    assert Counter(wiki for wiki, _ in entries) == {
+        str(tmp_path / "fowiki.xml.bz2"): 15,
+        str(tmp_path / "plwiki.xml.bz2"): 16,
+    }
+    assert list(reader.failures) == [str(tmp_path / "missing.xml.bz2")]
+    assert "FileNotFoundError" in reader.failures[str(tmp_path / "missing.xml.bz2")]
+
+
+def test_multi_wiki_reader_local_dumps_without_requests(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "requests", None)
+
+    reader = MultiWikiReader(write_wikis(tmp_path), DumpReader, workers=2)
+    assert count_entries(reader.read()) == 31
+    assert reader.failures == {}
+
+
+def test_multi_wiki_reader_aggregate(tmp_path):
+    dumps = write_wikis(tmp_path)
+    dumps.append(LocalWikipediaDump(str(tmp_path / "missing.xml.bz2")))
+
+    reader = MultiWikiReader(dumps, DumpReaderArticles, workers=2)
+    results = dict(reader.aggregate(count_entries))
+
+    assert results == {
+        str(tmp_path / "fowiki.xml.bz2"): count_entries(
+            DumpReaderArticles().read(dumps[0])
+        ),
+        str(tmp_path / "plwiki.xml.bz2"): count_entries(
+            DumpReaderArticles().read(dumps[1])
+        ),
+    }
+    assert list(reader.failures) == [str(tmp_path / "missing.xml.bz2")]
+
+
+def test_multi_wiki_reader_fetch(tmp_path):
+    write_dump(str(tmp_path / "fo.xml.bz2"), compression="bz2", pages=10)
+    body = (tmp_path / "fo.xml.bz2").read_bytes()
+
+    reader = MultiWikiReader(["fo", "xx"], DumpReader, fetch_workers=2, workers=1)
+    assert all(dump.http is reader.http for dump in reader.dumps)
+
+    with patch("mediawiki_dump.dumps.gettempdir", return_value=str(tmp_path)):
+        with responses.RequestsMock() as mocked_responses:
+            mocked_responses.add(
+                method=responses.GET,
+                url="https://dumps.wikimedia.org/fowiki/latest/"
+                "fowiki-latest-pages-meta-current.xml.bz2",
+                body=body,
+                headers={"content-length": str(len(body))},
+            )
+            mocked_responses.add(
+                method=responses.GET,
+                url="https://dumps.wikimedia.org/xxwiki/latest/"
+                "xxwiki-latest-pages-meta-current.xml.bz2",
+                status=404,
+                headers={"content-length": "0"},
+            )
+
+            entries = list(reader.read())
+
+    assert len(entries) == 10
+    assert {wiki for wiki, _ in entries} == {"fo"}
+    assert "HTTP 404" in reader.failures["xx"]
@@ -0,0 +1,101 @@
+import pytest
+import responses
+
+from benchmarks.synthetic import write_dump
+from mediawiki_dump.dumps import DumpError, LocalWikipediaDump
+from mediawiki_dump.parts import (
+    MultiPartReader,
+    WikipediaPartDump,
+    get_dump_parts,
+    get_local_parts,
+)
+from mediawiki_dump.reader import DumpReader, DumpReaderArticles
+
+PARTS = [
+    "enwiki-20240101-pages-articles10.xml-p100p199.bz2",
+    "enwiki-20240101-pages-articles2.xml-p20p99.bz2",
+    "enwiki-20240101-pages-articles1.xml-p1p19.bz2",
+]
+
+
+def write_parts(directory) -> list:
+    for seed, name in enumerate(PARTS):
+        write_dump(
+            str(directory / name),
+            compression="bz2",
+            pages=20,
+            text_size=256,
+            namespaces={0: 0.5, 1: 0.5},
+            seed=seed,
+        )
+
+    (directory / "enwiki-20240101-pages-articles-multistream.xml.bz2").touch()
+    return get_local_parts(str(directory))
+
+
+def test_get_local_parts(tmp_path):
+    parts = write_parts(tmp_path)
+
+    assert [part.dump_file for part in parts] == [
+        str(tmp_path / name) for name in reversed(PARTS)
+    ]
+
+
+def test_get_dump_parts():
+    files = {name: {"url": f"/enwiki/20240101/{name}", "size": 123} for name in PARTS}
+    files["enwiki-20240101-pages-articles-multistream.xml.bz2"] = {"url": "/foo"}
+
+    with responses.RequestsMock() as mocked_responses:
+        mocked_responses.add(
+            method=responses.GET,
+            url="https://dumps.wikimedia.org/enwiki/20240101/dumpstatus.json",
+            json={"jobs": {"articlesdump": {"status": "done", "files": files}}},
+        )
+
+        parts = get_dump_parts("en", "20240101")
+
+    assert all(isinstance(part, WikipediaPartDump) for part in parts)
+    assert [part.get_url() for part in parts] == [
+        f"https://dumps.wikimedia.org/enwiki/20240101/{name}"
+        for name in reversed(PARTS)
+    ]
+
+    with responses.RequestsMock() as mocked_responses:
+        mocked_responses.add(
+            method=responses.GET,
+            url="https://dumps.wikimedia.org/enwiki/20240101/dumpstatus.json",
+            status=404,
+        )
+
+        with pytest.raises(DumpError):
+            get_dump_parts("en", "20240101")
+
+
+def test_multi_part_reader(tmp_path):
+    parts = write_parts(tmp_path)
+
+    expected = sorted(
+        (entry.revision_id, entry.title)
+        for part in parts
+        for entry in DumpReaderArticles().read(part)
+    )
+
+    reader = MultiPartReader(DumpReaderArticles, workers=2, batch_size=3)
+    entries = list(reader.read(parts))
+
+    assert sorted((entry.revision_id, entry.title) for entry in entries) == expected
+    assert all(entry.namespace == 0 for entry in entries)
+
+    assert reader.get_dump_language() == "en"
+    assert reader.get_siteinfo()["dbname"] == "enwiki"
+    assert reader.get_base_url() == "https://en.wikipedia.org/wiki/"
+
+
+def test_multi_part_reader_error(tmp_path):
+    parts = write_parts(tmp_path)
+    parts.append(LocalWikipediaDump(str(tmp_path / "missing.xml.bz2")))
+
+    with pytest.raises(DumpError) as ex:
+        list(MultiPartReader(DumpReader, workers=2).read(parts))
+
+    assert "Failed to read dump part #3" in str(ex)
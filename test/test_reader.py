@@ -1,6 +1,24 @@
-from mediawiki_dump.dumps import WikiaDump, LocalFileDump, LocalWikipediaDump
-from mediawiki_dump.entry import DumpEntry
-from mediawiki_dump.reader import DumpReader, DumpReaderArticles
+import asyncio
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from benchmarks.synthetic import write_dump, write_multistream_dump
+from mediawiki_dump.dumps import (
+    LocalFileDump,
+    LocalMultistreamDump,
+    LocalWikipediaDump,
+    WikiaDump,
+)
+from mediawiki_dump.entry import DumpEntry, DuplicateEntry
+from mediawiki_dump.reader import (
+    DEDUP_REFERENCE,
+    DEDUP_SKIP,
+    DumpReader,
+    DumpReaderArticles,
+)
 
 
 class WikiaDumpFixture(WikiaDump):
@@ -35,6 +53,7 @@ def test_wikipedia():
     assert entry.revision_id == 18683  # revision ID
     assert entry.unix_timestamp == 1146089189  # revision UNIX timestamp
     assert entry.contributor == "Quackor"  # author
+    assert entry.sha1 == "6exdjgf2w9tqowqym474gzmndm3cqxi"  # revision text SHA-1
 
     entry = pages[1]
     assert entry.namespace == 0  # ns
@@ -47,6 +66,7 @@ def test_wikipedia():
     assert entry.revision_id == 341301  # revision ID
     assert entry.unix_timestamp == 1478696410  # revision UNIX timestamp
     assert entry.contributor == "EileenSanda"  # author
+    assert entry.sha1 == "nde3ufxtycpq8776kxvt1lcmr4cgdyi"  # revision text SHA-1
 
 
 def test_wikia():
@@ -122,3 +142,172 @@ def test_plain_dump():
     assert pages[2].unix_timestamp == 979567380  # revision UNIX timestamp
     assert pages[2].contributor is None  # an anonymous contributor
     assert pages[2].is_anon() is True
+
+
+def test_dedup():
+    dump = LocalFileDump(dump_file="test/fixtures/history.xml")
+
+    # all revisions
+    pages = list(DumpReader().read(dump))
+    assert [page.revision_id for page in pages] == [11, 12, 13, 21, 22]
+
+    # skip revisions with the same text as an earlier revision of the page
+    reader = DumpReader(dedup=DEDUP_SKIP)
+    pages = list(reader.read(dump))
+    assert [page.revision_id for page in pages] == [11, 12, 21]
+    assert reader.duplicates_count == 2
+
+    # emit lightweight references to earlier revisions
+    pages = list(DumpReader(dedup=DEDUP_REFERENCE).read(dump))
+    assert [page.revision_id for page in pages] == [11, 12, 13, 21, 22]
+
+    assert not isinstance(pages[0], DuplicateEntry)
+    assert pages[0].content == "Foo is a [[bar]]."
+
+    # a revert, detected by <sha1>
+    assert isinstance(pages[2], DuplicateEntry)
+    assert pages[2].duplicate_of == 11
+    assert pages[2].content is None
+    assert pages[2].sha1 == "k7bg8hf1r2y6ebqbfjcy2ggszidzdk0"
+    assert repr(pages[2]).endswith("(duplicate of #11)>")
+
+    # a null edit, detected by the hash of the text (there's no <sha1> node)
+    assert isinstance(pages[4], DuplicateEntry)
+    assert pages[4].duplicate_of == 21
+
+    with pytest.raises(ValueError):
+        DumpReader(dedup="foo")
+
+
+def test_aread():
+    dump = LocalWikipediaDump(dump_file="test/fixtures/dump.xml.bz2")
+
+    async def read_all(reader, **kwargs):
+        return [entry async for entry in reader.aread(dump, **kwargs)]
+
+    expected = [entry.revision_id for entry in DumpReader().read(dump)]
+
+    pages = asyncio.run(read_all(DumpReader()))
+    assert [entry.revision_id for entry in pages] == expected
+
+    # a single entry per batch and a tiny queue
+    pages = asyncio.run(read_all(DumpReader(), max_queue_size=1, batch_size=1))
+    assert [entry.revision_id for entry in pages] == expected
+
+    async def read_first(reader):
+        async for entry in reader.aread(dump, max_queue_size=1, batch_size=1):
+            return entry
+
+    # the reader thread is stopped when we're done
+    assert asyncio.run(read_first(DumpReader())).revision_id == expected[0]
+    assert "DumpReader.aread" not in [thread.name for thread in threading.enumerate()]
+
+
+def test_aread_error():
+    class BrokenDump(LocalFileDump):
+        def get_content(self):
+            yield from super().get_content()
+            raise IOError("Connection reset")
+
+    async def read_all():
+        return [
+            entry
+            async for entry in DumpReader().aread(BrokenDump("test/fixtures/dump.xml"))
+        ]
+
+    with pytest.raises(IOError):
+        asyncio.run(read_all())
+
+
+def test_afetch():
+    dump = LocalWikipediaDump(dump_file="test/fixtures/dump.xml.bz2")
+
+    async def fetch():
+        with await dump.afetch() as file:
+            return file.read()
+
+    assert asyncio.run(fetch()).startswith(b"BZh")
+
+
+def test_pipeline():
+    dump = LocalWikipediaDump(dump_file="test/fixtures/dump.xml.bz2")
+    expected = [entry.revision_id for entry in DumpReader().read(dump)]
+
+    reader = DumpReader(pipeline_depth=2)
+    assert [entry.revision_id for entry in reader.read(dump)] == expected
+
+    assert reader.pipeline_stats["elapsed"] > 0
+    assert 0 <= reader.pipeline_stats["consumer_utilisation"] <= 1
+
+
+def test_pipeline_exit_while_reading(tmp_path):
+    path = write_dump(str(tmp_path / "dump.xml"), pages=2000, text_size=1024)
+
+    # the background thread must not keep the interpreter running
+    code = (
+        "from mediawiki_dump.dumps import LocalFileDump\n"
+        "from mediawiki_dump.reader import DumpReader\n"
+        f"pages = DumpReader(pipeline_depth=2).read(LocalFileDump({path!r}))\n"
+        "next(pages)\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, timeout=30)
+
+
+def get_shards(dump, count: int, reader_class=DumpReader) -> list:
+    return [
+        [page.page_id for page in reader_class(shard=(index, count)).read(dump)]
+        for index in range(count)
+    ]
+
+
+def test_shard_plain_xml(tmp_path):
+    dump = LocalFileDump(
+        write_dump(str(tmp_path / "dump.xml"), pages=50, text_size=256)
+    )
+    page_ids = [page.page_id for page in DumpReader().read(dump)]
+
+    for count in (1, 2, 3, 7, 100):
+        shards = get_shards(dump, count)
+        assert sum(shards, []) == page_ids, f"{count} shards cover the dump"
+
+    # shards are page-aligned byte ranges of similar size
+    assert [len(shard) for shard in get_shards(dump, 2)] == [26, 24]
+
+    reader = DumpReader(shard=(1, 2))
+    list(reader.read(dump))
+    assert reader.get_base_url() == "https://en.wikipedia.org/wiki/"
+
+
+def test_shard_multistream(tmp_path):
+    dump = LocalMultistreamDump(
+        write_multistream_dump(
+            str(tmp_path / "dump-multistream.xml.bz2"),
+            str(tmp_path / "dump-multistream-index.txt.bz2"),
+            pages_per_stream=10,
+            pages=95,
+            text_size=256,
+        ),
+        str(tmp_path / "dump-multistream-index.txt.bz2"),
+    )
+
+    assert len(dump.get_stream_offsets()) == 10
+
+    page_ids = [page.page_id for page in DumpReader().read(dump)]
+    assert page_ids == list(range(1, 96))
+
+    for count in (1, 2, 3, 10, 20):
+        shards = get_shards(dump, count)
+        assert sum(shards, []) == page_ids, f"{count} shards cover the dump"
+
+    assert [len(shard) for shard in get_shards(dump, 3)] == [30, 30, 35]
+
+
+def test_shard_by_page_id():
+    dump = LocalWikipediaDump(dump_file="test/fixtures/dump.xml.bz2")
+
+    # a single bz2 stream can not be split, pages are filtered by their IDs
+    shards = get_shards(dump, 2)
+    assert sorted(sum(shards, [])) == [121, 2201]
+
+    with pytest.raises(ValueError):
+        DumpReader(shard=(2, 2))
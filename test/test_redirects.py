@@ -0,0 +1,105 @@
+from mediawiki_dump.dumps import LocalFileDump
+from mediawiki_dump.links import extract_links
+from mediawiki_dump.manifest import Manifest
+from mediawiki_dump.reader import DumpReader
+from mediawiki_dump.redirects import RedirectMap
+from mediawiki_dump.writer import write_filtered_dump
+
+DUMP = "test/fixtures/redirects.xml"
+
+
+def test_reader_redirects():
+    entries = list(DumpReader().read(LocalFileDump(DUMP)))
+
+    assert [entry.redirect for entry in entries] == [
+        None,
+        "Faroe Islands",
+        "Faroes",
+        None,
+        "Faroe Islands#History",
+    ]
+    assert [entry.is_redirect() for entry in entries] == [
+        False,
+        True,
+        True,
+        False,
+        True,
+    ]
+
+
+def test_reader_skip_redirects():
+    reader = DumpReader(skip_redirects=True)
+    entries = list(reader.read(LocalFileDump(DUMP)))
+
+    assert [entry.title for entry in entries] == ["Faroe Islands", "Tórshavn"]
+    assert entries[1].content.startswith("'''Tórshavn'''")
+    assert reader.handler.redirects_skipped == 3
+
+
+def test_reader_skip_redirects_manifest():
+    reader = DumpReader(skip_redirects=True, manifest=Manifest())
+    list(reader.read(LocalFileDump(DUMP)))
+
+    # skipped redirects are recorded as well
+    previous = reader.manifest
+    assert len(previous) == 5
+
+    # the dump is not changed, nothing is deleted in any of the shards
+    for index in range(2):
+        reader = DumpReader(
+            skip_redirects=True, shard=(index, 2), previous_manifest=previous
+        )
+
+        assert list(reader.read(LocalFileDump(DUMP))) == []
+        assert reader.deleted_page_ids == []
+
+
+def test_redirect_map(tmp_path):
+    redirects = RedirectMap.from_entries(DumpReader().read(LocalFileDump(DUMP)))
+
+    assert len(redirects) == 3
+    assert "Faeroes" in redirects
+    assert "Tórshavn" not in redirects
+
+    # the chain is resolved
+    assert redirects.get("Faeroes") == "Faroe Islands"
+    assert redirects.resolve("Faeroes") == "Faroe Islands"
+    assert redirects.resolve("History of the Faroe Islands") == "Faroe Islands"
+    assert redirects.resolve("Tórshavn") == "Tórshavn"
+
+    links = extract_links("The capital of the [[Faeroes]]").links
+    assert [redirects.resolve(link.target) for link in links] == ["Faroe Islands"]
+
+    redirects.save(str(tmp_path / "redirects.tsv"))
+    assert RedirectMap.load(str(tmp_path / "redirects.tsv")).redirects == (
+        redirects.redirects
+    )
+
+
+def test_redirect_map_loops():
+    redirects = RedirectMap(max_depth=3)
+
+    for title, target in [("A", "B"), ("B", "A"), ("C", "D"), ("D", "E"), ("X", "X")]:
+        redirects.add(title, target)
+
+    assert "X" not in redirects
+    assert redirects.resolve("A") == "B"
+    assert redirects.resolve("C") == "E"
+
+    redirects.add("E", "F")
+    redirects.add("F", "G")
+
+    # the chain is too long
+    assert redirects.resolve("C") == "F"
+
+    assert redirects.resolve_chains() == ["A", "B", "C"]
+    assert redirects.redirects == {"D": "G", "E": "G", "F": "G"}
+
+
+def test_write_redirects(tmp_path):
+    path = str(tmp_path / "redirects.xml")
+    write_filtered_dump(LocalFileDump(DUMP), path)
+
+    assert [entry.redirect for entry in DumpReader().read(LocalFileDump(path))] == [
+        entry.redirect for entry in DumpReader().read(LocalFileDump(DUMP))
+    ]
@@ -0,0 +1,181 @@
+import struct
+
+import pytest
+
+from benchmarks.synthetic import write_dump, write_multistream_dump
+from mediawiki_dump.dumps import LocalFileDump, LocalMultistreamDump
+from mediawiki_dump.reader import DumpReader, DumpReaderArticles
+from mediawiki_dump.sampling import (
+    PageIndex,
+    reservoir_sample,
+    sample_indexed,
+    sample_multistream,
+    sample_pages,
+)
+
+DUMP_KWARGS = {"pages": 60, "text_size": 128, "namespaces": {0: 0.5, 1: 0.5}}
+
+
+@pytest.fixture(name="multistream")
+def multistream_fixture(tmp_path):
+    path = write_multistream_dump(
+        str(tmp_path / "dump.xml.bz2"),
+        str(tmp_path / "index.txt.bz2"),
+        pages_per_stream=2,
+        **DUMP_KWARGS,
+    )
+    return LocalMultistreamDump(path, str(tmp_path / "index.txt.bz2"))
+
+
+@pytest.fixture(name="plain")
+def plain_fixture(tmp_path):
+    return LocalFileDump(write_dump(str(tmp_path / "dump.xml"), **DUMP_KWARGS))
+
+
+def get_ids(entries) -> list:
+    return [entry.page_id for entry in entries]
+
+
+def test_reservoir_sample():
+    assert reservoir_sample(range(5), 10) == [0, 1, 2, 3, 4]
+
+    sample = reservoir_sample(range(1000), 10, seed=1)
+    assert len(sample) == 10
+    assert sample == sorted(set(sample))
+    assert sample == reservoir_sample(range(1000), 10, seed=1)
+    assert sample != reservoir_sample(range(1000), 10, seed=2)
+
+
+def test_get_index_entries(multistream):
+    entries = list(multistream.get_index_entries())
+
+    assert len(entries) == 60
+    assert get_ids(DumpReader().read(multistream)) == [
+        page_id for _, page_id, _ in entries
+    ]
+
+
+def test_sample_multistream(multistream):
+    all_ids = get_ids(DumpReaderArticles().read(multistream))
+
+    sample = sample_multistream(
+        multistream, 5, seed=42, reader_class=DumpReaderArticles
+    )
+
+    assert len(sample) == 5
+    assert all(entry.namespace == 0 for entry in sample)
+    assert set(get_ids(sample)) <= set(all_ids)
+    assert len(set(get_ids(sample))) == 5
+
+    assert get_ids(sample) == get_ids(
+        sample_multistream(multistream, 5, seed=42, reader_class=DumpReaderArticles)
+    )
+
+    # all pages are returned when there are fewer of them
+    sample = sample_multistream(multistream, 100, reader_class=DumpReaderArticles)
+    assert sorted(get_ids(sample)) == all_ids
+
+
+def test_sample_multistream_reads_chosen_streams_only(multistream):
+    streams = []
+    fetch = multistream.fetch
+
+    def tracked_fetch():
+        file = fetch()
+        seek = file.seek
+
+        def tracked_seek(offset, *args):
+            streams.append(offset)
+            return seek(offset, *args)
+
+        file.seek = tracked_seek
+        return file
+
+    multistream.fetch = tracked_fetch
+    sample_multistream(multistream, 1, seed=1)
+
+    # the header and at most 16 (out of 30) streams with the first batch of random pages
+    assert len(streams) <= 17
+
+
+def test_page_index(tmp_path, plain):
+    page_index = PageIndex.build(plain.dump_file)
+    assert len(page_index) == 60
+
+    with open(plain.dump_file, mode="rb") as file:
+        content = file.read()
+
+    assert all(
+        content[offset : offset + 6] == b"<page>" for offset in page_index.offsets
+    )
+
+    page_index.save(str(tmp_path / "pages.idx"))
+    assert PageIndex.load(str(tmp_path / "pages.idx")).offsets == page_index.offsets
+
+    # offsets are stored as little-endian uint64, regardless of the platform
+    with open(tmp_path / "pages.idx", mode="rb") as file:
+        assert file.read(8) == struct.pack("<Q", page_index.offsets[0])
+
+
+def test_sample_indexed(plain):
+    page_index = PageIndex.build(plain.dump_file)
+    all_ids = get_ids(DumpReaderArticles().read(plain))
+
+    sample = sample_indexed(
+        plain, page_index, 7, seed=3, reader_class=DumpReaderArticles
+    )
+
+    assert len(set(get_ids(sample))) == 7
+    assert set(get_ids(sample)) <= set(all_ids)
+    assert get_ids(sample) == get_ids(
+        sample_pages(
+            plain, 7, seed=3, reader_class=DumpReaderArticles, page_index=page_index
+        )
+    )
+
+
+def test_sample_pages_reservoir(plain):
+    sample = sample_pages(plain, 8, seed=5)
+
+    assert len(sample) == 8
+    assert get_ids(sample) == get_ids(reservoir_sample(DumpReader().read(plain), 8, 5))
+    assert sample_pages(plain, 0) == []
+
+
+def test_sample_is_spread_over_the_dump(tmp_path):
+    kwargs = {"pages": 200, "text_size": 16}
+    multistream = LocalMultistreamDump(
+        write_multistream_dump(
+            str(tmp_path / "dump.xml.bz2"),
+            str(tmp_path / "index.txt.bz2"),
+            pages_per_stream=10,
+            **kwargs,
+        ),
+        str(tmp_path / "index.txt.bz2"),
+    )
+    plain = LocalFileDump(write_dump(str(tmp_path / "dump.xml"), **kwargs))
+    page_index = PageIndex.build(plain.dump_file)
+
+    for sample in (
+        lambda seed: sample_multistream(multistream, 10, seed=seed),
+        lambda seed: sample_indexed(plain, page_index, 10, seed=seed),
+    ):
+        page_ids = [page_id for seed in range(40) for page_id in get_ids(sample(seed))]
+
+        # page IDs are 1..200, the mean of a uniform sample is close to 100
+        assert len(page_ids) == 400
+        assert 85 < sum(page_ids) / len(page_ids) < 115
+        assert max(page_ids) > 190
+
+
+def test_sample_history_pages(tmp_path):
+    path = write_dump(str(tmp_path / "dump.xml"), pages=30, text_size=16, revisions=3)
+    plain = LocalFileDump(path)
+    latest = {entry.page_id: entry.revision_id for entry in DumpReader().read(plain)}
+
+    for sample in (
+        sample_pages(plain, 10, seed=1),
+        sample_pages(plain, 10, seed=1, page_index=PageIndex.build(path)),
+    ):
+        assert len(set(get_ids(sample))) == 10
+        assert all(latest[entry.page_id] == entry.revision_id for entry in sample)
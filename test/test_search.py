@@ -0,0 +1,115 @@
+import pickle
+
+import pytest
+
+from benchmarks.synthetic import write_dump
+from mediawiki_dump.dumps import LocalFileDump
+from mediawiki_dump.parts import MultiPartReader
+from mediawiki_dump.reader import DumpReader
+from mediawiki_dump.search import KeywordMatcher, KeywordSearchReader, search_entries
+
+
+def test_keyword_matcher():
+    matcher = KeywordMatcher(["he", "she", "his", "hers", "She"])
+
+    # keywords are deduplicated case-insensitively
+    assert matcher.keywords == ["he", "she", "his", "hers"]
+    assert len(matcher) == 4
+
+    assert list(matcher.iter_matches("Ushers")) == [(1, "she"), (2, "he"), (2, "hers")]
+    assert matcher.count("she said: his, HIS and hers") == {
+        "she": 1,
+        "he": 2,
+        "his": 2,
+        "hers": 1,
+    }
+    assert matcher.count("nothing to see") == {}
+    assert matcher.count("") == {}
+
+    # the automaton can be sent to worker processes
+    assert pickle.loads(pickle.dumps(matcher)).count("ushers") == matcher.count(
+        "ushers"
+    )
+
+
+def test_keyword_matcher_options():
+    matcher = KeywordMatcher(["Foo", "foo bar"], case_sensitive=True)
+    assert matcher.count("foo bar Foo bar") == {"foo bar": 1, "Foo": 1}
+
+    matcher = KeywordMatcher(["cat", "Żółw"], whole_words=True)
+    assert matcher.count("cat, concat, cats, (cat) żółwie żółw") == {
+        "cat": 2,
+        "Żółw": 1,
+    }
+
+    with pytest.raises(ValueError):
+        KeywordMatcher(["foo", ""])
+
+
+def test_keyword_matcher_case_folding():
+    # "İ" and "ß" are case-folded into two characters, positions point to the given text
+    text = "İİ foo, İfoo; Straße STRASSE"
+    matcher = KeywordMatcher(["foo", "strasse", "s"], whole_words=True)
+
+    assert list(matcher.iter_matches(text)) == [
+        (3, "foo"),
+        (14, "strasse"),
+        (21, "strasse"),
+    ]
+    assert [text[start : start + 3] for start, _ in matcher.iter_matches(text)] == [
+        "foo",
+        "Str",
+        "STR",
+    ]
+
+    # matches within a case-folded character are skipped
+    assert KeywordMatcher(["s"]).count("ß") == {}
+    assert KeywordMatcher(["i̇"]).count("İ") == {"i̇": 1}
+
+
+def get_keywords_and_pages(tmp_path):
+    dump_file = str(tmp_path / "dump.xml")
+    write_dump(dump_file, pages=30, text_size=300, seed=5)
+    pages = list(DumpReader().read(LocalFileDump(dump_file)))
+
+    # words of some pages, so that only a part of the pages matches
+    keywords = [pages[3].title.lower(), pages[7].content.split()[-1].lower()]
+
+    expected = [
+        page.page_id
+        for page in pages
+        if any(keyword in page.content.lower() for keyword in keywords)
+    ]
+
+    assert 0 < len(expected) < len(pages)
+    return dump_file, keywords, pages, expected
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_search_entries(tmp_path, workers):
+    _, keywords, pages, expected = get_keywords_and_pages(tmp_path)
+
+    results = list(search_entries(iter(pages), keywords, workers=workers, chunk_size=4))
+
+    assert [entry.page_id for entry, _ in results] == expected
+    for entry, matches in results:
+        assert matches == {
+            keyword: entry.content.lower().count(keyword)
+            for keyword in keywords
+            if keyword in entry.content.lower()
+        }
+
+
+def test_keyword_search_reader(tmp_path):
+    dump_file, keywords, _, expected = get_keywords_and_pages(tmp_path)
+
+    reader = KeywordSearchReader(keywords)
+    assert [
+        entry.page_id for entry, _ in reader.search(LocalFileDump(dump_file))
+    ] == expected
+
+    # pages are searched in the worker processes
+    reader = MultiPartReader(KeywordSearchReader, workers=2, keywords=keywords)
+    entries = reader.read([LocalFileDump(dump_file), LocalFileDump(dump_file)])
+
+    assert sorted(entry.page_id for entry in entries) == sorted(expected * 2)
@@ -0,0 +1,116 @@
+import json
+from urllib.parse import parse_qs
+
+import responses
+from mwclient import Site
+
+from mediawiki_dump.dumps import IteratorDump
+from mediawiki_dump.reader import DumpReader
+from mediawiki_dump.sync import RecentChangesDump, SyncedDump
+
+from .test_dumps import get_export_response
+
+RECENT_CHANGES = [
+    {"type": "edit", "title": "Foo", "timestamp": "2024-01-01T10:00:00Z"},
+    {"type": "new", "title": "Baz & Co", "timestamp": "2024-01-01T11:00:00Z"},
+    {
+        "type": "log",
+        "title": "Bar",
+        "timestamp": "2024-01-01T12:00:00Z",
+        "logtype": "delete",
+        "logaction": "delete",
+    },
+    {
+        "type": "log",
+        "title": "Old",
+        "timestamp": "2024-01-01T13:00:00Z",
+        "logtype": "move",
+        "logaction": "move",
+        "logparams": {"target_ns": 0, "target_title": "New"},
+    },
+    {"type": "edit", "title": "Foo", "timestamp": "2024-01-01T14:00:00Z"},
+]
+
+
+def get_recent_changes_response(request):
+    """Mocks the recent changes API, two changes per response"""
+    params = parse_qs(request.body)
+    assert params["rcstart"] == ["2024-01-01T00:00:00Z"]
+
+    offset = int(params.get("rccontinue", ["0"])[0])
+    result = {
+        "query": {"recentchanges": RECENT_CHANGES[offset : offset + 2]},
+    }
+
+    if offset + 2 < len(RECENT_CHANGES):
+        result["continue"] = {"rccontinue": str(offset + 2), "continue": "-||"}
+
+    return 200, {}, json.dumps(result)
+
+
+def mock_site(mocked_responses):
+    mocked_responses.add_callback(
+        method=responses.POST,
+        url="https://vim.fandom.com/api.php",
+        callback=get_recent_changes_response,
+    )
+    mocked_responses.add_callback(
+        method=responses.GET,
+        url="https://vim.fandom.com/index.php",
+        callback=get_export_response,
+    )
+
+    return Site(host="vim.fandom.com", path="/", do_init=False)
+
+
+def test_recent_changes_dump():
+    with responses.RequestsMock() as mocked_responses:
+        dump = RecentChangesDump(mock_site(mocked_responses), "2024-01-01T00:00:00Z")
+
+        assert dump.get_changes() == {
+            "Baz & Co": False,
+            "Bar": True,
+            "Old": False,
+            "New": False,
+            "Foo": False,
+        }
+        assert dump.last_timestamp == "2024-01-01T14:00:00Z"
+
+        pages = [entry.title for entry in DumpReader().read(dump)]
+
+    assert pages == ["Baz & Co", "Old", "New", "Foo"]
+
+
+def test_synced_dump():
+    with responses.RequestsMock() as mocked_responses:
+        changes = RecentChangesDump(
+            mock_site(mocked_responses), "2024-01-01T00:00:00Z", batch_size=2
+        )
+
+        # pages "Foo", "Bar" and "Baz & Co" are replaced, "Baz" is kept
+        with open("test/fixtures/history.xml", "rb") as file:
+            xml = file.read().replace(b"</mediawiki>", b"")
+
+        xml += (
+            b"<page><title>Baz</title><ns>0</ns><id>3</id><revision><id>31</id>"
+            b"<timestamp>2001-01-15T13:15:00Z</timestamp><text>Baz</text>"
+            b"</revision></page>"
+            b"<page><title>Baz &amp; Co</title><ns>0</ns><id>4</id><revision><id>41</id>"
+            b"<timestamp>2001-01-15T13:15:00Z</timestamp><text>Baz</text>"
+            b"</revision></page></mediawiki>"
+        )
+
+        # split the base dump into tiny chunks
+        base = IteratorDump(xml[i : i + 5] for i in range(0, len(xml), 5))
+        reader = DumpReader()
+        pages = list(reader.read(SyncedDump(base, changes)))
+
+    assert [(page.title, page.revision_id) for page in pages] == [
+        ("Baz", 31),
+        ("Baz & Co", 1),
+        ("Old", 1),
+        ("New", 1),
+        ("Foo", 1),
+    ]
+    assert pages[4].content == "Foo is a page"
+    assert reader.get_base_url() == "https://en.wikipedia.org/wiki/"
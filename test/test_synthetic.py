@@ -0,0 +1,59 @@
+from benchmarks.run import LocalWikiaDump, main
+from benchmarks.synthetic import generate_dump, sha1_base36, write_dump
+from mediawiki_dump.dumps import LocalFileDump, LocalWikipediaDump, StringDump
+from mediawiki_dump.reader import DumpReader
+
+
+def test_sha1_base36():
+    # https://www.mediawiki.org/wiki/Manual:Revision_table#rev_sha1
+    assert sha1_base36("") == "phoiac9h4m842xq45sp7s6u21eteeq1"
+
+
+def test_generate_dump():
+    xml = "".join(
+        generate_dump(
+            pages=20, revisions=(1, 3), namespaces={0: 3, 1: 1, 14: 1}, seed=1
+        )
+    )
+    reader = DumpReader()
+    pages = list(reader.read(StringDump(xml)))
+
+    assert 20 <= len(pages) <= 60
+    assert len({page.page_id for page in pages}) == 20
+    assert {page.namespace for page in pages} <= {0, 1, 14}
+    assert reader.handler.get_siteinfo()["dbname"] == "enwiki"
+    assert reader.get_dump_language() == "en"
+
+    # the same seed gives the same dump
+    assert xml == "".join(
+        generate_dump(
+            pages=20, revisions=(1, 3), namespaces={0: 3, 1: 1, 14: 1}, seed=1
+        )
+    )
+
+
+def test_write_dump(tmp_path):
+    for compression, dump_class in [
+        (None, LocalFileDump),
+        ("bz2", LocalWikipediaDump),
+        ("7z", LocalWikiaDump),
+    ]:
+        dump_file = write_dump(
+            str(tmp_path / f"dump.{compression}"),
+            compression=compression,
+            pages=5,
+            text_size=512,
+            text_size_sigma=0,
+        )
+        pages = list(DumpReader().read(dump_class(dump_file)))
+
+        assert len(pages) == 5
+        assert all(len(page.content) >= 512 for page in pages)
+
+
+def test_benchmarks_run(capsys):
+    main(["--pages", "5", "--repeat", "1", "--no-memory"])
+
+    out = capsys.readouterr().out
+    assert "DumpReader.read()" in out
+    assert "tokenize()" in out
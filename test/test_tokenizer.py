@@ -1,6 +1,18 @@
+import time
 from unittest import TestCase
 
-from mediawiki_dump.tokenizer import clean, tokenize, tokenize_filter
+from mediawiki_dump.cache import TextCache
+from mediawiki_dump.entry import DumpEntry
+from mediawiki_dump.tokenizer import (
+    clean,
+    clean_and_tokenize,
+    clean_and_tokenize_many,
+    clean_many,
+    iter_tokens,
+    tokenize,
+    tokenize_filter,
+    tokenize_many,
+)
 
 
 class TestTokenizerClean(TestCase):
@@ -11,6 +23,13 @@ class TestTokenizerClean(TestCase):
         assert clean("''italic''") == "italic"
         assert clean("'''bold'''") == "bold"
 
+        # bold and italic markup around and inside links
+        assert clean("'''[[Foo]]'''") == "Foo"
+        assert clean("''[[x]]'s''") == "''x's''"
+        assert clean("a ''[[Foo|x]]'s b'' c") == "a ''x's b'' c"
+        assert clean("[['''x]]'''") == "x"
+        assert clean("'''{{'''}} foo") == "foo"
+
     def test_headings(self):
         assert clean("==foo==") == "foo"
         assert clean("===Foo===") == "Foo"
@@ -35,6 +54,17 @@ class TestTokenizerClean(TestCase):
         assert clean("* 123\n*245\n* 346 * 789") == "123\n245\n346 * 789"
         assert clean("* 123\n** 245") == "123\n245"
 
+        # a list marker at the beginning of a line once the markup before it is removed
+        assert clean("[[Category:Foo]]* item\n") == "item"
+        assert clean("a\n[[Category:Foo]]** item") == "a\nitem"
+        assert clean("]]* item") == "item"
+        assert clean("'''*''' item") == "item"
+
+        # only the first marker is removed
+        assert clean("** * item") == "* item"
+        assert clean("{{foo}}* item") == "* item"
+        assert clean("__TOC__* item") == "* item"
+
     def test_external_links(self):
         assert (
             clean("[http://www.klaksvik.fo Heimasíðan hjá Klaksvíkar kommunu]")
@@ -74,6 +104,26 @@ class TestTokenizerClean(TestCase):
             == "Adorno Barthes Baudrillard Bataille"
         )
 
+    def test_templates_heavy_page(self):
+        text = "foo{{Infobox|a={{convert|1|km}}|b=[[c]]}}bar " * 2000
+        assert clean(text) == ("foo bar " * 2000).strip()
+
+    def test_unclosed_markup(self):
+        # used to take tens of seconds, each opener was scanned till the end of the text
+        for markup in ("[[a ", "[[a|", "<a ", "[http://x ", "{{a {|b "):
+            start = time.perf_counter()
+            clean(markup * 20000)
+            assert time.perf_counter() - start < 3, markup
+
+        # long links and parser hooks are still cleaned up
+        assert clean(f"[[{'a' * 300}]]") == "a" * 300
+        assert clean(f"<ref>{'a' * 2000}</ref>") == ""
+
+    def test_templates_and_tables(self):
+        assert clean("foo\n{|\n| {{bar}}\n|}\nbar") == "foo\n\nbar"
+        assert clean("{|\n| a {{b}}}\nc") == "{|\n| a  }\nc"  # not a table
+        assert clean("{{foo}}\n{|\n| a\n|}\n{{bar") == "{{bar"  # unbalanced template
+
     def test_parser_hooks(self):
         assert clean("foo<ref>link</ref>") == "foo"
         assert clean("E = mc<sup>2</sup>") == "E = mc"
@@ -241,6 +291,11 @@ class TestTokenizer:
             "flagicon",
         ]
 
+        assert list(iter_tokens("Foo, bar 123 (baz)")) == ["Foo", "bar", "baz"]
+        assert list(iter_tokens("Foo bar 2 + 2 = four")) == tokenize(
+            "Foo bar 2 + 2 = four"
+        )
+
         assert tokenize("Klaksvíkar kommuna er næststørsta kommuna í Føroyum.") == [
             "Klaksvíkar",
             "kommuna",
@@ -250,3 +305,104 @@ class TestTokenizer:
             "í",
             "Føroyum",
         ]
+
+
+def keep_long_words(text: str) -> bool:
+    return len(text) > 3
+
+
+class TestTokenizerMany:
+    texts = [f"[[Foo|bar]] {{{{test}}}} is a link #{i}" for i in range(50)]
+
+    def test_clean_many(self):
+        expected = [clean(text) for text in self.texts]
+
+        assert list(clean_many(self.texts, workers=1)) == expected
+        assert list(clean_many(self.texts, workers=2, chunk_size=7)) == expected
+
+    def test_clean_many_entries(self):
+        entries = [
+            DumpEntry(0, 1, "", "Foo", text, 1, "2018-10-29T16:01:01Z")
+            for text in self.texts
+        ]
+
+        assert list(clean_many(entries, workers=2, chunk_size=4)) == [
+            clean(text) for text in self.texts
+        ]
+
+    def test_tokenize_many(self):
+        assert list(tokenize_many(self.texts, workers=2, chunk_size=3)) == [
+            tokenize(text) for text in self.texts
+        ]
+
+        assert list(
+            tokenize_many(self.texts, filter_func=keep_long_words, workers=2)
+        ) == [tokenize(text, keep_long_words) for text in self.texts]
+
+    def test_clean_and_tokenize_many(self):
+        assert clean_and_tokenize("[[Foo|bar]] {{test}} is a link") == [
+            "bar",
+            "is",
+            "a",
+            "link",
+        ]
+
+        assert list(
+            clean_and_tokenize_many(self.texts, workers=3, max_in_flight=2)
+        ) == [tokenize(clean(text)) for text in self.texts]
+
+    def test_cache(self):
+        entries = [
+            DumpEntry(0, i, "", "Foo", text, 1, "2018-10-29T16:01:01Z", sha1=f"sha{i}")
+            for i, text in enumerate(self.texts)
+        ]
+
+        with TextCache(":memory:") as cache:
+            expected = [clean(text) for text in self.texts]
+
+            assert list(clean_many(entries, workers=2, cache=cache)) == expected
+            assert (cache.hits, cache.misses) == (0, 50)
+
+            # cleaned up texts are now taken from the cache
+            assert (
+                list(clean_many(entries[:10], workers=1, cache=cache)) == expected[:10]
+            )
+            assert (cache.hits, cache.misses) == (10, 50)
+
+            # strings are keyed by the SHA-1 of their content
+            expected = [tokenize(clean(text)) for text in self.texts]
+
+            for _ in range(2):
+                assert list(
+                    clean_and_tokenize_many(
+                        self.texts + [""], workers=2, chunk_size=7, cache=cache
+                    )
+                ) == expected + [[]]
+
+            assert (cache.hits, cache.misses) == (61, 101)
+            assert len(cache) == 101
+
+    def test_cache_filters(self):
+        with TextCache(":memory:") as cache:
+            expected = [tokenize(text, keep_long_words) for text in self.texts]
+
+            for _ in range(2):
+                assert (
+                    list(tokenize_many(self.texts, keep_long_words, 1, cache=cache))
+                    == expected
+                )
+
+            assert (cache.hits, cache.misses) == (50, 50)
+
+            # lambdas and nested functions can not be told apart, they are not cached
+            keys = {key for key, in cache.connection.execute("SELECT key FROM cache")}
+            assert {key.rpartition(":")[0] for key in keys} == {
+                "tokenize:test.test_tokenizer.keep_long_words"
+            }
+
+            for filter_func in (lambda text: len(text) > 3, lambda text: True):
+                assert list(tokenize_many(self.texts, filter_func, 1, cache=cache)) == [
+                    tokenize(text, filter_func) for text in self.texts
+                ]
+
+            assert (cache.hits, cache.misses, len(cache)) == (50, 50, 50)
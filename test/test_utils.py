@@ -1,4 +1,11 @@
-from mediawiki_dump.utils import parse_date_string
+import pytest
+
+from mediawiki_dump.utils import (
+    BackgroundIterator,
+    iter_chunks,
+    parallel_map,
+    parse_date_string,
+)
 
 
 def test_parse_date_string():
@@ -7,3 +14,62 @@ def test_parse_date_string():
     assert parse_date_string("1970-01-01T00:00:00Z").timestamp() == 0
     assert parse_date_string("2004-05-25T02:19:28Z").timestamp() == 1085451568
     assert parse_date_string("2018-10-29T16:01:01Z").timestamp() == 1540828861
+
+
+def test_iter_chunks():
+    assert list(iter_chunks(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(iter_chunks([], 2)) == []
+
+
+def test_parallel_map():
+    assert list(parallel_map(abs, range(-10, 0), workers=1)) == list(range(10, 0, -1))
+
+    # results are yielded in order
+    assert list(
+        parallel_map(abs, range(-100, 0), workers=2, chunk_size=3, max_in_flight=2)
+    ) == list(range(100, 0, -1))
+
+    # the consumer can stop early
+    results = parallel_map(abs, range(-100, 0), workers=2, chunk_size=1)
+    assert next(results) == 100
+    results.close()
+
+
+def test_background_iterator():
+    items = BackgroundIterator(iter(range(1000)), queue_size=2, batch_bytes=10)
+    assert list(items) == list(range(1000))
+
+    stats = items.get_stats()
+    assert stats["elapsed"] > 0
+    assert 0 <= stats["producer_utilisation"] <= 1
+    assert 0 <= stats["consumer_utilisation"] <= 1
+
+    # bytes are batched by their length
+    chunks = [b"foo" * 100] * 50
+    assert list(BackgroundIterator(chunks, batch_bytes=1024)) == chunks
+
+
+def test_background_iterator_stop():
+    closed = []
+
+    def generate():
+        try:
+            yield from range(1000)
+        finally:
+            closed.append(True)
+
+    items = iter(BackgroundIterator(generate(), queue_size=1, batch_bytes=1))
+    assert next(items) == 0
+    items.close()
+
+    # the producer thread has been stopped and closed the generator
+    assert closed == [True]
+
+
+def test_background_iterator_error():
+    def generate():
+        yield 1
+        raise ValueError("Failed to decompress")
+
+    with pytest.raises(ValueError):
+        list(BackgroundIterator(generate()))
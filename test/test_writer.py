@@ -0,0 +1,265 @@
+import gzip
+
+import pytest
+
+from benchmarks.synthetic import write_dump
+from mediawiki_dump.dumps import (
+    DumpError,
+    LocalFileDump,
+    LocalMultistreamDump,
+    LocalWikipediaDump,
+    StringDump,
+)
+from mediawiki_dump.entry import DuplicateEntry
+from mediawiki_dump.reader import DEDUP_REFERENCE, DumpReader
+from mediawiki_dump.writer import DumpWriter, get_index_path, write_filtered_dump
+
+
+def read_entries(dump) -> list:
+    return [
+        (
+            entry.namespace,
+            entry.page_id,
+            entry.title,
+            entry.content,
+            entry.revision_id,
+            entry.timestamp,
+            entry.contributor,
+            entry.sha1,
+        )
+        for entry in DumpReader().read(dump)
+    ]
+
+
+@pytest.fixture(name="source")
+def source_fixture(tmp_path):
+    return LocalWikipediaDump(
+        write_dump(
+            str(tmp_path / "source.xml.bz2"),
+            compression="bz2",
+            pages=30,
+            text_size=256,
+            namespaces={0: 0.5, 1: 0.5},
+        )
+    )
+
+
+def test_get_index_path():
+    assert (
+        get_index_path("enwiki-pages-articles-multistream.xml.bz2")
+        == "enwiki-pages-articles-multistream-index.txt.bz2"
+    )
+
+
+def test_write_filtered_dump_bz2(tmp_path, source):
+    path = str(tmp_path / "subset.xml.bz2")
+    stats = write_filtered_dump(source, path, namespaces=[0], buffer_size=1024)
+
+    expected = [entry for entry in read_entries(source) if entry[0] == 0]
+    assert stats == {"pages": len(expected), "revisions": len(expected)}
+
+    reader = DumpReader()
+    assert read_entries(LocalWikipediaDump(path)) == expected
+
+    list(reader.read(LocalWikipediaDump(path)))
+    assert reader.get_dump_language() == "en"
+    assert reader.handler.get_siteinfo() == {
+        "sitename": "enwiki",
+        "dbname": "enwiki",
+        "base": "https://en.wikipedia.org/wiki/Main_Page",
+        "generator": "MediaWiki 1.42.0-synthetic",
+    }
+
+
+def test_write_filtered_dump_gzip(tmp_path, source):
+    entries = read_entries(source)
+    titles = [entries[0][2], entries[5][2]]
+
+    path = str(tmp_path / "subset.xml.gz")
+    write_filtered_dump(
+        source, path, titles=titles, predicate=lambda entry: entry.page_id > 1
+    )
+
+    plain_path = str(tmp_path / "subset.xml")
+    with gzip.open(path, mode="rb") as file, open(plain_path, mode="wb") as plain:
+        plain.write(file.read())
+
+    assert read_entries(LocalFileDump(plain_path)) == [entries[5]]
+
+
+def test_write_filtered_dump_multistream(tmp_path, source):
+    path = str(tmp_path / "subset-multistream.xml.bz2")
+    write_filtered_dump(source, path, multistream=True, pages_per_stream=4)
+
+    dump = LocalMultistreamDump(path, get_index_path(path))
+    assert len(dump.get_stream_offsets()) == 8  # 30 pages, 4 per stream
+
+    assert read_entries(dump) == read_entries(source)
+
+    shards = [
+        [entry.revision_id for entry in DumpReader(shard=(index, 3)).read(dump)]
+        for index in range(3)
+    ]
+    assert sum(shards, []) == [entry[4] for entry in read_entries(source)]
+
+
+@pytest.mark.parametrize("multistream", [False, True])
+def test_write_buffer_size(tmp_path, source, multistream):
+    path = str(tmp_path / "subset-multistream.xml.bz2")
+    entries = list(DumpReader().read(source))
+
+    with DumpWriter(
+        path, multistream=multistream, pages_per_stream=10, buffer_size=1024
+    ) as writer:
+        for entry in entries:
+            writer.write(entry)
+
+            # multistream buffer is flushed when the page is closed
+            limit = 1024 + (3000 if multistream else 0)
+            assert writer.buffered_size < limit
+
+    dump = (
+        LocalMultistreamDump(path, get_index_path(path))
+        if multistream
+        else LocalWikipediaDump(path)
+    )
+    assert read_entries(dump) == read_entries(source)
+
+    if multistream:
+        assert len(dump.get_stream_offsets()) == 3  # 30 pages, 10 per stream
+
+
+def test_write_multistream_needs_bz2(tmp_path):
+    with pytest.raises(ValueError):
+        DumpWriter(str(tmp_path / "subset.xml.gz"), multistream=True)
+
+
+def test_write_zstd(tmp_path, source):
+    zstandard = pytest.importorskip("zstandard")
+
+    path = str(tmp_path / "subset.xml.zst")
+    write_filtered_dump(source, path)
+
+    with open(path, mode="rb") as file:
+        xml = zstandard.ZstdDecompressor().stream_reader(file).read().decode("utf-8")
+
+    assert read_entries(StringDump(xml)) == read_entries(source)
+
+
+def test_write_full_history(tmp_path):
+    path = str(tmp_path / "history.xml")
+    source = LocalFileDump("test/fixtures/history.xml")
+
+    # duplicated revisions are written in full
+    write_filtered_dump(source, path, reader=DumpReader(dedup=DEDUP_REFERENCE))
+
+    entries = read_entries(LocalFileDump(path))
+    assert [entry[4] for entry in entries] == [11, 12, 13, 21, 22]
+    assert entries == read_entries(source)
+
+    with open(path, encoding="utf-8") as file:
+        assert file.read().count("<page>") == 2
+
+
+def test_write_duplicate_of_skipped_revision(tmp_path):
+    path = str(tmp_path / "history.xml")
+    source = LocalFileDump("test/fixtures/history.xml")
+
+    # the revert (#13) duplicates the revision that is not written (#11)
+    write_filtered_dump(
+        source,
+        path,
+        reader=DumpReader(dedup=DEDUP_REFERENCE),
+        predicate=lambda entry: entry.revision_id != 11,
+    )
+
+    entries = read_entries(LocalFileDump(path))
+    assert [entry[4] for entry in entries] == [12, 13, 21, 22]
+    assert entries == read_entries(source)[1:]
+
+    duplicate = DuplicateEntry(11, 0, 1, "", "Foo", None, 13, "2018-10-29T16:01:01Z")
+
+    with DumpWriter(str(tmp_path / "broken.xml"), dedup=True) as writer:
+        with pytest.raises(DumpError, match="#11 that was not passed to the writer"):
+            writer.write(duplicate)
+
+    with DumpWriter(str(tmp_path / "broken.xml")) as writer:
+        with pytest.raises(DumpError, match="pass dedup=True"):
+            writer.write(duplicate)
+
+
+@pytest.mark.parametrize("dedup", [False, True])
+def test_write_page_texts(tmp_path, dedup):
+    reader = DumpReader(dedup=DEDUP_REFERENCE if dedup else None)
+
+    with DumpWriter(str(tmp_path / "history.xml"), dedup=dedup) as writer:
+        for entry in reader.read(LocalFileDump("test/fixtures/history.xml")):
+            writer.write(entry)
+
+            if entry.revision_id == 13:
+                # texts are kept in dedup mode only, once per SHA-1
+                assert len(writer.page_texts) == (2 if dedup else 0)
+
+
+def test_write_predicate_gets_duplicate_text(tmp_path):
+    path = str(tmp_path / "history.xml")
+    source = LocalFileDump("test/fixtures/history.xml")
+
+    # the revert (#13) is a DuplicateEntry, its text is resolved for the predicate
+    write_filtered_dump(
+        source,
+        path,
+        reader=DumpReader(dedup=DEDUP_REFERENCE),
+        predicate=lambda entry: "[[bar]]" in entry.content,
+    )
+
+    entries = read_entries(LocalFileDump(path))
+    assert [entry[4] for entry in entries] == [11, 13, 21, 22]
+
+
+SITEINFO = """<mediawiki xml:lang="fo">
+  <siteinfo>
+    <sitename>Wikipedia</sitename>
+    <dbname>fowiki</dbname>
+    <base>https://fo.wikipedia.org/wiki/Fors%C3%AD%C3%B0a</base>
+    <case>first-letter</case>
+    <namespaces>
+      <namespace key="-1" case="first-letter">Serstakt</namespace>
+      <namespace key="0" case="first-letter" />
+      <namespace key="1" case="first-letter">Kjak</namespace>
+    </namespaces>
+  </siteinfo>
+</mediawiki>
+"""
+
+
+def test_write_siteinfo(tmp_path):
+    path = str(tmp_path / "empty.xml")
+    write_filtered_dump(StringDump(SITEINFO), path)
+
+    reader = DumpReader()
+    list(reader.read(LocalFileDump(path)))
+
+    assert reader.handler.get_siteinfo() == {
+        "sitename": "Wikipedia",
+        "dbname": "fowiki",
+        "base": "https://fo.wikipedia.org/wiki/Fors%C3%AD%C3%B0a",
+        "case": "first-letter",
+        "namespaces": [
+            {"key": "-1", "case": "first-letter", "name": "Serstakt"},
+            {"key": "0", "case": "first-letter", "name": ""},
+            {"key": "1", "case": "first-letter", "name": "Kjak"},
+        ],
+    }
+
+    with open(path, encoding="utf-8") as file:
+        assert '<namespace key="0" case="first-letter" />' in file.read()
+
+
+def test_write_empty(tmp_path):
+    path = str(tmp_path / "empty.xml")
+
+    with DumpWriter(path):
+        pass
+
+    assert read_entries(LocalFileDump(path)) == []